@@ -2,30 +2,85 @@ const fs = require('fs');
 const { spawn } = require('child_process');
 const path = require('path');
 const { sanitizeApiKey } = require('./sanitizeKey');
+const { PythonWorkerPool } = require('./pythonWorkerPool');
+const { SingleFlight, stableDigest } = require('./singleflight');
 
 const SCRIPTS_DIR = path.join(__dirname, 'scripts');
 const PYTHON_BIN = process.env.PYTHON_PATH || 'python3';
+// 0 (default) spawns a fresh interpreter per call; N > 0 keeps N resident workers.
+const PYTHON_WORKERS = Math.max(0, parseInt(process.env.PYTHON_WORKERS || '0', 10) || 0);
+
+let _workerPool = null;
+// Identical concurrent script calls (same script + payload) share one run.
+const _scriptFlights = new SingleFlight();
+
+function buildPythonEnv() {
+  const projectRoot = path.join(__dirname, '..');
+  const nltkData = path.join(projectRoot, 'nltk_data');
+  const env = { ...process.env, PYTHONUNBUFFERED: '1' };
+  if (process.env.OPENROUTER_API_KEY) {
+    env.OPENROUTER_API_KEY = sanitizeApiKey(process.env.OPENROUTER_API_KEY);
+  }
+  if (fs.existsSync(nltkData)) {
+    env.NLTK_DATA = nltkData;
+  }
+  return env;
+}
+
+/** Lazily start the resident worker pool (only when PYTHON_WORKERS > 0). */
+function getWorkerPool() {
+  if (PYTHON_WORKERS === 0) return null;
+  if (!_workerPool) {
+    _workerPool = new PythonWorkerPool({
+      size: PYTHON_WORKERS,
+      pythonBin: PYTHON_BIN,
+      buildEnv: buildPythonEnv,
+    });
+  }
+  return _workerPool;
+}
+
+/** Pool counters for /api/health; null in spawn-per-request mode. */
+function workerPoolStats() {
+  return _workerPool ? _workerPool.stats() : null;
+}
+
+/** Coalescing counters for runPythonScript, for /api/health. */
+function pythonCoalescingStats() {
+  return _scriptFlights.stats();
+}
 
 /**
  * Run a Python script from backend/scripts with a JSON payload argument.
+ * Uses the resident worker pool when PYTHON_WORKERS > 0, else spawns a process.
+ * Concurrent calls with an identical script and payload share one run, except
+ * those passing a signal (one caller's abort must not cancel the others).
  * @param {string} scriptFile - e.g. 'generate_response.py'
  * @param {object} payload - serialized as single CLI arg
+ * @param {object} [opts]
+ * @param {AbortSignal} [opts.signal] - abort to cancel (worker: cancel frame; spawn: kill the process)
  * @returns {Promise<{ stdout: string, stderr: string }>}
  */
-function runPythonScript(scriptFile, payload) {
-  return new Promise((resolve, reject) => {
-    const scriptPath = path.join(SCRIPTS_DIR, scriptFile);
-    const projectRoot = path.join(__dirname, '..');
-    const nltkData = path.join(projectRoot, 'nltk_data');
-    const env = { ...process.env, PYTHONUNBUFFERED: '1' };
-    if (process.env.OPENROUTER_API_KEY) {
-      env.OPENROUTER_API_KEY = sanitizeApiKey(process.env.OPENROUTER_API_KEY);
-    }
-    if (fs.existsSync(nltkData)) {
-      env.NLTK_DATA = nltkData;
+function runPythonScript(scriptFile, payload, opts = {}) {
+  const run = () => {
+    const pool = getWorkerPool();
+    if (pool) {
+      return pool.run(scriptFile, payload, opts);
     }
+    return spawnPythonScript(scriptFile, payload, opts);
+  };
+  if (opts.signal) return run();
+  return _scriptFlights.do(stableDigest(scriptFile, payload), run);
+}
 
-    const proc = spawn(PYTHON_BIN, [scriptPath, JSON.stringify(payload)], { env });
+function spawnPythonScript(scriptFile, payload, { signal } = {}) {
+  return new Promise((resolve, reject) => {
+    const scriptPath = path.join(SCRIPTS_DIR, scriptFile);
+    // With a signal, abort kills the process and rejects with an AbortError.
+    const proc = spawn(PYTHON_BIN, [scriptPath, JSON.stringify(payload)], {
+      env: buildPythonEnv(),
+      signal,
+    });
 
     let stdout = '';
     let stderr = '';
@@ -42,7 +97,9 @@ function runPythonScript(scriptFile, payload) {
     });
 
     proc.on('error', (err) => {
-      if (err.code === 'ENOENT') {
+      if (err.name === 'AbortError') {
+        reject(err);
+      } else if (err.code === 'ENOENT') {
         reject(
           new Error(
             `Python executable not found ("${PYTHON_BIN}"). Install Python 3.9+ or set PYTHON_PATH in .env`
@@ -113,4 +170,11 @@ function parsePythonJsonOrThrow(stdout, fallbackKey = 'response') {
   return data;
 }
 
-module.exports = { runPythonScript, parsePythonJson, parsePythonJsonOrThrow, PYTHON_BIN };
+module.exports = {
+  runPythonScript,
+  parsePythonJson,
+  parsePythonJsonOrThrow,
+  workerPoolStats,
+  pythonCoalescingStats,
+  PYTHON_BIN,
+};
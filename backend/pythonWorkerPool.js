@@ -0,0 +1,279 @@
+/**
+ * Pool of long-lived Python workers (backend/scripts/worker.py).
+ * Each worker imports the scripts once and serves newline-delimited JSON frames,
+ * so requests skip interpreter start-up. Crashed workers are respawned.
+ *
+ * A worker serves several requests at once (it reports how many in its ready
+ * frame, from PYTHON_WORKER_CONCURRENCY); jobs go to the least-loaded worker.
+ * Passing an AbortSignal to run() drops a queued job, or sends a cancel frame
+ * for one in flight, and rejects it with an AbortError.
+ */
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+
+const WORKER_SCRIPT = path.join(__dirname, 'scripts', 'worker.py');
+const RESTART_DELAY_MS = 500;
+const MAX_RESTART_DELAY_MS = 10000;
+
+function abortError() {
+  const err = new Error('Python request was cancelled');
+  err.name = 'AbortError';
+  return err;
+}
+
+class PythonWorkerPool {
+  /**
+   * @param {object} opts
+   * @param {number} opts.size - number of worker processes
+   * @param {string} opts.pythonBin
+   * @param {() => object} opts.buildEnv - env for each (re)spawned worker
+   */
+  constructor({ size, pythonBin, buildEnv }) {
+    this.size = Math.max(1, size);
+    this.pythonBin = pythonBin;
+    this.buildEnv = buildEnv;
+    this.workers = [];
+    this.queue = [];
+    this.nextId = 1;
+    this.closed = false;
+    this.spawnError = null;
+    this.counters = { requests: 0, crashes: 0, restarts: 0, cancelled: 0 };
+    for (let i = 0; i < this.size; i++) {
+      this.workers.push(this._spawn(i));
+    }
+  }
+
+  _spawn(slot) {
+    const proc = spawn(this.pythonBin, [WORKER_SCRIPT], {
+      env: this.buildEnv(),
+      cwd: path.dirname(WORKER_SCRIPT),
+    });
+    const worker = {
+      slot,
+      proc,
+      ready: false,
+      concurrency: 1,
+      jobs: new Map(),
+      stderr: '',
+      failures: 0,
+      transport: null,
+      hedging: null,
+      stdinFailed: false,
+    };
+
+    readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+      this._onFrame(worker, line);
+    });
+
+    proc.stderr.on('data', (chunk) => {
+      const text = chunk.toString();
+      // Keep only the tail; it is attached to errors for jobs on this worker.
+      worker.stderr = (worker.stderr + text).slice(-4000);
+      if (process.env.DEBUG === 'True') {
+        console.error(`[python worker ${slot}] stderr:`, text);
+      }
+    });
+
+    proc.on('error', (err) => {
+      if (err.code === 'ENOENT') {
+        // No point respawning; fail everything now and later with the same message.
+        this.spawnError = new Error(
+          `Python executable not found ("${this.pythonBin}"). Install Python 3.9+ or set PYTHON_PATH in .env`
+        );
+        this.close(this.spawnError);
+      } else {
+        console.error(`[python worker ${slot}] error:`, err.message);
+      }
+    });
+
+    proc.stdin.on('error', (err) => {
+      // EPIPE and friends: the worker died or closed stdin under a write. Unhandled, this
+      // would take the server down; treat it as a crash so 'exit' rejects its jobs and respawns.
+      if (worker.stdinFailed) return;
+      worker.stdinFailed = true;
+      worker.ready = false;
+      console.error(`[python worker ${slot}] stdin error:`, err.message);
+      proc.kill();
+    });
+
+    proc.on('exit', (code, signal) => this._onExit(worker, code, signal));
+    return worker;
+  }
+
+  _onFrame(worker, line) {
+    let frame;
+    try {
+      frame = JSON.parse(line);
+    } catch {
+      console.error(`[python worker ${worker.slot}] malformed frame:`, line.slice(0, 200));
+      return;
+    }
+
+    if (frame.ready) {
+      worker.ready = true;
+      worker.concurrency = Math.max(1, frame.concurrency || 1);
+      worker.failures = 0;
+      this._drain();
+      return;
+    }
+
+    if (frame.transport) {
+      worker.transport = frame.transport;
+    }
+    if (frame.hedging) {
+      worker.hedging = frame.hedging;
+    }
+    const job = worker.jobs.get(frame.id);
+    if (!job) return; // cancelled: already rejected
+    this._finish(worker, job);
+
+    const stderr = worker.stderr;
+    if (worker.jobs.size === 0) worker.stderr = '';
+    if (typeof frame.stdout === 'string') {
+      job.resolve({ stdout: frame.stdout, stderr });
+    } else {
+      const err = new Error(frame.error || 'Python worker returned no output');
+      err.stderr = stderr;
+      job.reject(err);
+    }
+    this._drain();
+  }
+
+  _finish(worker, job) {
+    worker.jobs.delete(job.id);
+    if (job.signal) job.signal.removeEventListener('abort', job.onAbort);
+  }
+
+  _onExit(worker, code, signal) {
+    const jobs = [...worker.jobs.values()];
+    worker.ready = false;
+    if (jobs.length > 0) {
+      this.counters.crashes += 1;
+      for (const job of jobs) {
+        this._finish(worker, job);
+        const err = new Error(worker.stderr.trim() || `Python worker exited (${signal || code})`);
+        err.code = code;
+        err.stderr = worker.stderr;
+        job.reject(err);
+      }
+    }
+    if (this.closed) return;
+
+    worker.failures += 1;
+    const delay = Math.min(RESTART_DELAY_MS * 2 ** (worker.failures - 1), MAX_RESTART_DELAY_MS);
+    setTimeout(() => {
+      if (this.closed) return;
+      this.counters.restarts += 1;
+      const fresh = this._spawn(worker.slot);
+      fresh.failures = worker.failures;
+      this.workers[worker.slot] = fresh;
+    }, delay);
+  }
+
+  _leastLoaded() {
+    let best = null;
+    for (const w of this.workers) {
+      if (!w.ready || w.jobs.size >= w.concurrency) continue;
+      if (!best || w.jobs.size < best.jobs.size) best = w;
+    }
+    return best;
+  }
+
+  _drain() {
+    while (this.queue.length > 0) {
+      const worker = this._leastLoaded();
+      if (!worker) return;
+      const job = this.queue.shift();
+      job.worker = worker;
+      worker.jobs.set(job.id, job);
+      worker.proc.stdin.write(
+        `${JSON.stringify({ id: job.id, script: job.scriptFile, payload: job.payload })}\n`
+      );
+    }
+  }
+
+  _abort(job) {
+    const queued = this.queue.indexOf(job);
+    if (queued !== -1) {
+      this.queue.splice(queued, 1);
+    } else if (job.worker && job.worker.jobs.get(job.id) === job) {
+      this._finish(job.worker, job);
+      job.worker.proc.stdin.write(`${JSON.stringify({ id: job.id, cancel: true })}\n`);
+      this._drain();
+    } else {
+      return; // already settled
+    }
+    this.counters.cancelled += 1;
+    job.reject(abortError());
+  }
+
+  /**
+   * Same contract as runPythonScript: resolves { stdout, stderr } with the script's JSON output.
+   * @param {object} [opts]
+   * @param {AbortSignal} [opts.signal] - abort to drop the request (e.g. client disconnected)
+   */
+  run(scriptFile, payload, { signal } = {}) {
+    if (this.closed) {
+      return Promise.reject(this.spawnError || new Error('Python worker pool is closed'));
+    }
+    this.counters.requests += 1;
+    return new Promise((resolve, reject) => {
+      const job = { id: this.nextId++, scriptFile, payload, resolve, reject, worker: null, signal };
+      if (signal) {
+        if (signal.aborted) {
+          this.counters.cancelled += 1;
+          reject(abortError());
+          return;
+        }
+        job.onAbort = () => this._abort(job);
+        signal.addEventListener('abort', job.onAbort, { once: true });
+      }
+      this.queue.push(job);
+      this._drain();
+    });
+  }
+
+  stats() {
+    // Connection-reuse counters from http_transport, summed over live workers.
+    const transport = { requests: 0, connections_opened: 0, connections_reused: 0 };
+    // Hedged-request counters from async_client, summed the same way.
+    const hedging = { attempts: 0, hedged: 0, hedge_wins: 0 };
+    for (const w of this.workers) {
+      for (const [totals, counts] of [[transport, w.transport], [hedging, w.hedging]]) {
+        if (!counts) continue;
+        for (const key of Object.keys(totals)) {
+          totals[key] += counts[key] || 0;
+        }
+      }
+    }
+    hedging.hedge_rate = hedging.attempts ? +(hedging.hedged / hedging.attempts).toFixed(3) : 0;
+    return {
+      size: this.size,
+      ready: this.workers.filter((w) => w.ready).length,
+      busy: this.workers.filter((w) => w.jobs.size > 0).length,
+      inFlight: this.workers.reduce((n, w) => n + w.jobs.size, 0),
+      queued: this.queue.length,
+      ...this.counters,
+      transport,
+      hedging,
+    };
+  }
+
+  close(reason = new Error('Python worker pool is closed')) {
+    this.closed = true;
+    for (const w of this.workers) {
+      for (const job of [...w.jobs.values()]) {
+        this._finish(w, job);
+        job.reject(reason);
+      }
+      w.proc.kill();
+    }
+    for (const job of this.queue.splice(0)) {
+      if (job.signal) job.signal.removeEventListener('abort', job.onAbort);
+      job.reject(reason);
+    }
+  }
+}
+
+module.exports = { PythonWorkerPool };
@@ -0,0 +1,355 @@
+"""
+Asyncio engine for OpenRouter chat completions.
+
+Every completion in the process runs as a task on one event loop that lives in
+a background thread, so a single worker can keep many calls in flight:
+
+  * a global semaphore caps concurrent HTTP attempts (OPENROUTER_MAX_IN_FLIGHT);
+  * backoff between retries (retry_policy: Retry-After, jitter, shared budget)
+    is ``await asyncio.sleep`` — a waiting call holds neither a thread nor a
+    semaphore slot;
+  * each call has a deadline covering all of its attempts;
+  * calls started under a RequestScope are cancelled together when the scope
+    is cancelled (worker.py does this when Node reports a disconnected caller);
+  * opt-in hedging: if an attempt has not answered within the model's recent
+    p90 latency (model_health), a second request goes to the same or a
+    fallback model; the first success wins and the other is cancelled.
+
+The HTTP attempt itself is the blocking pooled session from http_transport run
+on a dedicated thread pool, so connection reuse and its counters are shared with
+the synchronous paths. A cancelled call stops waiting at once; an attempt that
+is already on the wire finishes in its thread and its result is discarded.
+
+Sync code (the script entry points) calls ``run(coro)``:
+
+    result = async_client.run(async_client.complete(headers, payload, log=_debug))
+    texts  = async_client.run(async_client.gather_limited(coros, limit=4))
+
+Environment Variables:
+    OPENROUTER_MAX_IN_FLIGHT  — Optional. Concurrent HTTP attempts per process (default: pool size).
+    OPENROUTER_DEADLINE       — Optional. Default per-call deadline in seconds, retries included (default: 120).
+    OPENROUTER_HEDGE          — Optional. "1" hedges every call by default (per-request "hedge" overrides).
+    OPENROUTER_HEDGE_QUANTILE — Optional. Latency quantile that triggers the hedge (default: 0.9).
+    OPENROUTER_HEDGE_MIN_DELAY     — Optional. Never hedge sooner than this, in seconds (default: 1).
+    OPENROUTER_HEDGE_DEFAULT_DELAY — Optional. Hedge delay until a model has latency history (default: 10).
+    OPENROUTER_HEDGE_TARGET   — Optional. "same" model or "fallback" (fastest healthy assigned model) (default: same).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterable, List, Optional, TypeVar
+
+import requests
+
+import http_transport
+import model_health
+from retry_policy import Backoff, retry_after_seconds
+from openrouter_response import extract_assistant_text
+
+MAX_IN_FLIGHT    = int(os.getenv("OPENROUTER_MAX_IN_FLIGHT", http_transport.POOL_SIZE))
+DEFAULT_DEADLINE = float(os.getenv("OPENROUTER_DEADLINE", 120))
+
+HEDGE_DEFAULT       = os.getenv("OPENROUTER_HEDGE") == "1"
+HEDGE_QUANTILE      = float(os.getenv("OPENROUTER_HEDGE_QUANTILE", 0.9))
+HEDGE_MIN_DELAY     = float(os.getenv("OPENROUTER_HEDGE_MIN_DELAY", 1))
+HEDGE_DEFAULT_DELAY = float(os.getenv("OPENROUTER_HEDGE_DEFAULT_DELAY", 10))
+HEDGE_TARGET        = os.getenv("OPENROUTER_HEDGE_TARGET", "same")
+
+T = TypeVar("T")
+
+
+class RequestCancelled(BaseException):
+    """Raised by run() when the enclosing RequestScope was cancelled.
+
+    A BaseException, like asyncio.CancelledError, so the scripts' broad
+    ``except Exception`` handlers don't turn a cancellation into an error reply.
+    """
+
+
+@dataclass
+class Completion:
+    """Outcome of complete(): the last attempt's status and body, or why none succeeded."""
+    status: Optional[int] = None      # HTTP status of the last attempt (None: no response)
+    data: Optional[dict] = None       # parsed JSON body of a 200
+    content: Optional[str] = None     # extract_assistant_text(data)
+    text: str = ""                    # raw body of a non-200 response
+    error: Optional[str] = None       # transport error / deadline, when status is None
+    retry_after: Optional[float] = None  # seconds the server asked us to wait (429/503)
+    hedge: Optional[dict] = None      # {"winner", "model", "delay"} when a hedge was sent
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and self.data is not None
+
+
+# ---------------------------------------------------------------------------
+# Engine loop
+# ---------------------------------------------------------------------------
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_semaphore: Optional[asyncio.Semaphore] = None
+_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=MAX_IN_FLIGHT, thread_name_prefix="openrouter"
+)
+_local = threading.local()
+
+_hedge_stats_lock = threading.Lock()
+_hedge_stats = {"attempts": 0, "hedged": 0, "hedge_wins": 0}
+
+
+def _engine_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="async-client", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def _in_flight() -> asyncio.Semaphore:
+    # Created on first use, inside the engine loop.
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return _semaphore
+
+
+class RequestScope:
+    """
+    Groups the run() calls a thread makes while handling one request.
+
+        with RequestScope() as scope:   # worker thread
+            handler(payload)
+        scope.cancel()                  # any thread: abort every call in the scope
+    """
+
+    def __init__(self) -> None:
+        self._futures: set = set()
+        self._lock = threading.Lock()
+        self.cancelled = False
+
+    def __enter__(self) -> "RequestScope":
+        _local.scope = self
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _local.scope = None
+
+    def _track(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            if self.cancelled:
+                future.cancel()
+            self._futures.add(future)
+
+    def _untrack(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+
+def run(coro: Awaitable[T]) -> T:
+    """Run coro on the engine loop and block the calling thread for its result."""
+    scope: Optional[RequestScope] = getattr(_local, "scope", None)
+    if scope is not None and scope.cancelled:
+        coro.close()
+        raise RequestCancelled()
+    future = asyncio.run_coroutine_threadsafe(coro, _engine_loop())
+    if scope is not None:
+        scope._track(future)
+    try:
+        return future.result()
+    except concurrent.futures.CancelledError:
+        raise RequestCancelled() from None
+    finally:
+        if scope is not None:
+            scope._untrack(future)
+
+
+async def gather_limited(coros: Iterable[Awaitable[T]], limit: int) -> List[T]:
+    """asyncio.gather with at most `limit` of these coroutines running at once."""
+    gate = asyncio.Semaphore(max(1, limit))
+
+    async def _gated(coro: Awaitable[T]) -> T:
+        async with gate:
+            return await coro
+
+    return await asyncio.gather(*(_gated(c) for c in coros))
+
+
+def hedge_stats() -> dict:
+    """Hedging counters for this process: attempts eligible, hedges sent, hedges that won."""
+    with _hedge_stats_lock:
+        stats = dict(_hedge_stats)
+    stats["hedge_rate"] = round(stats["hedged"] / stats["attempts"], 3) if stats["attempts"] else 0.0
+    return stats
+
+
+def _count_hedge(key: str) -> None:
+    with _hedge_stats_lock:
+        _hedge_stats[key] += 1
+
+
+# ---------------------------------------------------------------------------
+# Completions
+# ---------------------------------------------------------------------------
+
+def _blocking_attempt(url: str, headers: dict, payload: dict, read_timeout: float) -> Completion:
+    started = time.monotonic()
+    try:
+        resp = http_transport.post(url, headers=headers, json=payload, read_timeout=read_timeout)
+    except requests.RequestException:
+        model_health.record(payload.get("model"), None, time.monotonic() - started)
+        raise
+    model_health.record(payload.get("model"), resp.status_code, time.monotonic() - started)
+    if resp.status_code != 200:
+        return Completion(
+            status=resp.status_code,
+            text=resp.text or "",
+            retry_after=retry_after_seconds(resp.headers),
+        )
+    data = resp.json()
+    return Completion(status=200, data=data, content=extract_assistant_text(data))
+
+
+async def _single(url: str, headers: dict, payload: dict, timeout: float) -> Completion:
+    loop = asyncio.get_running_loop()
+    async with _in_flight():
+        return await loop.run_in_executor(_executor, _blocking_attempt, url, headers, payload, timeout)
+
+
+def _hedge_plan(model: str) -> tuple:
+    """(delay in seconds, model for the hedge) — reads model_health's shared state."""
+    observed = model_health.latency_quantile(model, HEDGE_QUANTILE)
+    delay = HEDGE_DEFAULT_DELAY if observed is None else max(HEDGE_MIN_DELAY, observed)
+    target = model
+    if HEDGE_TARGET == "fallback":
+        target = model_health.fallback_model(model) or model
+    return delay, target
+
+
+async def _hedged(url: str, headers: dict, payload: dict, timeout: float, log) -> Completion:
+    """One attempt, plus a second request if the first is slower than the model's p90."""
+    loop = asyncio.get_running_loop()
+    _count_hedge("attempts")
+    delay, target = await loop.run_in_executor(None, _hedge_plan, payload.get("model") or "")
+
+    primary = asyncio.ensure_future(_single(url, headers, payload, timeout))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    log(f"No answer after {delay:.1f}s; hedging to {target}")
+    _count_hedge("hedged")
+    hedge_payload = payload if target == payload.get("model") else {**payload, "model": target}
+    hedge = asyncio.ensure_future(_single(url, headers, hedge_payload, timeout))
+    pending = {primary, hedge}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result().ok:
+                    winner = "hedge" if task is hedge else "primary"
+                    if winner == "hedge":
+                        _count_hedge("hedge_wins")
+                    log(f"Hedged attempt won by the {winner} request.")
+                    result = task.result()
+                    result.hedge = {
+                        "winner": winner,
+                        "model": hedge_payload.get("model") if winner == "hedge" else payload.get("model"),
+                        "delay": round(delay, 2),
+                    }
+                    return result
+        # Neither succeeded: report the primary's outcome.
+        return primary.result()
+    finally:
+        # The loser's thread finishes its read in the background; its result is dropped.
+        for task in (primary, hedge):
+            task.cancel()
+
+
+async def complete(
+    headers: dict,
+    payload: dict,
+    *,
+    url: str = http_transport.OPENROUTER_API_URL,
+    read_timeout: float = 60,
+    max_retries: int = 3,
+    base_delay: float = 2.0,
+    retry_unexpected: bool = True,
+    deadline: Optional[float] = None,
+    hedge: Optional[bool] = None,
+    log: Callable[[str], None] = lambda msg: None,
+) -> Completion:
+    """
+    POST one chat completion, retrying under retry_policy.
+
+    429s, timeouts, connection errors and undecodable 200s are retried; 401/404
+    stop at once; other statuses are retried only if retry_unexpected. Returns
+    the last attempt's Completion — callers map status/text/error to their own
+    error replies. The deadline (default OPENROUTER_DEADLINE) bounds all attempts
+    and backoff together. hedge=None follows OPENROUTER_HEDGE.
+    """
+    loop = asyncio.get_running_loop()
+    hedging = HEDGE_DEFAULT if hedge is None else bool(hedge)
+    budget = DEFAULT_DEADLINE if deadline is None else deadline
+    ends_at = loop.time() + budget
+
+    async def _attempts() -> Completion:
+        backoff = Backoff(base_delay)
+        result = Completion()
+        for attempt in range(1, max_retries + 1):
+            log(f"API attempt {attempt}/{max_retries}")
+            timeout = max(0.1, min(read_timeout, ends_at - loop.time()))
+            try:
+                if hedging:
+                    result = await _hedged(url, headers, payload, timeout, log)
+                else:
+                    result = await _single(url, headers, payload, timeout)
+                log(f"Status: {result.status}")
+                if result.ok:
+                    return result
+                if result.status in (401, 404):
+                    log(f"Fatal HTTP {result.status}: {result.text[:500]}")
+                    return result
+                if result.status == 429:
+                    log("Rate limited.")
+                elif result.status == 200:
+                    log("Response body was not valid JSON.")
+                else:
+                    log(f"Unexpected {result.status}: {result.text[:500]}")
+                    if not retry_unexpected:
+                        return result
+            except requests.Timeout:
+                log(f"Timeout on attempt {attempt}.")
+                result = Completion(error="Request timed out")
+            except (requests.RequestException, ValueError) as exc:
+                log(f"Request error: {exc}")
+                result = Completion(error=str(exc))
+
+            if attempt < max_retries:
+                delay = backoff.next_delay(result.retry_after)
+                if delay is None:
+                    break
+                log(f"Retrying in {delay:.1f}s …")
+                await asyncio.sleep(delay)
+        return result
+
+    try:
+        return await asyncio.wait_for(_attempts(), timeout=budget)
+    except asyncio.TimeoutError:
+        log(f"Deadline of {budget}s exceeded.")
+        return Completion(error=f"Deadline of {budget:g}s exceeded")
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""
+batch_analyze.py
+Run the utils analytics over a corpus of saved documents with a process pool.
+
+Documents are streamed from a JSONL file (one object per line with "content"
+or "text", and optionally "id"), from stdin ("-"), or from a directory tree
+(every file with one of --extensions; the id is the relative path). They are
+sent to a multiprocessing pool in chunks, with at most --window chunks in
+flight, and results are written in input order as JSONL. Memory use is bounded
+by the window, not by the corpus.
+
+Each input document is one output line:
+    {"offset": int, "id": str, "content_type": str, "content_metrics": {...},
+     "statistics": {...}, "quality_metrics": {...}, "key_topics": [...]}
+or  {"offset": int, "id": str, "error": str}
+
+"offset" is the document's position in the input. After each chunk is written
+and flushed, the next offset and the output size go to the checkpoint file
+(--checkpoint, default <output>.checkpoint). --resume truncates the output to
+the checkpointed size, skips that many documents and appends, so a killed run
+continues where it stopped and does not duplicate lines.
+
+statistics and quality_metrics come from text_analysis.analyze_response (the
+single pass behind enrich_ai_response; same dicts as analyze_response_statistics
+and evaluate_response_quality).
+
+Usage:
+    python batch_analyze.py corpus.jsonl -o results.jsonl
+    python batch_analyze.py docs/ -o results.jsonl --processes 8 --resume
+    cat corpus.jsonl | python batch_analyze.py - --analyses metrics,topics > results.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+ANALYSES = ("content_type", "metrics", "statistics", "quality", "topics")
+
+# (offset, id, content or None, path or None)
+Doc = Tuple[int, str, Optional[str], Optional[str]]
+
+
+def _debug(msg: str) -> None:
+    print(f"[batch_analyze] {msg}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Input
+# ---------------------------------------------------------------------------
+
+def _iter_jsonl(stream) -> Iterator[Doc]:
+    for offset, line in enumerate(stream):
+        try:
+            record = json.loads(line)
+            content = record.get("content", record.get("text"))
+            doc_id = str(record.get("id", offset))
+        except (ValueError, AttributeError):
+            yield offset, str(offset), None, None  # reported as an error by the worker
+            continue
+        yield offset, doc_id, content if isinstance(content, str) else None, None
+
+
+def _iter_directory(root: str, extensions: Tuple[str, ...]) -> Iterator[Doc]:
+    offset = 0
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()  # deterministic order, so offsets survive a resume
+        for name in sorted(filenames):
+            if extensions and not name.lower().endswith(extensions):
+                continue
+            path = os.path.join(dirpath, name)
+            yield offset, os.path.relpath(path, root), None, path
+            offset += 1
+
+
+def iter_documents(source: str, extensions: Tuple[str, ...] = (".txt", ".md")) -> Iterator[Doc]:
+    """Documents from a JSONL file, "-" (stdin JSONL) or a directory, in a stable order."""
+    if source == "-":
+        yield from _iter_jsonl(sys.stdin)
+    elif os.path.isdir(source):
+        yield from _iter_directory(source, extensions)
+    else:
+        with open(source, encoding="utf-8") as fh:
+            yield from _iter_jsonl(fh)
+
+
+# ---------------------------------------------------------------------------
+# Pool side
+# ---------------------------------------------------------------------------
+
+_analyses: Tuple[str, ...] = ANALYSES
+
+
+def _init_worker(analyses: Tuple[str, ...]) -> None:
+    global _analyses
+    _analyses = analyses
+    import utils  # noqa: F401 — pay the import once per process, not per chunk
+    if "statistics" in analyses or "quality" in analyses:
+        import text_analysis  # noqa: F401
+
+
+def analyze_document(content: str, analyses: Tuple[str, ...] = ANALYSES) -> dict:
+    """The selected analyses for one document."""
+    from utils import analyze_content_metrics, detect_content_type, extract_key_topics
+
+    result: dict = {}
+    if "content_type" in analyses:
+        result["content_type"] = detect_content_type(content)
+    if "metrics" in analyses:
+        result["content_metrics"] = analyze_content_metrics(content)
+    if "statistics" in analyses or "quality" in analyses:
+        from text_analysis import analyze_response
+
+        _, stats, quality = analyze_response(content)
+        if "statistics" in analyses:
+            result["statistics"] = stats
+        if "quality" in analyses:
+            result["quality_metrics"] = quality
+    if "topics" in analyses:
+        result["key_topics"] = extract_key_topics(content)
+    return result
+
+
+def _analyze_one(doc: Doc) -> dict:
+    offset, doc_id, content, path = doc
+    out: dict = {"offset": offset, "id": doc_id}
+    try:
+        if path is not None:
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                content = fh.read()
+        if content is None:
+            out["error"] = "Invalid record: expected a JSON object with a string \"content\" or \"text\"."
+        else:
+            out.update(analyze_document(content, _analyses))
+    except Exception as exc:  # one bad document must not end the batch
+        out["error"] = f"{type(exc).__name__}: {exc}"
+    return out
+
+
+def _analyze_chunk(docs: List[Doc]) -> Tuple[str, int]:
+    """Analyze a chunk; returns (its output lines, already serialized, error count)."""
+    results = [_analyze_one(doc) for doc in docs]
+    lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in results)
+    return lines, sum(1 for r in results if "error" in r)
+
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def _read_checkpoint(path: str) -> Optional[dict]:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path: str, state: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def run(
+    source: str,
+    output: Optional[str],
+    *,
+    processes: int,
+    chunk_size: int = 64,
+    window: Optional[int] = None,
+    analyses: Tuple[str, ...] = ANALYSES,
+    extensions: Tuple[str, ...] = (".txt", ".md"),
+    checkpoint: Optional[str] = None,
+    resume: bool = False,
+    limit: Optional[int] = None,
+) -> dict:
+    """
+    Analyze every document in source and write JSONL to output (stdout if None).
+
+    Returns:
+        {"documents", "errors", "skipped", "elapsed_s", "docs_per_s"} for this run.
+    """
+    window = window or processes * 2
+    source_key = source if source == "-" else os.path.abspath(source)
+    if output is not None and checkpoint is None:
+        checkpoint = f"{output}.checkpoint"
+
+    start_offset, output_bytes = 0, 0
+    if resume:
+        if output is None or checkpoint is None:
+            raise ValueError("--resume needs --output (and a checkpoint file).")
+        state = _read_checkpoint(checkpoint)
+        if state is not None:
+            if state.get("input") != source_key:
+                raise ValueError(f"Checkpoint {checkpoint} is for {state.get('input')}, not {source_key}.")
+            start_offset, output_bytes = int(state["next_offset"]), int(state["output_bytes"])
+            _debug(f"Resuming at offset {start_offset} ({output_bytes} bytes written).")
+
+    if output is None:
+        out_fh = sys.stdout
+    else:
+        out_fh = open(output, "r+" if resume and os.path.exists(output) else "w", encoding="utf-8")
+        out_fh.truncate(output_bytes)  # drop lines written after the last checkpoint
+        out_fh.seek(output_bytes)
+
+    docs = itertools.islice(iter_documents(source, extensions), start_offset, None)
+    if limit is not None:
+        docs = itertools.islice(docs, limit)
+
+    counts = {"documents": 0, "errors": 0, "skipped": start_offset}
+    started = time.monotonic()
+    pending: collections.deque = collections.deque()  # (AsyncResult, next offset)
+
+    def _drain_one() -> None:
+        async_result, next_offset = pending.popleft()
+        lines, errors = async_result.get()
+        out_fh.write(lines)
+        out_fh.flush()
+        counts["documents"] += lines.count("\n")
+        counts["errors"] += errors
+        if checkpoint is not None and output is not None:
+            _write_checkpoint(checkpoint, {
+                "input": source_key,
+                "next_offset": next_offset,
+                "output_bytes": out_fh.tell(),
+            })
+
+    try:
+        with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(analyses,)) as pool:
+            while True:
+                chunk = list(itertools.islice(docs, chunk_size))
+                if not chunk:
+                    break
+                pending.append((pool.apply_async(_analyze_chunk, (chunk,)), chunk[-1][0] + 1))
+                if len(pending) >= window:
+                    _drain_one()
+            while pending:
+                _drain_one()
+    finally:
+        if out_fh is not sys.stdout:
+            out_fh.close()
+
+    elapsed = time.monotonic() - started
+    counts["elapsed_s"] = round(elapsed, 2)
+    counts["docs_per_s"] = round(counts["documents"] / elapsed, 1) if elapsed > 0 else None
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the utils analytics over a document corpus.")
+    parser.add_argument("source", help="JSONL file, directory, or - for JSONL on stdin")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout, no checkpoint)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=64, help="documents per pool task")
+    parser.add_argument("--window", type=int, help="chunks in flight (default: 2 x processes)")
+    parser.add_argument("--analyses", default=",".join(ANALYSES),
+                        help=f"comma-separated subset of {','.join(ANALYSES)}")
+    parser.add_argument("--extensions", default=".txt,.md", help="file suffixes read from a directory")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--limit", type=int, help="stop after this many documents")
+    args = parser.parse_args()
+
+    analyses = tuple(a.strip() for a in args.analyses.split(",") if a.strip())
+    unknown = set(analyses) - set(ANALYSES)
+    if unknown:
+        parser.error(f"unknown analyses: {', '.join(sorted(unknown))}")
+    extensions = tuple(e.strip().lower() for e in args.extensions.split(",") if e.strip())
+
+    try:
+        summary = run(
+            args.source,
+            args.output,
+            processes=max(1, args.processes),
+            chunk_size=max(1, args.chunk_size),
+            window=args.window,
+            analyses=analyses,
+            extensions=extensions,
+            checkpoint=args.checkpoint,
+            resume=args.resume,
+            limit=args.limit,
+        )
+    except (OSError, ValueError) as exc:
+        print(json.dumps({"error": str(exc)}))
+        sys.exit(1)
+    except KeyboardInterrupt:
+        _debug("Interrupted; rerun with --resume to continue from the checkpoint.")
+        sys.exit(130)
+    _debug(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
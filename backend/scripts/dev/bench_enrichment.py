@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Check that text_analysis.analyze_response matches the three utils functions it
+replaces inside enrich_ai_response, and time both on progressively longer responses.
+
+Usage (from backend/scripts):
+    python dev/bench_enrichment.py [--cases 300] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_analysis import analyze_response
+from utils import analyze_response_statistics, evaluate_response_quality, parse_structured_response
+
+_WORDS = (
+    "the writer should explain because reason therefore thus hence due to step guide how to "
+    "follow process analyze analysis evaluate compare contrast recommend suggest best better "
+    "improve however moreover in addition consequently nevertheless I we our they it their "
+    "draft sentence paragraph reader clarity tone voice example evidence"
+).split()
+
+_LINE_KINDS = ("prose", "prose", "prose", "header", "caps", "numbered", "bullet", "kv", "code", "blank")
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(3, 28))]
+    if rng.random() < 0.5:
+        words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice([".", ".", "!", "?", ""])
+
+
+def _response(rng, lines):
+    out = []
+    for _ in range(lines):
+        kind = rng.choice(_LINE_KINDS)
+        if kind == "prose":
+            out.append(" ".join(_sentence(rng) for _ in range(rng.randint(1, 4))))
+        elif kind == "header":
+            out.append("#" * rng.randint(1, 3) + " " + _sentence(rng))
+        elif kind == "caps":
+            out.append(rng.choice(["SUMMARY:", "NEXT STEPS:", "KEY POINTS: " + _sentence(rng)]))
+        elif kind == "numbered":
+            out.extend(f"{i}. {_sentence(rng)}" for i in range(1, rng.randint(2, 5)))
+        elif kind == "bullet":
+            out.extend(f"{rng.choice('*-+')} {_sentence(rng)}" for _ in range(rng.randint(1, 4)))
+        elif kind == "kv":
+            out.append(f"{rng.choice(['Status', 'OWNER', 'dueDate', 'note_1'])}: {_sentence(rng)}")
+        elif kind == "code":
+            out.append(f"```{rng.choice(['', 'python'])}\nprint('x')\nreturn 1\n```")
+        else:
+            out.append("")
+    return "\n".join(out)
+
+
+def _legacy(text, prompt):
+    return (
+        parse_structured_response(text),
+        analyze_response_statistics(text),
+        evaluate_response_quality(text, prompt),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(1234)
+    for i in range(args.cases):
+        text = _response(rng, rng.randint(0, 40))
+        prompt = _sentence(rng) if i % 3 else None
+        if analyze_response(text, prompt) != _legacy(text, prompt):
+            print(f"MISMATCH on case {i}:\n{text!r}", file=sys.stderr)
+            sys.exit(1)
+    print(f"OK: {args.cases} random responses produce identical dicts")
+
+    print(f"{'lines':>7} {'chars':>9} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for lines in (50, 200, 800, 3200):
+        text = _response(rng, lines)
+        prompt = _sentence(rng)
+        timings = []
+        for fn in (_legacy, analyze_response):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                fn(text, prompt)
+            timings.append((time.perf_counter() - start) / args.repeat * 1000)
+        print(f"{lines:>7} {len(text):>9} {timings[0]:>10.2f} {timings[1]:>15.2f} {timings[0] / timings[1]:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Check incremental_analysis.IncrementalAnalyzer against the from-scratch utils
+functions across random edit sequences, then time a one-word edit on documents
+of growing size.
+
+Content metrics and key topics are compared on arbitrary text. Statistics are
+compared on text whose paragraphs end in sentence punctuation, where splitting
+sentences per paragraph and over the whole document agree.
+
+Usage (from backend/scripts):
+    python dev/bench_incremental_analysis.py [--sequences 60] [--edits 40]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental_analysis import IncrementalAnalyzer
+from utils import analyze_content_metrics, analyze_response_statistics, extract_key_topics
+
+_WORDS = (
+    "the writer should explain because reason therefore step guide how to follow process "
+    "analyze evaluate compare recommend best improve draft sentence paragraph reader "
+    "clarity tone voice example evidence editor document history"
+).split()
+
+
+def _sentence(rng, clean):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(1, 14))]
+    words[0] = words[0].capitalize()
+    end = rng.choice([".", "!", "?"]) if clean else rng.choice([".", "!", "?", "", ",", "..."])
+    return " ".join(words) + end
+
+
+def _paragraph(rng, clean):
+    if not clean and rng.random() < 0.1:
+        return rng.choice(["", " ", "\n", "# Heading", "- item one"])
+    return " ".join(_sentence(rng, clean) for _ in range(rng.randint(2, 5)))
+
+
+def _edit(rng, paragraphs, clean):
+    op = rng.random()
+    if op < 0.4 and paragraphs:
+        i = rng.randrange(len(paragraphs))
+        words = paragraphs[i].split(" ")
+        word = rng.choice(_WORDS)
+        if clean:
+            # keep the punctuated last word, and capitalise so every sentence
+            # still starts upper-case
+            at, word = rng.randint(0, len(words) - 1), word.capitalize()
+        else:
+            at = rng.randint(0, len(words))
+        words.insert(at, word)
+        paragraphs[i] = " ".join(words)
+    elif op < 0.6:
+        paragraphs.insert(rng.randint(0, len(paragraphs)), _paragraph(rng, clean))
+    elif op < 0.75 and paragraphs:
+        del paragraphs[rng.randrange(len(paragraphs))]
+    elif op < 0.9 and paragraphs:
+        paragraphs.insert(rng.randint(0, len(paragraphs)), rng.choice(paragraphs))  # duplicate
+    elif paragraphs:
+        i, j = rng.randrange(len(paragraphs)), rng.randrange(len(paragraphs))
+        paragraphs[i], paragraphs[j] = paragraphs[j], paragraphs[i]
+
+
+def _check(result, text, clean, label):
+    expected = {
+        "content_metrics": analyze_content_metrics(text),
+        "key_topics": extract_key_topics(text),
+    }
+    if clean:
+        expected["statistics"] = analyze_response_statistics(text)
+    for name, value in expected.items():
+        if result[name] != value:
+            print(f"MISMATCH ({label}) in {name}:\n  got      {result[name]}\n  expected {value}\n"
+                  f"  text {text!r}", file=sys.stderr)
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sequences", type=int, default=60)
+    parser.add_argument("--edits", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for seq in range(args.sequences):
+        clean = seq % 2 == 0
+        analyzer = IncrementalAnalyzer(cache_size=rng.choice([0, 4, 64]))
+        paragraphs = [_paragraph(rng, clean) for _ in range(rng.randint(0, 8))]
+        for step in range(args.edits):
+            text = "\n\n".join(paragraphs)
+            _check(analyzer.analyze(text), text, clean, f"sequence {seq}, edit {step}")
+            _edit(rng, paragraphs, clean)
+    print(f"OK: {args.sequences} edit sequences x {args.edits} edits match the utils functions")
+
+    print(f"{'paragraphs':>10} {'chars':>9} {'full ms':>9} {'incremental ms':>15} {'speedup':>8}")
+    for count in (50, 200, 800, 3200):
+        paragraphs = [_paragraph(rng, True) for _ in range(count)]
+        analyzer = IncrementalAnalyzer()
+        analyzer.analyze("\n\n".join(paragraphs))
+
+        full = incremental = 0.0
+        edits = 20
+        for _ in range(edits):
+            _edit(rng, paragraphs, True)
+            text = "\n\n".join(paragraphs)
+            start = time.perf_counter()
+            analyze_content_metrics(text)
+            analyze_response_statistics(text)
+            extract_key_topics(text)
+            full += time.perf_counter() - start
+            start = time.perf_counter()
+            analyzer.analyze(text)
+            incremental += time.perf_counter() - start
+        full, incremental = full / edits * 1000, incremental / edits * 1000
+        print(f"{count:>10} {len(text):>9} {full:>9.2f} {incremental:>15.2f} {full / incremental:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
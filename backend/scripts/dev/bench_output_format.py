@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Compare the pretty and compact output formats (output_format.py): bytes on
+stdout, Python encode time, and decode time in Python and (if installed) Node,
+which is what parses the output in production.
+
+Runs generate_response and generate_suggestions in-process against
+dev/stub_openrouter.py, so the measured results are the scripts' real output.
+
+Usage (from backend/scripts):
+    python dev/bench_output_format.py [--reply-kb 4] [--repeat 200]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPTS_DIR)
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "dev"))
+
+from stub_openrouter import StubConfig, start_stub
+
+_NODE_PARSE = """
+const fs = require('fs');
+const text = fs.readFileSync(process.argv[1], 'utf8');
+const n = Number(process.argv[2]);
+for (let i = 0; i < 20; i++) JSON.parse(text);
+const t0 = process.hrtime.bigint();
+for (let i = 0; i < n; i++) JSON.parse(text);
+console.log(Number(process.hrtime.bigint() - t0) / 1e6 / n);
+"""
+
+
+def _per_call_ms(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / repeat
+
+
+def _node_parse_ms(text, repeat):
+    if not shutil.which("node"):
+        return None
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as fh:
+        fh.write(text)
+    try:
+        out = subprocess.run(["node", "-e", _NODE_PARSE, fh.name, str(repeat)],
+                             capture_output=True, text=True, check=True)
+        return float(out.stdout.strip())
+    finally:
+        os.unlink(fh.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pretty vs compact output size and codec time.")
+    parser.add_argument("--reply-kb", type=int, default=4, help="size of the stub's reply")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    stub = start_stub(StubConfig(latency_median=0.01, latency_sigma=0.0,
+                                 oversize_prob=1.0, oversize_kb=args.reply_kb))
+    state_dir = tempfile.mkdtemp(prefix="bench-output-")
+    os.environ.update({
+        "OPENROUTER_API_URL": stub.url,
+        "OPENROUTER_API_KEY": os.environ.get("OPENROUTER_API_KEY") or "sk-or-v1-bench",
+        "SUGGESTION_CACHE_DISABLE": "1",
+        "MODEL_HEALTH_PATH": os.path.join(state_dir, "model_health.json"),
+        "RETRY_BUDGET_PATH": os.path.join(state_dir, "retry_budget.json"),
+    })
+    import output_format
+    from generate_response import generate_response
+    from generate_suggestions import generate_suggestions
+
+    text = "Our team reviewed the quarterly numbers and thinks the budget should move. " * 12
+    cases = {
+        "generate_response": (generate_response, {"messages": [{"role": "user", "content": text}]}),
+        "generate_suggestions": (generate_suggestions, {"content": text, "documentType": "business"}),
+    }
+
+    print(f"{'script':<22} {'format':<8} {'bytes':>8} {'encode ms':>10} {'py decode ms':>13} {'node decode ms':>15}")
+    for script, (fn, payload) in cases.items():
+        for label, compact in (("pretty", False), ("compact", True)):
+            out = fn({**payload, "compact": compact})
+            result = json.loads(out)
+            if compact:
+                # render() only shapes the full result; re-encode from a pretty run
+                result = json.loads(fn({**payload, "compact": False}))
+            request = {"compact": compact}
+            encode_ms = _per_call_ms(lambda: output_format.render(result, request), args.repeat)
+            decode_ms = _per_call_ms(lambda: json.loads(out), args.repeat)
+            node_ms = _node_parse_ms(out, args.repeat)
+            node = "n/a" if node_ms is None else f"{node_ms:.3f}"
+            print(f"{script:<22} {label:<8} {len(out.encode('utf-8')):>8} {encode_ms:>10.3f} "
+                  f"{decode_ms:>13.3f} {node:>15}")
+    stub.shutdown()
+
+
+if __name__ == "__main__":
+    main()
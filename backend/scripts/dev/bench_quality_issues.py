@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Check that utils.identify_quality_issues flags the same issues as the original
+backtracking regexes, then time it on adversarial inputs at doubling sizes and
+fail if the runtime grows faster than linearly.
+
+Usage (from backend/scripts):
+    python dev/bench_quality_issues.py [--cases 2000] [--max-words 102400]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import identify_quality_issues
+
+_LEGACY_REPEAT = re.compile(r'(\b\w+\b)((?:\s+\w+){0,3}\s+\1\b){2,}', re.IGNORECASE)
+_LEGACY_CONTRAST = re.compile(
+    r'\b(however|but|although|yet)\b.*\b(however|but|although|yet)\b', re.IGNORECASE
+)
+
+_WORDS = "the The THE a yet But however although cat dog x X run runs".split()
+_GAPS = (" ", " ", " ", "  ", "\n", "\n\n", "\t", ", ", ". ", "-", "'")
+
+# name -> builder(n_words); each targets one of the former regexes' worst cases
+_ADVERSARIAL = {
+    "distinct words":     lambda n: " ".join(f"w{i}" for i in range(n)),
+    "near repeats":       lambda n: " ".join(("a b c d e " * (n // 5 + 1)).split()[:n]) + " !",
+    "one long word":      lambda n: "x" * (n * 5),
+    "long line, 1 but":   lambda n: "but " + "word " * n,
+    "many short lines":   lambda n: "\n".join("but word" for _ in range(n // 2)),
+    "contrast per para":  lambda n: "\n\n".join("however this. " + "filler " * 8 for _ in range(n // 10)),
+}
+
+
+def _legacy(text):
+    """The original repetition/contradiction checks, as two booleans."""
+    return bool(_LEGACY_REPEAT.search(text)), bool(_LEGACY_CONTRAST.search(text))
+
+
+def _current(text):
+    issues = identify_quality_issues(text)
+    return (
+        "Excessive word repetition detected" in issues,
+        "May contain logical inconsistencies or contradictions" in issues,
+    )
+
+
+def _random_text(rng):
+    out = []
+    for _ in range(rng.randint(0, 30)):
+        out.append(rng.choice(_WORDS))
+        out.append(rng.choice(_GAPS))
+    return "".join(out)
+
+
+def _time(fn, text, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--max-words", type=int, default=102400)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for i in range(args.cases):
+        text = _random_text(rng)
+        if _current(text) != _legacy(text):
+            print(f"MISMATCH on case {i}: {text!r} legacy={_legacy(text)} new={_current(text)}",
+                  file=sys.stderr)
+            sys.exit(1)
+    print(f"OK: {args.cases} random inputs flag the same issues as the legacy regexes")
+
+    sizes = []
+    n = 1600
+    while n <= args.max_words:
+        sizes.append(n)
+        n *= 2
+
+    superlinear = []
+    print(f"{'input':<20} " + " ".join(f"{s:>9}" for s in sizes) + "   (ms per call, by word count)")
+    for name, build in _ADVERSARIAL.items():
+        timings = [_time(identify_quality_issues, build(size)) for size in sizes]
+        print(f"{name:<20} " + " ".join(f"{t * 1000:>9.2f}" for t in timings))
+        # Doubling the input should roughly double the time; allow noise but not 4x.
+        for small, large in zip(timings, timings[1:]):
+            if small > 0.002 and large / small > 3.0:
+                superlinear.append(name)
+                break
+
+    if superlinear:
+        print(f"FAIL: superlinear growth on {', '.join(superlinear)}", file=sys.stderr)
+        sys.exit(1)
+    print("OK: every adversarial input scales linearly")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Time readability.score / readability.compare per sentence on generated text,
+with the syllable cache cold (first call on a vocabulary) and warm.
+
+Usage (from backend/scripts):
+    python dev/bench_readability.py [--sentences 2000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import readability
+
+_WORDS = (
+    "the team reviewed quarterly numbers and budget should be reallocated toward onboarding project "
+    "which has been delayed twice main risk is that its timeline depends on vendor we have not worked "
+    "with before organization communication responsibility was given written understood clearly "
+    "simple table people every business evening interest idea analysis recommendation"
+).split()
+
+
+def _text(rng, sentences):
+    out = []
+    for _ in range(sentences):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 30))]
+        words[0] = words[0].capitalize()
+        out.append(" ".join(words) + rng.choice([".", ".", "!", "?"]))
+    return " ".join(out)
+
+
+def _best_us(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="readability scoring throughput")
+    parser.add_argument("--sentences", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    text = _text(rng, args.sentences)
+    rewrite = _text(rng, args.sentences)
+    n = readability.score(text)["sentences"]
+
+    readability.count_syllables.cache_clear()
+    t0 = time.perf_counter()
+    readability.score(text)
+    cold_us = (time.perf_counter() - t0) * 1e6
+    warm_us = _best_us(lambda: readability.score(text), args.repeat)
+    compare_us = _best_us(lambda: readability.compare(text, rewrite), args.repeat)
+
+    print(f"{n} sentences, {len(text.split())} words")
+    print(f"score   cold cache: {cold_us / n:6.2f} us/sentence")
+    print(f"score   warm cache: {warm_us / n:6.2f} us/sentence")
+    print(f"compare (2 texts):  {compare_us / (2 * n):6.2f} us/sentence")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Time text_diff.diff_summary against document size, and compare the diff's JSON
+size with returning the whole rewrite, at a light edit rate (a typical
+readability pass over a selection) and for a full rewrite. Every diff is
+checked to round-trip through apply_edits.
+
+Usage (from backend/scripts):
+    python dev/bench_text_diff.py [--edit-rate 0.05] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import text_diff
+
+_WORDS = (
+    "the team reviewed quarterly numbers and budget should be reallocated toward onboarding project "
+    "which has been delayed twice main risk is that its timeline depends on vendor we have not worked"
+).split()
+
+
+def _sentence(rng):
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def _document(rng, sentences):
+    paragraphs = [" ".join(_sentence(rng) for _ in range(4)) for _ in range(max(1, sentences // 4))]
+    return "\n\n".join(paragraphs)
+
+
+def _edit(rng, text, rate):
+    """Rewrite, shorten or drop roughly rate of the sentences."""
+    out = []
+    for sentence in text.split(". "):
+        roll = rng.random()
+        if roll < rate / 3:
+            sentence = _sentence(rng).rstrip(".")
+        elif roll < 2 * rate / 3:
+            sentence = sentence.replace(" the ", " a ", 1) + " as planned"
+        elif roll < rate:
+            continue
+        out.append(sentence)
+    return ". ".join(out)
+
+
+def _best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="text_diff time and payload size")
+    parser.add_argument("--edit-rate", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    print(f"{'sentences':>9} {'doc KB':>7} {'case':<12} {'gran':<8} {'ms':>8} {'diff B':>9} {'full B':>9}")
+    for sentences in (200, 800, 3200, 12800):
+        original = _document(rng, sentences)
+        cases = (("edits", _edit(rng, original, args.edit_rate)), ("full rewrite", _document(rng, sentences)))
+        for label, rewrite in cases:
+            for granularity in text_diff.GRANULARITIES:
+                summary = text_diff.diff_summary(original, rewrite, granularity)
+                assert text_diff.apply_edits(original, summary["edits"]) == rewrite
+                ms = _best_ms(lambda: text_diff.diff_summary(original, rewrite, granularity), args.repeat)
+                print(f"{sentences:>9} {len(original) / 1024:>7.0f} {label:<12} {granularity:<8} {ms:>8.1f} "
+                      f"{len(json.dumps(summary)):>9} {len(json.dumps(rewrite)):>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Throughput of token_estimator on chat-sized messages, cold (every message new)
+and warm (a history re-counted on the next turn), and its accuracy against
+known token counts: reference texts with their cl100k_base (GPT-4) counts,
+next to what the old len(text) // 4 gave.
+
+Exits non-zero if cold throughput is below --target messages per second, if a
+kind's total is off by more than its tolerance, or if prose is not closer than
+len // 4.
+
+Usage (from backend/scripts):
+    python dev/bench_token_estimator.py [--messages 10000] [--target 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import token_estimator
+from token_estimator import estimate_message_tokens
+
+_PROSE = (
+    "I think the second paragraph reads better now but the opening still feels slow. "
+    "Could you tighten the intro and keep my voice? The report is due on Friday, "
+    "so a quick pass on clarity and tone would help a lot."
+).split()
+_CODE = [
+    "def handle(req):", "    return json.dumps({'ok': True})", "const total = items.reduce((a, b) => a + b, 0);",
+    "for (let i = 0; i < 1024; i++) {", "}", "SELECT id, name FROM users WHERE created_at > NOW();",
+]
+_CJK = "我们需要在周五之前完成这份报告请帮我检查语法和语气これは短いテストです"
+_CYRILLIC = "Пожалуйста проверьте этот абзац и сделайте его понятнее".split()
+
+# (text, cl100k_base token count) — counted with tiktoken; the estimator must stay close.
+_REF_PROSE = [
+    ('I think the second paragraph reads better now, but the opening still feels slow. Could you tighten the intro and keep my voice? The report is due on Friday, so a quick pass on clarity and tone would help a lot.', 46),
+    ("Honestly, I wasn't trusting the numbers at first. The team demonstrated that the new onboarding flow cut support tickets by almost a third, and the comprehension scores on the help articles went up too. Still, a few words in the summary sound stiff.", 51),
+    ("Dear Ms. Patel,\n\nThanks for sending the revised contract over so quickly. I've read through it twice and the payment terms look right to me. One question: the delivery date in section four says March, but we agreed on late April when we spoke last week. Could you check that before we sign?\n\nBest,\nJordan", 65),
+    ('The history of the printing press is usually told as a story about books, but its biggest effect may have been on how people argued. Once pamphlets were cheap, anyone with a grievance and a few coins could reach thousands of readers, and governments struggled to keep up.', 55),
+    ("We reviewed the quarterly results on Tuesday. Revenue grew eleven percent, mostly from the enterprise plan, while churn among small customers stayed flat. The main risk is that our largest vendor is changing its pricing next year, and we haven't modeled what that does to margins yet.", 54),
+    ('She walked down to the harbor before sunrise, when the fishing boats were still tied up and the gulls were arguing over scraps. Nobody else was awake. For a while she just stood there, listening to the water knock against the hulls, trying to remember why she had come back.', 58),
+    ("Can you make this sound less formal? It's for a team newsletter, not a legal document. People should be able to skim it in a minute and know what changed, what they need to do, and who to ask if something breaks.", 49),
+    ("Students often assume that longer essays earn better grades, but most instructors care more about whether the argument holds together. A clear thesis, evidence that actually supports it, and a conclusion that doesn't just repeat the introduction will do more than an extra page of filler.", 52),
+]
+_REF_CODE = [
+    ("def handle(request):\n    payload = json.loads(request.body)\n    if not payload.get('content'):\n        return {'error': 'No content provided.'}\n    return {'ok': True, 'length': len(payload['content'])}\n", 47),
+    ('const total = items.reduce((sum, item) => sum + item.price * item.quantity, 0);\nfor (let i = 0; i < results.length; i++) {\n  console.log(`${i}: ${results[i].name}`);\n}\n', 51),
+    ("SELECT id, name, created_at FROM users WHERE created_at > NOW() - INTERVAL '7 days' ORDER BY created_at DESC LIMIT 50;", 30),
+]
+_REF_CJK = [
+    ('我们需要在周五之前完成这份报告，请帮我检查语法和语气。', 25),
+    ('これは短いテストです。文章をもっと読みやすくしてください。', 23),
+]
+_REF_CYRILLIC = [
+    ('Пожалуйста, проверьте этот абзац и сделайте его понятнее для обычного читателя.', 38),
+]
+_REFERENCE = {  # kind -> (samples, tolerance on the kind's total)
+    "prose": (_REF_PROSE, 0.08),
+    "code": (_REF_CODE, 0.15),
+    "cjk": (_REF_CJK, 0.20),
+    "cyrillic": (_REF_CYRILLIC, 0.20),
+}
+
+
+def _message(rng, kind, i):
+    if kind == "prose":
+        text = " ".join(rng.choice(_PROSE) for _ in range(rng.randint(10, 120)))
+    elif kind == "code":
+        text = "\n".join(rng.choice(_CODE) for _ in range(rng.randint(3, 25)))
+    elif kind == "cjk":
+        text = "".join(rng.choice(_CJK) for _ in range(rng.randint(20, 200)))
+    else:
+        text = " ".join(rng.choice(_CYRILLIC) for _ in range(rng.randint(10, 80)))
+    # unique suffix so the cold pass never hits the memo
+    return {"role": rng.choice(["user", "assistant"]), "content": f"{text} #{i}"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=10000)
+    parser.add_argument("--target", type=int, default=10000)
+    parser.add_argument("--model", default="openai/gpt-4")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    kinds = ["prose"] * 6 + ["code"] * 2 + ["cjk", "cyrillic"]
+    messages = [_message(rng, rng.choice(kinds), i) for i in range(args.messages)]
+    token_estimator.estimate_tokens("warm up the vocabulary", args.model)
+
+    start = time.perf_counter()
+    cold_total = sum(estimate_message_tokens(m, args.model) for m in messages)
+    cold = time.perf_counter() - start
+
+    history = messages[-200:]
+    start = time.perf_counter()
+    for _ in range(50):
+        sum(estimate_message_tokens(m, args.model) for m in history)
+    warm = (time.perf_counter() - start) / (50 * len(history))
+
+    print(f"cold: {args.messages / cold:,.0f} messages/s ({cold_total:,} tokens)")
+    print(f"warm: {1 / warm:,.0f} messages/s (history re-counted each turn)")
+
+    failures = []
+    if args.messages / cold < args.target:
+        failures.append(f"below {args.target:,} messages/s")
+
+    print(f"\n{'kind':<10} {'cl100k':>7} {'estimator':>10} {'error':>7} {'len//4':>7} {'error':>7}")
+    for kind, (reference, tolerance) in _REFERENCE.items():
+        real = sum(count for _, count in reference)
+        est = sum(token_estimator.estimate_tokens(text, args.model) for text, _ in reference)
+        naive = sum(len(text) // 4 for text, _ in reference)
+        est_err, naive_err = est / real - 1, naive / real - 1
+        print(f"{kind:<10} {real:>7} {est:>10} {est_err:>+7.1%} {naive:>7} {naive_err:>+7.1%}")
+        if abs(est_err) > tolerance:
+            failures.append(f"{kind} off by {est_err:+.1%} (tolerance {tolerance:.0%})")
+        if kind == "prose" and abs(est_err) >= abs(naive_err):
+            failures.append(f"prose no closer than len//4 ({est_err:+.1%} vs {naive_err:+.1%})")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
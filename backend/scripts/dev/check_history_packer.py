@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Regression checks for history_packer.pack_history budget edge cases.
+
+  * the latest turn is kept whenever it fits the budget, even when the summary
+    reserve does not fit next to it (it used to be dropped for a truncation note);
+  * with room to spare, older turns collapse into a summary and the total stays
+    within the budget;
+  * a latest turn larger than the budget still falls back to the truncation note.
+
+Exits non-zero on any failed check.
+
+Usage (from backend/scripts):
+    python dev/check_history_packer.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_packer import TRUNCATION_NOTE, pack_history
+from token_estimator import estimate_message_tokens
+
+MODEL = "openai/gpt-4o-mini"
+_failures = 0
+
+
+def _check(name, ok, detail=""):
+    global _failures
+    print(f"{'PASS' if ok else 'FAIL'}  {name}{'' if ok else f' — {detail}'}")
+    _failures += not ok
+
+
+def _text(words):
+    return " ".join(f"word{i % 50} is here." for i in range(words // 3))
+
+
+def main():
+    system = {"role": "system", "content": _text(700)}
+    older = [
+        {"role": "user", "content": _text(1200)},
+        {"role": "assistant", "content": _text(1200)},
+        {"role": "assistant", "content": "Sure, send it over."},
+    ]
+    latest = {"role": "user", "content": _text(1700)}
+    history = [*older, latest]
+    base = estimate_message_tokens(system, MODEL) + estimate_message_tokens(latest, MODEL)
+
+    # Latest turn fits the budget, but not next to the summary reserve.
+    budget = base + 60
+    packed, info = pack_history(history, system, MODEL, budget)
+    _check("latest turn kept when only the summary reserve overflows",
+           packed[-1] is latest and info["kept"] >= 1, f"{info}, last={packed[-1]['content'][:40]!r}")
+    _check("  total within budget", info["tokens"] < budget, f"{info['tokens']} >= {budget}")
+    _check("  no truncation note", all(m["content"] != TRUNCATION_NOTE for m in packed))
+
+    # Plenty of room: summary plus recent turns, within budget.
+    budget = base + 800
+    packed, info = pack_history(history, system, MODEL, budget)
+    _check("summary added when it fits", info["summarized"] > 0 and packed[-1] is latest, str(info))
+    _check("  total within budget", info["tokens"] < budget, f"{info['tokens']} >= {budget}")
+
+    # Latest turn alone is over budget: truncation note, as before.
+    packed, info = pack_history(history, system, MODEL, base - 10)
+    _check("oversized latest turn falls back to the note",
+           info["kept"] == 0 and packed[-1]["content"] == TRUNCATION_NOTE, str(info))
+
+    sys.exit(1 if _failures else 0)
+
+
+if __name__ == "__main__":
+    main()
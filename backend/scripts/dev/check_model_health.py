@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Trip a model's breaker and check that route() fails over, both with a shared
+state file and with a MODEL_HEALTH_PATH that cannot be created (locked_json
+falls back to per-process state, which route() and health_report() must read).
+Then let the breaker go half-open and check that a prepareOnly
+generate_response leaves the trial slot for the next real request.
+
+Exits non-zero on any failed check.
+
+Usage (from backend/scripts):
+    python dev/check_model_health.py
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.pop("MODEL_HEALTH_DISABLE", None)
+os.environ.setdefault("OPENROUTER_API_KEY", "sk-or-v1-x")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import generate_response
+import model_health
+
+REQUESTED = "x/model"
+
+
+def _check(label, path):
+    model_health.STATE_PATH = path
+    model_health._local_state.clear()
+    failures = []
+
+    model, routing = model_health.route(REQUESTED)
+    if model != REQUESTED or routing is not None:
+        failures.append(f"{label}: healthy model was rerouted to {model}")
+
+    model_health.record(REQUESTED, 404, 0.1)
+    model, routing = model_health.route(REQUESTED)
+    state = model_health.health_report().get(REQUESTED, {}).get("state")
+    print(f"{label}: after 404 -> route {model!r}, failover {bool(routing and routing['failover'])}, "
+          f"reported state {state!r}")
+    if model == REQUESTED or not routing or not routing["failover"]:
+        failures.append(f"{label}: route() did not fail over from an open breaker")
+    if state != "open":
+        failures.append(f"{label}: health_report() shows {state!r}, expected 'open'")
+    if model_health.fallback_model(REQUESTED) is None:
+        failures.append(f"{label}: fallback_model() found no alternative")
+    return failures
+
+
+def _check_prepare_only(path):
+    model_health.STATE_PATH = path
+    model_health.COOLDOWN = 0.2
+    model_health.record(REQUESTED, 404, 0.1)
+    time.sleep(0.3)
+    failures = []
+
+    out = json.loads(generate_response.generate_response(
+        {"messages": [{"role": "user", "content": "hi"}], "model": REQUESTED, "prepareOnly": True}
+    ))
+    after_prepare = model_health.health_report()[REQUESTED]["state"]
+    model, routing = model_health.route(REQUESTED)
+    after_route = model_health.health_report()[REQUESTED]["state"]
+    print(f"half-open: prepareOnly model {out.get('model')!r} -> state {after_prepare!r}; "
+          f"next route {model!r} -> state {after_route!r}")
+    if out.get("model") != REQUESTED:
+        failures.append("prepareOnly was not offered the half-open model")
+    if after_prepare != "half_open":
+        failures.append(f"prepareOnly claimed the trial slot (state {after_prepare!r})")
+    if model != REQUESTED or routing is not None or after_route != "open":
+        failures.append("the next real request did not get the trial")
+    return failures
+
+
+def main():
+    if not model_health._assigned_models():
+        print("FAIL: assigned_models.json lists no models to fail over to", file=sys.stderr)
+        sys.exit(1)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        failures += _check("shared file", os.path.join(tmp, "model_health.json"))
+    failures += _check("unwritable path", "/proc/nonexistent/model_health.json")
+    with tempfile.TemporaryDirectory() as tmp:
+        failures += _check_prepare_only(os.path.join(tmp, "model_health.json"))
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Exercise retry_policy against a local stub that answers 429 with Retry-After.
+
+N clients hit the stub at once through async_client.complete (the path used by
+generate_suggestions / improve_readability) while it is rate limiting, then
+the stub recovers. Checks that:
+
+  * no retry arrives earlier than the Retry-After the stub sent;
+  * retries from clients that failed together are spread out (jitter);
+  * total retries stay within the shared budget (burst + rate * elapsed);
+  * a Retry-After above RETRY_MAX_DELAY fails fast instead of waiting.
+
+Exits non-zero on any failed check.
+
+Usage (from backend/scripts):
+    python dev/check_retry_policy.py [--clients 30] [--storm 3.0]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_budget_dir = tempfile.mkdtemp(prefix="retry-budget-")
+os.environ["RETRY_BUDGET_PATH"] = os.path.join(_budget_dir, "budget.json")
+os.environ.setdefault("RETRY_BUDGET_BURST", "10")
+os.environ.setdefault("RETRY_BUDGET_RATE", "2")
+os.environ.setdefault("RETRY_MAX_DELAY", "10")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_client
+import retry_policy
+
+RETRY_AFTER = 1.0
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    storm_until = 0.0
+    retry_after = RETRY_AFTER
+    log = []          # (client, arrival time, status)
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        now = time.monotonic()
+        limited = now < self.storm_until
+        with self.lock:
+            self.log.append((body.get("client"), now, 429 if limited else 200))
+        if limited:
+            out = b'{"error": {"message": "Rate limit exceeded"}}'
+            self.send_response(429)
+            self.send_header("Retry-After", f"{self.retry_after:g}")
+        else:
+            out = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+
+def _storm(url, clients, storm, max_retries):
+    _Stub.log.clear()
+    _Stub.storm_until = time.monotonic() + storm
+
+    async def _all():
+        return await async_client.gather_limited(
+            (async_client.complete({}, {"client": i}, url=url, max_retries=max_retries, base_delay=0.5)
+             for i in range(clients)),
+            clients,
+        )
+
+    start = time.monotonic()
+    results = async_client.run(_all())
+    return results, time.monotonic() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=30)
+    parser.add_argument("--storm", type=float, default=3.0, help="seconds the stub keeps answering 429")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    failures = []
+
+    results, elapsed = _storm(url, args.clients, args.storm, max_retries=6)
+    by_client = {}
+    for client, at, status in _Stub.log:
+        by_client.setdefault(client, []).append((at, status))
+
+    early = 0
+    first_retries = []
+    for hits in by_client.values():
+        for (prev_at, prev_status), (at, _) in zip(hits, hits[1:]):
+            if prev_status == 429 and at - prev_at < RETRY_AFTER - 0.01:
+                early += 1
+        if len(hits) > 1:
+            first_retries.append(round(hits[1][0] - hits[0][0], 2))
+
+    retries = len(_Stub.log) - args.clients
+    allowed = retry_policy.BUDGET_BURST + retry_policy.BUDGET_RATE * elapsed
+    ok = sum(r.ok for r in results)
+    print(f"{args.clients} clients, {args.storm:g}s storm: {len(_Stub.log)} requests "
+          f"({retries} retries, budget allows {allowed:.0f}), {ok} succeeded, {elapsed:.1f}s")
+    print(f"first-retry delays: min {min(first_retries, default=0)}s, "
+          f"max {max(first_retries, default=0)}s, {len(set(first_retries))} distinct")
+    print(f"budget: {retry_policy.budget_stats()}")
+
+    if early:
+        failures.append(f"{early} retries arrived before Retry-After")
+    if retries > allowed + 1:
+        failures.append(f"{retries} retries exceed the shared budget ({allowed:.0f})")
+    if len(first_retries) > 2 and len(set(first_retries)) < 2:
+        failures.append("retries were not jittered")
+
+    # Retry-After beyond RETRY_MAX_DELAY: one attempt, no wait.
+    _Stub.retry_after = retry_policy.MAX_DELAY * 10
+    start = time.monotonic()
+    results, _ = _storm(url, 1, 5.0, max_retries=3)
+    waited = time.monotonic() - start
+    print(f"Retry-After {_Stub.retry_after:g}s: {len(_Stub.log)} request(s), returned in {waited:.2f}s")
+    if len(_Stub.log) != 1 or waited > 1:
+        failures.append("long Retry-After was not failed fast")
+
+    server.shutdown()
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Check that analyzeAllChunks results are cached only when every chunk succeeded.
+
+Runs generate_suggestions twice on a multi-chunk document against a local stub
+that fails (502) any request containing a marker placed in the last chunk: the
+partial merge must not be cached, so the second request calls the stub again.
+Then the same check with no failing chunk, where the second request must be a
+cache hit.
+
+Exits non-zero on any failed check.
+
+Usage (from backend/scripts):
+    python dev/check_suggestion_cache.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_openrouter import StubConfig, start_stub
+
+MARKER = "zx-fail-this-chunk"
+
+stub = start_stub(StubConfig(latency_median=0.01, latency_sigma=0, fail_marker=MARKER))
+os.environ.update({
+    "OPENROUTER_API_URL": stub.url,
+    "OPENROUTER_API_KEY": "sk-or-v1-x",
+    "SUGGESTION_CACHE_PATH": os.path.join(tempfile.mkdtemp(prefix="suggestion-cache-"), "cache.sqlite3"),
+    "MODEL_HEALTH_DISABLE": "1",
+    "RETRY_BUDGET_DISABLE": "1",
+})
+os.environ.pop("SUGGESTION_CACHE_DISABLE", None)
+
+import generate_suggestions
+
+
+def _document(tail):
+    paragraph = ("The committee reviewed the proposal over several weeks and found that the "
+                 "budget estimates were reasonable, though the timeline seemed optimistic. ") * 4
+    return "\n\n".join([paragraph] * 12 + [paragraph + tail])
+
+
+def _run(content):
+    before = stub.snapshot()["requests"]
+    out = json.loads(generate_suggestions.generate_suggestions(
+        {"content": content, "analyzeAllChunks": True}, num_retries=1
+    ))
+    return out, stub.snapshot()["requests"] - before
+
+
+def _check(label, content, expect_cached):
+    failures = []
+    first, calls = _run(content)
+    info = first.get("processing_info", {})
+    second, calls_again = _run(content)
+    hit = second.get("cache", {}).get("hit")
+    print(f"{label}: {info.get('chunks')} chunks, {info.get('failed_chunks')} failed, "
+          f"{calls} calls; repeat: cache hit {hit}, {calls_again} calls")
+    if "error" in first:
+        failures.append(f"{label}: {first['error']}")
+    if expect_cached and (not hit or calls_again):
+        failures.append(f"{label}: complete result was not served from cache")
+    if not expect_cached and (hit or not calls_again):
+        failures.append(f"{label}: partial result was cached; failed chunks were not retried")
+    return failures
+
+
+def main():
+    failures = _check("one chunk failing", _document(MARKER), expect_cached=False)
+    failures += _check("all chunks ok", _document("Thanks."), expect_cached=True)
+    stub.shutdown()
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+"""
+Offline load test of the Python pipeline against dev/stub_openrouter.py.
+
+Starts a stub OpenRouter in this process, then drives generate_response,
+generate_suggestions and improve_readability (round-robin) at a fixed request
+rate — open loop, so latency includes any queueing — either through resident
+workers (worker.py, as with PYTHON_WORKERS > 0) or one process per request
+(spawn mode, the PYTHON_WORKERS=0 default).
+
+Reports per script: completed requests, errors, throughput and p50/p95/p99
+latency; overall: CPU seconds per request consumed by the Python processes
+(the stub's own CPU is excluded) and the stub's status counters.
+
+The suggestion cache is disabled and breaker/retry state goes to a temporary
+directory, so runs do not influence each other.
+
+Usage (from backend/scripts):
+    python dev/load_test.py --rps 10 --duration 30
+    python dev/load_test.py --mode spawn --rps 2 --duration 20 --scripts improve_readability
+    python dev/load_test.py --rps 20 --rate-429 0.05 --tail-prob 0.02 --json
+"""
+import argparse
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SCRIPTS_DIR, "dev"))
+
+from stub_openrouter import add_stub_arguments, config_from_args, start_stub
+
+ALL_SCRIPTS = ("generate_response", "generate_suggestions", "improve_readability")
+
+_PARAGRAPH = (
+    "Our team reviewed the quarterly numbers and in order to move forward we think the budget "
+    "should be reallocated toward the onboarding project, which has been delayed twice. "
+    "The main risk is that its timeline depends on a vendor we have not worked with before."
+)
+
+
+def _payload(script: str, i: int) -> dict:
+    text = f"{_PARAGRAPH} (request {i})"
+    if script == "generate_response":
+        return {"messages": [
+            {"role": "user", "content": "Can you help me tighten this update?"},
+            {"role": "assistant", "content": "Sure — paste the text and tell me who it is for."},
+            {"role": "user", "content": text},
+        ]}
+    if script == "generate_suggestions":
+        return {"content": "\n\n".join([text] * 3), "documentType": "business"}
+    return {"content": text, "targetAudience": "executives"}
+
+
+def _child_env(stub_url: str, state_dir: str, worker_concurrency: int) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "OPENROUTER_API_URL": stub_url,
+        "OPENROUTER_API_KEY": env.get("LOAD_TEST_API_KEY", "sk-or-v1-loadtest"),
+        "SUGGESTION_CACHE_DISABLE": "1",
+        "MODEL_HEALTH_PATH": os.path.join(state_dir, "model_health.json"),
+        "RETRY_BUDGET_PATH": os.path.join(state_dir, "retry_budget.json"),
+        "PYTHON_WORKER_CONCURRENCY": str(worker_concurrency),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+class _WorkerClient:
+    """One worker.py process speaking the NDJSON protocol."""
+
+    def __init__(self, env: dict):
+        self.proc = subprocess.Popen(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "worker.py")],
+            cwd=SCRIPTS_DIR, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.pending: dict = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        threading.Thread(target=self._read, daemon=True).start()
+        if not self._ready.wait(60):
+            raise RuntimeError("worker.py did not become ready")
+
+    def _read(self) -> None:
+        for line in self.proc.stdout:
+            frame = json.loads(line)
+            if frame.get("ready"):
+                self._ready.set()
+                continue
+            with self._lock:
+                future = self.pending.pop(frame.get("id"), None)
+            if future is not None:
+                future.set_result(frame.get("stdout") or json.dumps({"error": frame.get("error")}))
+
+    def submit(self, req_id: int, script: str, payload: dict) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self.pending[req_id] = future
+            self.proc.stdin.write(json.dumps({"id": req_id, "script": f"{script}.py", "payload": payload}) + "\n")
+            self.proc.stdin.flush()
+        return future
+
+    def load(self) -> int:
+        with self._lock:
+            return len(self.pending)
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        self.proc.wait(timeout=60)
+
+
+class _SpawnClient:
+    """A fresh interpreter per request, like pythonRunner's spawn mode."""
+
+    def __init__(self, env: dict, max_concurrency: int):
+        self.env = env
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency)
+
+    def _run(self, script: str, payload: dict) -> str:
+        proc = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS_DIR, f"{script}.py"), json.dumps(payload)],
+            cwd=SCRIPTS_DIR, env=self.env, capture_output=True, text=True,
+        )
+        return proc.stdout or json.dumps({"error": f"exit {proc.returncode}"})
+
+    def submit(self, req_id: int, script: str, payload: dict) -> Future:
+        return self.pool.submit(self._run, script, payload)
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+
+# ---------------------------------------------------------------------------
+# Run + report
+# ---------------------------------------------------------------------------
+
+def _percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))]
+
+
+def _is_error(stdout: str) -> bool:
+    try:
+        return "error" in json.loads(stdout)
+    except ValueError:
+        return True
+
+
+def run(args) -> dict:
+    stub = start_stub(config_from_args(args))
+    state_dir = tempfile.mkdtemp(prefix="load-test-")
+    env = _child_env(stub.url, state_dir, args.worker_concurrency)
+    scripts = [s.strip() for s in args.scripts.split(",") if s.strip()]
+
+    cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    if args.mode == "worker":
+        workers = [_WorkerClient(env) for _ in range(args.workers)]
+        submit = lambda i, script, payload: min(workers, key=_WorkerClient.load).submit(i, script, payload)
+        clients = workers
+    else:
+        spawn = _SpawnClient(env, args.max_concurrency)
+        submit, clients = spawn.submit, [spawn]
+
+    results = {script: [] for script in scripts}   # (latency seconds, error?)
+    results_lock = threading.Lock()
+    total = int(args.rps * args.duration)
+    start = time.monotonic()
+    futures = []
+
+    for i, script in zip(range(total), itertools.cycle(scripts)):
+        scheduled = start + i / args.rps
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        future = submit(i, script, _payload(script, i))
+
+        def _done(fut, script=script, scheduled=scheduled):
+            latency = time.monotonic() - scheduled
+            with results_lock:
+                results[script].append((latency, _is_error(fut.result())))
+
+        future.add_done_callback(_done)
+        futures.append(future)
+
+    for future in futures:
+        future.result()
+    elapsed = time.monotonic() - start
+    for client in clients:
+        client.close()
+    cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    stub.shutdown()
+
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    report = {
+        "mode": args.mode,
+        "target_rps": args.rps,
+        "requests": total,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2),
+        "cpu_ms_per_request": round(cpu / max(1, total) * 1000, 1),
+        "scripts": {},
+        "stub": stub.snapshot(),
+    }
+    for script, rows in results.items():
+        latencies = [lat for lat, _ in rows]
+        report["scripts"][script] = {
+            "requests": len(rows),
+            "errors": sum(err for _, err in rows),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "p50_ms": round(_percentile(latencies, 0.50) * 1000),
+            "p95_ms": round(_percentile(latencies, 0.95) * 1000),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against a local OpenRouter stub.")
+    parser.add_argument("--mode", choices=("worker", "spawn"), default="worker")
+    parser.add_argument("--rps", type=float, default=5.0)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--scripts", default=",".join(ALL_SCRIPTS))
+    parser.add_argument("--workers", type=int, default=2, help="worker.py processes (worker mode)")
+    parser.add_argument("--worker-concurrency", type=int, default=8, help="PYTHON_WORKER_CONCURRENCY")
+    parser.add_argument("--max-concurrency", type=int, default=64, help="processes at once (spawn mode)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['mode']} mode: {report['requests']} requests at {report['target_rps']:g} rps "
+          f"in {report['elapsed_s']}s -> {report['throughput_rps']} rps, "
+          f"{report['cpu_ms_per_request']} ms CPU/request")
+    print(f"\n{'script':<22} {'reqs':>5} {'errs':>5} {'rps':>6} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}")
+    for script, row in report["scripts"].items():
+        print(f"{script:<22} {row['requests']:>5} {row['errors']:>5} {row['throughput_rps']:>6} "
+              f"{row['p50_ms']:>7} {row['p95_ms']:>7} {row['p99_ms']:>7}")
+    print(f"\nstub: {report['stub']['requests']} upstream requests, by status {report['stub']['by_status']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+Local stand-in for OpenRouter's chat completions endpoint, for offline load
+tests (dev/load_test.py) and retry/breaker experiments.
+
+Answers POST /api/v1/chat/completions (any POST path) with OpenAI-style JSON, or
+SSE chunks when the request has "stream": true. Behaviour is configurable:
+
+  * latency: lognormal around --latency-median (--latency-sigma), plus a
+    --tail-prob chance of --tail-latency seconds (free-model style tails);
+    streams spread the same latency over --stream-chunks SSE events;
+  * faults: --rate-429 (with Retry-After: --retry-after), --rate-5xx, and a 502
+    for every request whose body contains --fail-marker (deterministic faults);
+  * --oversize-prob replies carry a --oversize-kb KB body.
+
+Replies are numbered suggestion lists, so generate_suggestions parses them like
+real output. GET /stats returns request/status counters as JSON.
+
+Usage (from backend/scripts):
+    python dev/stub_openrouter.py --port 8787 --latency-median 0.8 --rate-429 0.05
+    OPENROUTER_API_URL=http://127.0.0.1:8787/api/v1/chat/completions python generate_response.py '{...}'
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_REPLY = (
+    "1. Clarity: The opening sentence buries the main point; lead with the decision.\n"
+    "2. Grammar: \"its\" in the second paragraph should be \"it's\".\n"
+    "3. Style: Replace \"in order to\" with \"to\" for a tighter rhythm.\n"
+    "4. Structure: Move the budget figures into their own short paragraph.\n"
+    "5. Tone: The closing line reads abrupt; soften it with a concrete next step."
+)
+
+
+@dataclass
+class StubConfig:
+    latency_median: float = 0.5
+    latency_sigma: float = 0.4
+    tail_prob: float = 0.0
+    tail_latency: float = 10.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: float = 1.0
+    oversize_prob: float = 0.0
+    oversize_kb: int = 512
+    stream_chunks: int = 20
+    seed: int = 0
+    fail_marker: str = ""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StubServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, extra_headers: dict | None = None) -> None:
+        out = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        for key, value in (extra_headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.server.count(400)
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        cfg = self.server.config
+        roll, latency, oversize = self.server.draw()
+        if cfg.fail_marker and cfg.fail_marker in json.dumps(body):
+            self.server.count(502)
+            self._send_json(502, {"error": {"code": 502, "message": "Provider returned error"}})
+            return
+        if roll < cfg.rate_429:
+            self.server.count(429)
+            self._send_json(
+                429,
+                {"error": {"code": 429, "message": "Rate limit exceeded: free-models-per-min"}},
+                {"Retry-After": f"{cfg.retry_after:g}"},
+            )
+            return
+        if roll < cfg.rate_429 + cfg.rate_5xx:
+            time.sleep(latency / 2)
+            self.server.count(502)
+            self._send_json(502, {"error": {"code": 502, "message": "Provider returned error"}})
+            return
+
+        content = _REPLY
+        if oversize:
+            filler = "Additional detail to pad the reply. " * 32
+            content += "\n\n" + filler * max(1, cfg.oversize_kb * 1024 // len(filler))
+        model = body.get("model", "stub/model")
+        usage = {"prompt_tokens": 200, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if body.get("stream"):
+            self._stream(model, content, usage, latency)
+        else:
+            time.sleep(latency)
+            self._send_json(200, {
+                "id": "gen-stub",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        self.server.count(200)
+
+    def _stream(self, model: str, content: str, usage: dict, latency: float) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(text: str) -> None:
+            data = text.encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        n = max(1, self.server.config.stream_chunks)
+        step = max(1, len(content) // n)
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        write(": OPENROUTER PROCESSING\n\n")
+        for piece in pieces:
+            time.sleep(latency / len(pieces))
+            chunk = {"model": model, "choices": [{"index": 0, "delta": {"content": piece}}]}
+            write(f"data: {json.dumps(chunk)}\n\n")
+        write(f"data: {json.dumps({'model': model, 'choices': [{'index': 0, 'delta': {}}], 'usage': usage})}\n\n")
+        write("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: StubConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "by_status": {}}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def draw(self) -> tuple:
+        """(fault roll, latency in seconds, oversize?) for one request."""
+        cfg = self.config
+        with self._lock:
+            roll = self._rng.random()
+            if self._rng.random() < cfg.tail_prob:
+                latency = cfg.tail_latency
+            else:
+                latency = cfg.latency_median * self._rng.lognormvariate(0, cfg.latency_sigma)
+            oversize = self._rng.random() < cfg.oversize_prob
+        return roll, latency, oversize
+
+    def count(self, status: int) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            key = str(status)
+            self._stats["by_status"][key] = self._stats["by_status"].get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self._stats["requests"],
+                "by_status": dict(self._stats["by_status"]),
+                "config": asdict(self.config),
+            }
+
+
+def start_stub(config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> StubServer:
+    """Start a stub in a daemon thread; stop it with server.shutdown()."""
+    server = StubServer((host, port), config or StubConfig())
+    threading.Thread(target=server.serve_forever, name="stub-openrouter", daemon=True).start()
+    return server
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    """The StubConfig fields as --flags (shared with dev/load_test.py)."""
+    for name, default in asdict(StubConfig()).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(default), default=default)
+
+
+def config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(**{name: getattr(args, name) for name in asdict(StubConfig())})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), config_from_args(args))
+    print(f"stub OpenRouter listening on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.snapshot()), flush=True)
+
+
+if __name__ == "__main__":
+    main()
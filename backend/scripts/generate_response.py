@@ -13,9 +13,19 @@ JSON Input Schema:
         "documentType": str,  # Optional: "general"|"email"|"academic"|"business"|"creative" (default: "general")
         "tone": str,          # Optional: e.g. "professional" (default: "professional")
         "temperature": float, # Optional: sampling temperature (default: TEMPERATURE env var or 0.7)
-        "max_tokens": int     # Optional: max response tokens (default: MAX_TOKENS env var or 1000)
+        "max_tokens": int,    # Optional: max response tokens (default: MAX_TOKENS env var or 1000)
+        "stream": bool,       # Optional: emit NDJSON events instead of one JSON object
+        "hedge": bool,        # Optional: hedge slow attempts (default: OPENROUTER_HEDGE env var; non-stream only)
+        "timings": bool,      # Optional: add per-stage "timings" to the output (default: SCRIPT_TIMINGS env var)
+        "compact": bool,      # Optional: compact output without duplicated fields (see output_format.py)
+        "include": [str]      # Optional, compact only: extra sections, e.g. ["enhanced_data"]
     }
 
+Stream mode (``"stream": true``) prints one JSON object per line as the reply arrives:
+    {"type": "delta", "content": str}            # text fragments, in order
+    {"type": "done", "response": str, ...}       # trailer: usage + enrichment, as in normal mode
+    {"type": "error", "error": str, "details"?}  # terminal; exit code 1
+
 Environment Variables:
     OPENROUTER_API_KEY  — Required. Your OpenRouter API key.
     DEFAULT_MODEL       — Optional. Override the default model.
@@ -27,6 +37,9 @@ import json
 import os
 import sys
 import time
+from typing import Iterator
+
+import timing  # first, so import_ms covers the imports below
 
 import requests
 from dotenv import load_dotenv
@@ -49,7 +62,6 @@ else:
 
 try:
     from utils import (
-        estimate_tokens,
         estimate_context_window,
         enrich_ai_response,
     )
@@ -57,17 +69,30 @@ try:
 except ImportError:
     _UTILS_AVAILABLE = False
 
-from openrouter_response import extract_assistant_text
+import async_client
+import http_transport
+import model_health
+import output_format
+import prompts
+from history_packer import pack_history
+from openrouter_response import extract_assistant_text, extract_stream_delta, iter_stream_chunks
+from retry_policy import Backoff, retry_after_seconds
+from writing_skills import tone_guidance
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_URL = http_transport.OPENROUTER_API_URL
 DEFAULT_MODEL      = os.getenv("DEFAULT_MODEL", "openrouter/free")
 DEFAULT_TEMPERATURE = float(os.getenv("TEMPERATURE", 0.7))
 DEFAULT_MAX_TOKENS  = int(os.getenv("MAX_TOKENS", 1000))
 
+_NO_RESPONSE_ERROR = (
+    "Failed to get a response from OpenRouter after multiple retries, "
+    "or the model returned no text — try another model or simplify the prompt."
+)
+
 # Document-type addenda (layered on top of writing_skills — still human, not robotic)
 _DOC_TYPE_INSTRUCTIONS: dict[str, str] = {
     "email": """
@@ -114,6 +139,7 @@ def _error(msg: str, details: str = "") -> str:
 # Main entry point
 # ---------------------------------------------------------------------------
 
+@timing.traced("generate_response")
 def generate_response(data: dict) -> str:
     """
     Generate an AI writing assistant response via OpenRouter.
@@ -122,6 +148,157 @@ def generate_response(data: dict) -> str:
         JSON string with the assistant response and optional enrichment data,
         or a structured error.
     """
+    with timing.span("prepare"):
+        prepared = _prepare_request(data)
+    if isinstance(prepared, str):
+        return prepared
+    headers, payload, original_prompt, routing, prompt_meta = prepared
+
+    if data.get("prepareOnly"):
+        prepared_only = {
+            "messages": payload["messages"],
+            "model": payload["model"],
+            "temperature": payload["temperature"],
+            "max_tokens": payload["max_tokens"],
+            "prompt": prompt_meta,
+        }
+        if routing:
+            prepared_only["model_routing"] = routing
+        with timing.span("serialize"):
+            return json.dumps(prepared_only, ensure_ascii=False)
+
+    # ------------------------------------------------------------------
+    # API call
+    # ------------------------------------------------------------------
+    with timing.span("network"):
+        call_result = _call_with_retry(headers, payload, hedge=data.get("hedge"))
+    if isinstance(call_result, dict) and call_result.get("fatal"):
+        return _error(call_result["error"], call_result.get("details") or "")
+    if call_result is None:
+        return _error(_NO_RESPONSE_ERROR)
+
+    assistant_response = call_result["content"]
+
+    # ------------------------------------------------------------------
+    # Build result
+    # ------------------------------------------------------------------
+    result: dict = {"response": assistant_response, "prompt": prompt_meta}
+    if call_result.get("usage"):
+        result["usage"] = call_result["usage"]
+    if routing:
+        result["model_routing"] = routing
+    if call_result.get("hedge"):
+        result["hedge"] = call_result["hedge"]
+    with timing.span("enrichment"):
+        _add_enrichment(result, assistant_response, original_prompt)
+
+    with timing.span("serialize"):
+        return output_format.render(result, data)
+
+
+def stream_response(data: dict) -> Iterator[dict]:
+    """
+    Streaming variant of generate_response: sends ``stream: true`` to OpenRouter
+    and yields events as the reply arrives.
+
+    Yields:
+        {"type": "delta", "content": str}   — one per streamed text fragment
+        {"type": "done", "response": str, "usage"?, "statistics"?, ...}
+                                            — trailer, same fields as generate_response
+        {"type": "error", "error": str, "details"?}
+                                            — instead of (or after) deltas
+
+    When timings are enabled the trailer carries "timings"; "stream" is the
+    time spent reading deltas.
+    """
+    trace = timing.begin("generate_response", data)
+    try:
+        for event in _stream_events(data):
+            if event["type"] == "done":
+                if output_format.wants_compact(data):
+                    event = output_format.compact_result(event, output_format.requested_sections(data))
+                if trace is not None and trace.include_in_output:
+                    event["timings"] = trace.timings()
+            yield event
+    finally:
+        timing.end(trace)
+
+
+def _stream_events(data: dict) -> Iterator[dict]:
+    with timing.span("prepare"):
+        prepared = _prepare_request(data)
+    if isinstance(prepared, str):
+        yield {"type": "error", **json.loads(prepared)}
+        return
+    headers, payload, original_prompt, routing, prompt_meta = prepared
+    payload["stream"] = True
+
+    with timing.span("network"):
+        call_result = _call_with_retry(headers, payload, stream=True)
+    if isinstance(call_result, dict) and call_result.get("fatal"):
+        _debug(f"Error: {call_result['error']}")
+        event = {"type": "error", "error": call_result["error"]}
+        if call_result.get("details"):
+            event["details"] = call_result["details"]
+        yield event
+        return
+    if call_result is None:
+        _debug(f"Error: {_NO_RESPONSE_ERROR}")
+        yield {"type": "error", "error": _NO_RESPONSE_ERROR}
+        return
+
+    resp = call_result["stream"]
+    parts: list[str] = []
+    usage = None
+    with timing.span("stream"):
+        try:
+            resp.encoding = "utf-8"  # SSE is UTF-8; requests would guess latin-1 for text/*
+            lines = resp.iter_lines(decode_unicode=True)
+            for chunk in iter_stream_chunks(lines):
+                if chunk.get("error"):
+                    err = chunk["error"]
+                    message = err.get("message") if isinstance(err, dict) else str(err)
+                    _debug(f"Error: stream error from provider: {message}")
+                    yield {"type": "error", "error": message or "Stream interrupted"}
+                    return
+                if chunk.get("usage"):
+                    usage = chunk["usage"]
+                delta = extract_stream_delta(chunk)
+                if delta:
+                    parts.append(delta)
+                    yield {"type": "delta", "content": delta}
+        except requests.RequestException as exc:
+            _debug(f"Error: stream interrupted: {exc}")
+            yield {"type": "error", "error": "Stream interrupted", "details": str(exc)}
+            return
+        finally:
+            resp.close()
+
+    assistant_response = "".join(parts).strip()
+    if not assistant_response:
+        _debug(f"Error: {_NO_RESPONSE_ERROR}")
+        yield {"type": "error", "error": _NO_RESPONSE_ERROR}
+        return
+
+    trailer: dict = {"type": "done", "response": assistant_response, "prompt": prompt_meta}
+    if usage:
+        trailer["usage"] = usage
+    if routing:
+        trailer["model_routing"] = routing
+    with timing.span("enrichment"):
+        _add_enrichment(trailer, assistant_response, original_prompt)
+    yield trailer
+
+
+def _prepare_request(data: dict) -> tuple[dict, dict, str, dict | None, dict] | str:
+    """
+    Validate input and build the OpenRouter request.
+
+    Returns:
+        (headers, payload, original_prompt, model_routing, prompt), or a JSON
+        error string. model_routing is None unless model_health failed over;
+        prompt is the system prompt's metadata (prompts.PromptTemplate.metadata).
+    """
     from utils import sanitize_api_key
 
     api_key = sanitize_api_key(os.getenv("OPENROUTER_API_KEY"))
@@ -145,13 +322,17 @@ def generate_response(data: dict) -> str:
 
     original_prompt: str = messages[-1].get("content", "") if messages else ""
 
+    with timing.span("route"):
+        # prepareOnly makes no call, so it must not take a half-open model's trial
+        model, routing = model_health.route(model, claim=not data.get("prepareOnly"))
     _debug(f"model={model} | doc_type={document_type} | tone={tone} | temp={temperature}")
 
     # ------------------------------------------------------------------
     # Build system message
     # ------------------------------------------------------------------
-    system_content = _build_system_prompt(document_type, tone, temperature)
-    system_message = {"role": "system", "content": system_content}
+    with timing.span("build_prompt"):
+        system_prompt = _build_system_prompt(document_type, tone, temperature)
+    system_message = {"role": "system", "content": system_prompt.text}
 
     # ------------------------------------------------------------------
     # Context window management
@@ -159,48 +340,17 @@ def generate_response(data: dict) -> str:
     if _UTILS_AVAILABLE:
         context_window = estimate_context_window(model)
         token_budget   = max(context_window * 0.8, 2000)
-        current_tokens = estimate_tokens(system_content)
     else:
         token_budget   = 6000
-        current_tokens = len(system_content) // 4  # rough estimate
-
-    full_messages: list[dict] = [system_message]
-    truncated = False
-
-    for msg in reversed(messages):
-        if msg.get("role") not in ("user", "assistant"):
-            continue
-        msg_tokens = (
-            estimate_tokens(msg.get("content", ""))
-            if _UTILS_AVAILABLE
-            else len(msg.get("content", "")) // 4
-        )
-        if current_tokens + msg_tokens < token_budget:
-            full_messages.insert(1, msg)
-            current_tokens += msg_tokens
-        else:
-            truncated = True
-            break
-
-    if truncated and len(full_messages) == 1:
-        full_messages.insert(1, {
-            "role": "system",
-            "content": "Note: The conversation history is extensive. Focusing on the most recent messages.",
-        })
 
-    _debug(f"Sending {len(full_messages)} messages (~{current_tokens} tokens)")
+    with timing.span("pack_history"):
+        full_messages, packing = pack_history(messages, system_message, model, token_budget)
+    current_tokens = packing["tokens"]
+    if packing["summarized"]:
+        _debug(f"Condensed {packing['summarized']} older messages into a summary block")
 
-    if data.get("prepareOnly"):
-        return json.dumps({
-            "messages": full_messages,
-            "model": model,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }, ensure_ascii=False)
+    _debug(f"Sending {len(full_messages)} messages (~{current_tokens} tokens)")
 
-    # ------------------------------------------------------------------
-    # API call
-    # ------------------------------------------------------------------
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -217,66 +367,41 @@ def generate_response(data: dict) -> str:
         "frequency_penalty": 0.5,
         "presence_penalty":  0.5,
     }
+    return headers, payload, original_prompt, routing, SYSTEM_PROMPT.metadata(system_prompt)
 
-    call_result = _call_with_retry(headers, payload)
-    if isinstance(call_result, dict) and call_result.get("fatal"):
-        return _error(call_result["error"], call_result.get("details") or "")
-    if call_result is None:
-        return _error(
-            "Failed to get a response from OpenRouter after multiple retries, "
-            "or the model returned no text — try another model or simplify the prompt."
-        )
-
-    assistant_response = call_result["content"]
 
-    # ------------------------------------------------------------------
-    # Build result
-    # ------------------------------------------------------------------
-    result: dict = {"response": assistant_response}
-    if call_result.get("usage"):
-        result["usage"] = call_result["usage"]
-
-    if _UTILS_AVAILABLE:
-        try:
-            enriched = enrich_ai_response(assistant_response, original_prompt)
-            quality  = enriched["quality_metrics"]
-            result.update({
-                "statistics":   enriched["statistics"],
-                "quality_score": quality.get("overall_quality_score"),
-                "enhanced_data": {
-                    "structured_content": enriched["structured_data"],
-                    "statistics":         enriched["statistics"],
-                    "quality_metrics":    quality,
-                    "metadata":           enriched["metadata"],
-                },
-            })
-            if quality.get("overall_quality_score", 1.0) < 0.7:
-                result["quality_warnings"] = quality.get("potential_issues", [])
-        except Exception as exc:
-            _debug(f"enrich_ai_response failed: {exc}")
-
-    return json.dumps(result, ensure_ascii=False, indent=2)
+def _add_enrichment(result: dict, assistant_response: str, original_prompt: str) -> None:
+    """Attach enrich_ai_response statistics and quality data to result (in place)."""
+    if not _UTILS_AVAILABLE:
+        return
+    try:
+        enriched = enrich_ai_response(assistant_response, original_prompt)
+        quality  = enriched["quality_metrics"]
+        result.update({
+            "statistics":   enriched["statistics"],
+            "quality_score": quality.get("overall_quality_score"),
+            "enhanced_data": {
+                "structured_content": enriched["structured_data"],
+                "statistics":         enriched["statistics"],
+                "quality_metrics":    quality,
+                "metadata":           enriched["metadata"],
+            },
+        })
+        if quality.get("overall_quality_score", 1.0) < 0.7:
+            result["quality_warnings"] = quality.get("potential_issues", [])
+    except Exception as exc:
+        _debug(f"enrich_ai_response failed: {exc}")
 
 
 # ---------------------------------------------------------------------------
 # Prompt builder
 # ---------------------------------------------------------------------------
 
-def _build_system_prompt(document_type: str, tone: str, temperature: float) -> str:
-    from writing_skills import tone_guidance, writing_voice_block
-
-    doc_instructions = _DOC_TYPE_INSTRUCTIONS.get(document_type, _DOC_TYPE_INSTRUCTIONS["general"])
-    creativity_note  = (
-        "lean a bit more playful and exploratory"
-        if temperature > 0.7
-        else "stay tight and direct"
-    )
-    voice = writing_voice_block(extra=tone_guidance(tone))
-    return f"""{voice}
+_SYSTEM_TEMPLATE = """{voice}
 
 You help with {document_type} writing. Every reply you write (drafts, rewrites, explanations) must sound like the WRITING VOICE above — regardless of which model is answering.
 
-DOCUMENT TYPE ({document_type.upper()}):
+DOCUMENT TYPE ({document_type_upper}):
 {doc_instructions}
 
 HOW TO HELP:
@@ -287,6 +412,24 @@ HOW TO HELP:
 
 Temperature: {temperature} — {creativity_note}."""
 
+SYSTEM_PROMPT = prompts.register(
+    "response",
+    _SYSTEM_TEMPLATE,
+    inputs=[_DOC_TYPE_INSTRUCTIONS, [tone_guidance(t) for t in ("professional", "casual", "formal")]],
+)
+
+
+def _build_system_prompt(document_type: str, tone: str, temperature: float) -> prompts.Prompt:
+    """The memoized system prompt for this document type, tone and temperature."""
+    return SYSTEM_PROMPT.render(
+        voice_extra=tone_guidance(tone),
+        document_type=document_type,
+        document_type_upper=document_type.upper(),
+        doc_instructions=_DOC_TYPE_INSTRUCTIONS.get(document_type, _DOC_TYPE_INSTRUCTIONS["general"]),
+        temperature=temperature,
+        creativity_note="lean a bit more playful and exploratory" if temperature > 0.7 else "stay tight and direct",
+    )
+
 
 # ---------------------------------------------------------------------------
 # HTTP with retry
@@ -297,81 +440,124 @@ def _call_with_retry(
     payload: dict,
     max_retries: int = 3,
     base_delay: float = 2.0,
+    stream: bool = False,
+    hedge: bool | None = None,
 ) -> dict | None:
-    """POST to OpenRouter with exponential-backoff retry.
+    """POST to OpenRouter, retrying under retry_policy (Retry-After, jitter, shared budget).
+
+    Non-streaming calls run on the async_client engine (cancellable from the
+    worker, optionally hedged). With stream=True only opening the stream is
+    retried; the caller reads and closes the response.
 
     Returns:
-        {"content", "usage?"} on success,
+        {"content", "usage?", "hedge?"} on success ({"stream": Response} when streaming),
         {"fatal": True, "error", "details?"} for non-retryable API errors,
         None if retries exhausted or the model returned 200 with no extractable text.
     """
-    delay = base_delay
+    if not stream:
+        return async_client.run(_complete(headers, payload, max_retries, base_delay, hedge))
+
+    backoff = Backoff(base_delay)
 
     for attempt in range(1, max_retries + 1):
         _debug(f"API attempt {attempt}/{max_retries}")
+        retry_after = None
+        started = time.monotonic()
         try:
-            resp = requests.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=60,
-            )
+            try:
+                resp = http_transport.post(
+                    OPENROUTER_API_URL,
+                    headers=headers,
+                    json=payload,
+                    read_timeout=60,
+                    stream=stream,
+                )
+            except requests.RequestException:
+                model_health.record(payload.get("model"), None, time.monotonic() - started)
+                raise
+            model_health.record(payload.get("model"), resp.status_code, time.monotonic() - started)
             _debug(f"Status: {resp.status_code}")
 
             if resp.status_code == 200:
-                data = resp.json()
-                content = _extract_content(data)
-                if content is None:
-                    _debug("OpenRouter returned 200 but no extractable assistant text.")
-                    return None
-                return {"content": content, "usage": data.get("usage")}
+                return {"stream": resp}
 
             if resp.status_code in (401, 404):
-                clip = (resp.text or "")[:500]
-                if resp.status_code == 401:
-                    return {
-                        "fatal": True,
-                        "error": "OpenRouter rejected the API key (401). Verify your API key in Settings or .env.",
-                        "details": clip,
-                    }
-                return {
-                    "fatal": True,
-                    "error": f'Model not available (404): {payload.get("model", "")}',
-                    "details": clip,
-                }
+                return _fatal(resp.status_code, resp.text, payload)
 
+            retry_after = retry_after_seconds(resp.headers)
             if resp.status_code == 429:
-                if attempt < max_retries:
-                    _debug(f"Rate limited. Retrying in {delay}s …")
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
-                _debug("Rate limit exceeded after all retries.")
-                return None
-
-            _debug(f"Unexpected {resp.status_code}: {resp.text}")
-            if attempt < max_retries:
-                time.sleep(delay)
-                delay *= 2
+                resp.close()
+                _debug("Rate limited.")
+            else:
+                _debug(f"Unexpected {resp.status_code}: {resp.text}")
 
         except requests.Timeout:
             _debug(f"Timeout on attempt {attempt}.")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
 
         except requests.ConnectionError as exc:
             _debug(f"Connection error: {exc}")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
 
         except requests.RequestException as exc:
             _debug(f"Request error: {exc}")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
 
+        if attempt < max_retries:
+            delay = backoff.next_delay(retry_after)
+            if delay is None:
+                break
+            _debug(f"Retrying in {delay:.1f}s …")
+            time.sleep(delay)
+
+    _debug("Giving up after retries.")
     return None
 
 
+async def _complete(
+    headers: dict,
+    payload: dict,
+    max_retries: int,
+    base_delay: float,
+    hedge: bool | None,
+) -> dict | None:
+    """Non-streaming _call_with_retry on the async_client engine."""
+    result = await async_client.complete(
+        headers,
+        payload,
+        url=OPENROUTER_API_URL,
+        read_timeout=60,
+        max_retries=max_retries,
+        base_delay=base_delay,
+        hedge=hedge,
+        log=_debug,
+    )
+    if result.status in (401, 404):
+        return _fatal(result.status, result.text, payload)
+    if not result.ok:
+        return None
+    content = _extract_content(result.data)
+    if content is None:
+        _debug("OpenRouter returned 200 but no extractable assistant text.")
+        return None
+    out = {"content": content, "usage": result.data.get("usage")}
+    if result.hedge:
+        out["hedge"] = result.hedge
+    return out
+
+
+def _fatal(status: int, text: str | None, payload: dict) -> dict:
+    clip = (text or "")[:500]
+    if status == 401:
+        return {
+            "fatal": True,
+            "error": "OpenRouter rejected the API key (401). Verify your API key in Settings or .env.",
+            "details": clip,
+        }
+    return {
+        "fatal": True,
+        "error": f'Model not available (404): {payload.get("model", "")}',
+        "details": clip,
+    }
+
+
 def _extract_content(response_data: dict) -> str | None:
     """Extract text from a standard OpenAI-compatible OpenRouter response."""
     text = extract_assistant_text(response_data)
@@ -385,6 +571,12 @@ def _extract_content(response_data: dict) -> str | None:
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    timing.mark_imported("generate_response")
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        from startup_profile import profile_startup
+        print(json.dumps(profile_startup(__file__), indent=2))
+        sys.exit(0)
+
     if len(sys.argv) < 2:
         print(_error("No input provided. Pass a JSON string as the first argument."))
         sys.exit(1)
@@ -395,6 +587,14 @@ if __name__ == "__main__":
         print(_error(f"Invalid JSON input: {exc}"))
         sys.exit(1)
 
+    if isinstance(input_data, dict) and input_data.get("stream"):
+        # NDJSON: one event per line, flushed as soon as it is produced
+        failed = False
+        for event in stream_response(input_data):
+            failed = failed or event["type"] == "error"
+            print(json.dumps(event, ensure_ascii=False), flush=True)
+        sys.exit(1 if failed else 0)
+
     out = generate_response(input_data)
     print(out)
     try:
@@ -12,7 +12,13 @@ JSON Input Schema:
         "documentType": str,     # Optional: "general" | "academic" | "technical" | "creative" |
                                  #           "narrative" | "marketing" | "email" | "business" | "formal"
         "tone": str,             # Optional: "professional" | "casual" | "formal" (default: "professional")
-        "model": str             # Optional: OpenRouter model ID (default: DEFAULT_MODEL env var)
+        "model": str,            # Optional: OpenRouter model ID (default: DEFAULT_MODEL env var)
+        "analyzeAllChunks": bool # Optional: analyze every chunk of long content concurrently
+                                 #           instead of only the first (default: false)
+        "hedge": bool,           # Optional: hedge slow attempts (default: OPENROUTER_HEDGE env var)
+        "timings": bool,         # Optional: add per-stage "timings" to the output (default: SCRIPT_TIMINGS env var)
+        "compact": bool,         # Optional: compact output without duplicated fields (see output_format.py)
+        "include": [str]         # Optional, compact only: extra sections — "raw_suggestions", "enhanced_data"
     }
 
 Environment Variables:
@@ -20,15 +26,17 @@ Environment Variables:
     DEFAULT_MODEL       — Optional. Override the default model.
     TEMPERATURE         — Optional. Sampling temperature (overridden per document type).
     MAX_TOKENS          — Optional. Max tokens for the response (default: 2000).
+    SUGGESTION_CHUNK_CONCURRENCY — Optional. Max concurrent chunk calls with analyzeAllChunks (default: 4).
 """
 
 import json
 import os
 import re
 import sys
-import time
+from difflib import SequenceMatcher
+
+import timing  # first, so import_ms covers the imports below
 
-import requests
 from dotenv import load_dotenv
 
 # ---------------------------------------------------------------------------
@@ -70,13 +78,23 @@ except ImportError:
             ).strip()
         )
 
+import async_client
+import http_transport
+import model_health
+import output_format
+import prompts
+import suggestion_cache
+from writing_skills import suggestions_voice_note, tone_guidance
 from openrouter_response import extract_assistant_text
 
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+OPENROUTER_API_URL = http_transport.OPENROUTER_API_URL
 DEFAULT_MODEL      = os.getenv("DEFAULT_MODEL", "openrouter/free")
 DEFAULT_MAX_TOKENS = int(os.getenv("MAX_TOKENS", 2000))
 MAX_CHUNK_SIZE     = 3000   # chars before chunking kicks in
 CHUNK_OVERLAP      = 300    # chars of context overlap between chunks
+CHUNK_CONCURRENCY  = int(os.getenv("SUGGESTION_CHUNK_CONCURRENCY", 4))  # analyzeAllChunks fan-out cap
+DUPLICATE_SIMILARITY = 0.85  # merged suggestions at least this similar count as duplicates
+PROMPT_VERSION     = "1"    # bump when parsing changes; prompt edits are covered by SYSTEM_PROMPT.version
 
 # Per-document-type model parameters
 _DOC_TYPE_PARAMS: dict[str, dict] = {
@@ -92,9 +110,6 @@ _DOC_TYPE_PARAMS: dict[str, dict] = {
 }
 _DEFAULT_PARAMS = {"temperature": 0.7, "top_p": 0.90, "frequency_penalty": 0.3, "presence_penalty": 0.3}
 
-# Simple in-memory cache (keyed by content hash + params)
-_suggestion_cache: dict[str, dict] = {}
-
 EMPTY_CATEGORIES: dict[str, list] = {
     "grammar": [], "style": [], "structure": [], "content": [], "clarity": [], "other": []
 }
@@ -117,6 +132,7 @@ def _error(msg: str, details: str = "") -> str:
 # Main entry point
 # ---------------------------------------------------------------------------
 
+@timing.traced("generate_suggestions")
 def generate_suggestions(input_data: dict, num_retries: int = 3) -> str:
     """
     Analyze text and return structured writing suggestions via OpenRouter.
@@ -143,74 +159,47 @@ def generate_suggestions(input_data: dict, num_retries: int = 3) -> str:
     )
     tone: str  = input_data.get("tone", "professional")
     model: str = input_data.get("model", DEFAULT_MODEL)
+    analyze_all_chunks: bool = bool(input_data.get("analyzeAllChunks"))
+    hedge: bool | None = input_data.get("hedge")
 
     _debug(f"document_type={document_type} | tone={tone} | model={model}")
 
     # ------------------------------------------------------------------
-    # Optional utils enrichment
-    # ------------------------------------------------------------------
-    if _UTILS_AVAILABLE:
-        _debug(f"Content length: {len(content)} chars | ~{estimate_tokens(content)} tokens")
-        try:
-            topics = extract_key_topics(content)
-            _debug(f"Key topics: {', '.join(topics[:5]) or 'n/a'}")
-        except Exception as exc:
-            _debug(f"Topic extraction failed: {exc}")
-        try:
-            sentences   = safe_tokenize(content)
-            avg_words   = sum(len(s.split()) for s in sentences) / max(1, len(sentences))
-            _debug(f"Sentences: {len(sentences)} | Avg words/sentence: {avg_words:.1f}")
-        except Exception as exc:
-            _debug(f"Tokenization failed: {exc}")
-
-    # ------------------------------------------------------------------
-    # Chunking for long content
+    # Persistent cache — an unchanged document skips OpenRouter entirely
     # ------------------------------------------------------------------
-    cache_key     = _cache_key(content, document_type, tone, model)
-    content_to_use, is_chunk = _resolve_content(content, cache_key)
-
-    # ------------------------------------------------------------------
-    # Model parameters
-    # ------------------------------------------------------------------
-    params = dict(_DOC_TYPE_PARAMS.get(document_type, _DEFAULT_PARAMS))
-    if len(content_to_use) > 3000:
-        params["temperature"] = max(0.2, params["temperature"] - 0.1)
-
-    max_tokens = DEFAULT_MAX_TOKENS
-    if len(content_to_use) > 5000:
-        max_tokens = 3000
-    elif len(content_to_use) < 500:
-        max_tokens = 1500
-
-    _debug(f"params={params} | max_tokens={max_tokens}")
+    cache_key = suggestion_cache.make_key(
+        content, document_type, tone, model, f"{PROMPT_VERSION}:{SYSTEM_PROMPT.version}",
+        variant="all_chunks" if analyze_all_chunks else "",
+    )
+    with timing.span("cache_lookup"):
+        cached = suggestion_cache.get(cache_key)
+    if cached is not None:
+        _debug(f"Cache hit for key: {cache_key[:16]}")
+        cached["cache"] = {"hit": True}
+        with timing.span("serialize"):
+            return output_format.render(cached, input_data)
+
+    # Fail over if the requested model's circuit breaker is open
+    with timing.span("route"):
+        model, routing = model_health.route(model)
 
     # ------------------------------------------------------------------
-    # Prompt
+    # Optional utils enrichment
     # ------------------------------------------------------------------
-    suggestion_depth = (
-        "basic"       if len(content_to_use) < 200  else
-        "comprehensive" if len(content_to_use) > 2000 else
-        "detailed"
-    )
-    system_message = _build_system_prompt(document_type, tone, suggestion_depth)
-
-    messages = [
-        {"role": "system", "content": system_message},
-        {
-            "role": "user",
-            "content": (
-                f"Please analyze this {document_type} content and provide "
-                f"specific improvement suggestions:\n\n{content_to_use}"
-            ),
-        },
-    ]
-
-    payload = {
-        "model": model,
-        "messages": messages,
-        "max_tokens": max_tokens,
-        **params,
-    }
+    if _UTILS_AVAILABLE:
+        with timing.span("analysis"):
+            _debug(f"Content length: {len(content)} chars | ~{estimate_tokens(content, model)} tokens")
+            try:
+                topics = extract_key_topics(content)
+                _debug(f"Key topics: {', '.join(topics[:5]) or 'n/a'}")
+            except Exception as exc:
+                _debug(f"Topic extraction failed: {exc}")
+            try:
+                sentences   = safe_tokenize(content)
+                avg_words   = sum(len(s.split()) for s in sentences) / max(1, len(sentences))
+                _debug(f"Sentences: {len(sentences)} | Avg words/sentence: {avg_words:.1f}")
+            except Exception as exc:
+                _debug(f"Tokenization failed: {exc}")
 
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -220,33 +209,57 @@ def generate_suggestions(input_data: dict, num_retries: int = 3) -> str:
     }
 
     # ------------------------------------------------------------------
-    # API call with retry
+    # Chunking for long content
     # ------------------------------------------------------------------
-    raw_suggestions = _call_with_retry(headers, payload, num_retries)
-    if raw_suggestions is None:
-        return _error(
-            "OpenRouter rejected the request (often an invalid API key). "
-            "Create a new key at https://openrouter.ai/keys and paste it in Settings "
-            "or OPENROUTER_API_KEY in .env — no spaces or line breaks."
-        )
+    chunks = _chunk_content(content)
+    if analyze_all_chunks and len(chunks) > 1:
+        # Map: every chunk concurrently; reduce: merge + de-duplicate categories
+        with timing.span("map_reduce"):
+            raw_suggestions, parsed, failed_chunks = _map_reduce_chunks(
+                chunks, document_type, tone, model, headers, num_retries, hedge
+            )
+        if raw_suggestions is None:
+            return _error(
+                "OpenRouter rejected the request (often an invalid API key). "
+                "Create a new key at https://openrouter.ai/keys and paste it in Settings "
+                "or OPENROUTER_API_KEY in .env — no spaces or line breaks."
+            )
+        content_to_use, is_chunk = content, True
+    else:
+        with timing.span("build_prompt"):
+            content_to_use, is_chunk = _resolve_content(content)
+            payload = _build_payload(content_to_use, document_type, tone, model)
+
+        # --------------------------------------------------------------
+        # API call with retry
+        # --------------------------------------------------------------
+        with timing.span("network"):
+            raw_suggestions = _call_with_retry(headers, payload, num_retries, hedge=hedge)
+        if raw_suggestions is None:
+            return _error(
+                "OpenRouter rejected the request (often an invalid API key). "
+                "Create a new key at https://openrouter.ai/keys and paste it in Settings "
+                "or OPENROUTER_API_KEY in .env — no spaces or line breaks."
+            )
+        with timing.span("parse"):
+            parsed = _parse_suggestions(raw_suggestions)
 
     # ------------------------------------------------------------------
-    # Parse, score, filter
+    # Score, filter
     # ------------------------------------------------------------------
-    parsed     = _parse_suggestions(raw_suggestions)
-    filtered   = _filter_by_quality(parsed, threshold=0.45)
-
-    # Cache if full document
-    if not is_chunk and len(content_to_use) > 500:
-        _suggestion_cache[cache_key] = filtered
-        _debug(f"Cached result for key: {cache_key}")
+    with timing.span("filter"):
+        filtered   = _filter_by_quality(parsed, threshold=0.45)
 
     # ------------------------------------------------------------------
     # Build result
     # ------------------------------------------------------------------
+    analyzed = chunks if analyze_all_chunks and len(chunks) > 1 else [content_to_use]
     result: dict = {
         "suggestions":     filtered,
         "raw_suggestions": raw_suggestions,
+        "prompt":          SYSTEM_PROMPT.metadata(*(
+            _build_system_prompt(document_type, tone, _suggestion_depth(text)) for text in analyzed
+        )),
     }
 
     if is_chunk:
@@ -256,33 +269,47 @@ def generate_suggestions(input_data: dict, num_retries: int = 3) -> str:
             "processed_length": len(content_to_use),
             "chunk_ratio":      round(len(content_to_use) / len(content) * 100, 1),
         }
+        if analyze_all_chunks:
+            result["processing_info"].update({
+                "chunks":        len(chunks),
+                "failed_chunks": failed_chunks,
+            })
 
     if _UTILS_AVAILABLE:
-        try:
-            enriched = enrich_ai_response(raw_suggestions, content[:300])
-            result["enhanced_data"] = {
-                "structured_content": enriched["structured_data"],
-                "statistics":         enriched["statistics"],
-                "quality_metrics":    enriched["quality_metrics"],
-                "metadata":           enriched["metadata"],
-            }
-            if enriched["quality_metrics"].get("overall_quality_score", 1.0) < 0.7:
-                result["quality_warnings"] = enriched["quality_metrics"].get("potential_issues", [])
-        except Exception as exc:
-            _debug(f"enrich_ai_response failed: {exc}")
-
-    return json.dumps(result, ensure_ascii=False, indent=2)
+        with timing.span("enrichment"):
+            try:
+                enriched = enrich_ai_response(raw_suggestions, content[:300])
+                result["enhanced_data"] = {
+                    "structured_content": enriched["structured_data"],
+                    "statistics":         enriched["statistics"],
+                    "quality_metrics":    enriched["quality_metrics"],
+                    "metadata":           enriched["metadata"],
+                }
+                if enriched["quality_metrics"].get("overall_quality_score", 1.0) < 0.7:
+                    result["quality_warnings"] = enriched["quality_metrics"].get("potential_issues", [])
+            except Exception as exc:
+                _debug(f"enrich_ai_response failed: {exc}")
+
+    if routing:
+        result["model_routing"] = routing
+    partial = result.get("processing_info", {}).get("failed_chunks", 0) > 0
+    if not (routing and routing["failover"]) and not partial:
+        # A failover answer is not cached under the requested model's key, and a
+        # merge missing failed chunks is not cached at all, so the next request retries them.
+        with timing.span("cache_store"):
+            suggestion_cache.put(cache_key, result)
+        _debug(f"Cached result for key: {cache_key[:16]} | {suggestion_cache.stats()}")
+    result["cache"] = {"hit": False}
+
+    with timing.span("serialize"):
+        return output_format.render(result, input_data)
 
 
 # ---------------------------------------------------------------------------
 # Prompt builder
 # ---------------------------------------------------------------------------
 
-def _build_system_prompt(document_type: str, tone: str, suggestion_depth: str) -> str:
-    from writing_skills import suggestions_voice_note, tone_guidance, writing_voice_block
-
-    voice = writing_voice_block(extra=f"{tone_guidance(tone)}\n{suggestions_voice_note()}")
-    return f"""{voice}
+_SYSTEM_TEMPLATE = """{voice}
 
 You analyse {document_type} text and suggest improvements. The author's goal tone is {tone}. Depth: {suggestion_depth}.
 
@@ -308,6 +335,135 @@ Guidelines:
 - Example fixes must sound like a real person wrote them.
 - Return only the structured suggestions — no preamble, compliments, or closing remarks."""
 
+SYSTEM_PROMPT = prompts.register(
+    "suggestions",
+    _SYSTEM_TEMPLATE,
+    inputs=[suggestions_voice_note(), [tone_guidance(t) for t in ("professional", "casual", "formal")]],
+)
+
+
+def _build_system_prompt(document_type: str, tone: str, suggestion_depth: str) -> prompts.Prompt:
+    """The memoized system prompt for this document type, tone and depth."""
+    return SYSTEM_PROMPT.render(
+        voice_extra=f"{tone_guidance(tone)}\n{suggestions_voice_note()}",
+        document_type=document_type,
+        tone=tone,
+        suggestion_depth=suggestion_depth,
+    )
+
+
+def _suggestion_depth(content_to_use: str) -> str:
+    return (
+        "basic"       if len(content_to_use) < 200  else
+        "comprehensive" if len(content_to_use) > 2000 else
+        "detailed"
+    )
+
+
+def _build_payload(content_to_use: str, document_type: str, tone: str, model: str) -> dict:
+    """Model parameters, depth and messages for one analysis call."""
+    params = dict(_DOC_TYPE_PARAMS.get(document_type, _DEFAULT_PARAMS))
+    if len(content_to_use) > 3000:
+        params["temperature"] = max(0.2, params["temperature"] - 0.1)
+
+    max_tokens = DEFAULT_MAX_TOKENS
+    if len(content_to_use) > 5000:
+        max_tokens = 3000
+    elif len(content_to_use) < 500:
+        max_tokens = 1500
+
+    _debug(f"params={params} | max_tokens={max_tokens}")
+
+    system_prompt = _build_system_prompt(document_type, tone, _suggestion_depth(content_to_use))
+
+    messages = [
+        {"role": "system", "content": system_prompt.text},
+        {
+            "role": "user",
+            "content": (
+                f"Please analyze this {document_type} content and provide "
+                f"specific improvement suggestions:\n\n{content_to_use}"
+            ),
+        },
+    ]
+
+    return {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        **params,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Map-reduce over chunks
+# ---------------------------------------------------------------------------
+
+def _map_reduce_chunks(
+    chunks: list[str],
+    document_type: str,
+    tone: str,
+    model: str,
+    headers: dict,
+    num_retries: int,
+    hedge: bool | None = None,
+) -> tuple[str | None, dict[str, list], int]:
+    """
+    Analyze every chunk concurrently (at most CHUNK_CONCURRENCY calls in flight)
+    and merge the per-chunk categories, dropping near-duplicates produced by the
+    overlapping regions.
+
+    Returns:
+        (joined raw text or None if every chunk failed, merged categories, failed chunk count)
+    """
+    _debug(f"Analyzing all {len(chunks)} chunks (concurrency {CHUNK_CONCURRENCY}).")
+    with timing.span("build_prompt"):
+        payloads = [_build_payload(chunk, document_type, tone, model) for chunk in chunks]
+
+    with timing.span("network"):
+        raw_texts = async_client.run(async_client.gather_limited(
+            (_complete(headers, p, num_retries, hedge=hedge) for p in payloads), CHUNK_CONCURRENCY
+        ))
+
+    succeeded = [text for text in raw_texts if text is not None]
+    failed = len(raw_texts) - len(succeeded)
+    if not succeeded:
+        return None, dict(EMPTY_CATEGORIES), failed
+    if failed:
+        _debug(f"{failed}/{len(chunks)} chunks failed; merging the rest.")
+
+    with timing.span("parse"):
+        merged = _merge_categories([_parse_suggestions(text) for text in succeeded])
+    return "\n\n".join(succeeded), merged, failed
+
+
+def _normalize_suggestion(text: str) -> str:
+    text = re.sub(r'^\s*\d+[.)]\s*', '', text.lower())
+    return " ".join(re.findall(r'\w+', text))
+
+
+def _merge_categories(parts: list[dict[str, list]]) -> dict[str, list]:
+    """Concatenate per-chunk categories in chunk order, skipping near-duplicates."""
+    merged = {k: [] for k in EMPTY_CATEGORIES}
+    for categories in parts:
+        for cat, items in categories.items():
+            kept = merged.setdefault(cat, [])
+            seen = [_normalize_suggestion(s) for s in kept]
+            for item in items:
+                norm = _normalize_suggestion(item)
+                if any(_is_near_duplicate(norm, other) for other in seen):
+                    continue
+                kept.append(item)
+                seen.append(norm)
+    return merged
+
+
+def _is_near_duplicate(a: str, b: str) -> bool:
+    if a == b:
+        return True
+    matcher = SequenceMatcher(None, a, b, autojunk=False)
+    return matcher.real_quick_ratio() >= DUPLICATE_SIMILARITY and matcher.ratio() >= DUPLICATE_SIMILARITY
+
 
 # ---------------------------------------------------------------------------
 # HTTP
@@ -318,53 +474,33 @@ def _call_with_retry(
     payload: dict,
     max_retries: int = 3,
     base_delay: float = 2.0,
+    hedge: bool | None = None,
 ) -> str | None:
-    """POST to OpenRouter with exponential-backoff retry. Returns text or None."""
-    delay = base_delay
-
-    for attempt in range(1, max_retries + 1):
-        _debug(f"API attempt {attempt}/{max_retries}")
-        try:
-            resp = requests.post(OPENROUTER_API_URL, headers=headers, json=payload, timeout=60)
-            _debug(f"Status: {resp.status_code}")
-
-            if resp.status_code == 200:
-                return _extract_content(resp.json())
-
-            if resp.status_code in (401, 404):
-                _debug(f"Fatal HTTP {resp.status_code}: {resp.text}")
-                return None
-
-            if resp.status_code == 429:
-                if attempt < max_retries:
-                    _debug(f"Rate limited. Retrying in {delay}s …")
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
-                _debug("Rate limit exceeded after all retries.")
-                return None
-
-            _debug(f"Unexpected {resp.status_code}: {resp.text}")
-            if attempt < max_retries:
-                time.sleep(delay)
-                delay *= 2
-
-        except requests.Timeout:
-            _debug(f"Timeout on attempt {attempt}.")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
-
-        except requests.ConnectionError as exc:
-            _debug(f"Connection error: {exc}")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
+    """POST to OpenRouter with retry (and optional hedging). Returns text or None."""
+    return async_client.run(_complete(headers, payload, max_retries, base_delay, hedge))
 
-        except requests.RequestException as exc:
-            _debug(f"Request error: {exc}")
-            if attempt < max_retries:
-                time.sleep(delay); delay *= 2
 
-    return None
+async def _complete(
+    headers: dict,
+    payload: dict,
+    max_retries: int = 3,
+    base_delay: float = 2.0,
+    hedge: bool | None = None,
+) -> str | None:
+    """Engine-side _call_with_retry: one completion on the async_client loop."""
+    result = await async_client.complete(
+        headers,
+        payload,
+        url=OPENROUTER_API_URL,
+        read_timeout=60,
+        max_retries=max_retries,
+        base_delay=base_delay,
+        hedge=hedge,
+        log=_debug,
+    )
+    if not result.ok:
+        return None
+    return _extract_content(result.data)
 
 
 def _extract_content(response_data: dict) -> str | None:
@@ -546,13 +682,9 @@ def _filter_by_quality(categories: dict[str, list], threshold: float = 0.5) -> d
 
 
 # ---------------------------------------------------------------------------
-# Chunking & caching helpers
+# Chunking helpers
 # ---------------------------------------------------------------------------
 
-def _cache_key(content: str, document_type: str, tone: str, model: str) -> str:
-    return f"{hash(content)}_{document_type}_{tone}_{model}"
-
-
 def _chunk_content(content: str) -> list[str]:
     """Split long content into overlapping paragraph-aware chunks."""
     if len(content) <= MAX_CHUNK_SIZE:
@@ -575,16 +707,11 @@ def _chunk_content(content: str) -> list[str]:
     return chunks
 
 
-def _resolve_content(content: str, cache_key: str) -> tuple[str, bool]:
+def _resolve_content(content: str) -> tuple[str, bool]:
     """
     Return (content_to_process, is_chunk).
     For long content, returns only the most representative chunk.
     """
-    if cache_key in _suggestion_cache:
-        _debug(f"Cache hit for key: {cache_key}")
-        # Return cached result signal — caller should handle if needed
-        # (cache is checked inside generate_suggestions before calling this)
-
     if len(content) <= MAX_CHUNK_SIZE:
         return content, False
 
@@ -599,6 +726,12 @@ def _resolve_content(content: str, cache_key: str) -> tuple[str, bool]:
 # ---------------------------------------------------------------------------
 
 if __name__ == "__main__":
+    timing.mark_imported("generate_suggestions")
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        from startup_profile import profile_startup
+        print(json.dumps(profile_startup(__file__), indent=2))
+        sys.exit(0)
+
     if len(sys.argv) < 2:
         print(_error("No input provided. Pass a JSON string as the first argument."))
         sys.exit(1)
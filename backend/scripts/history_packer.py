@@ -0,0 +1,112 @@
+"""
+Fits a chat history into a model's token budget for generate_response.
+
+pack_history() walks the history once from the newest message back, keeping the
+longest recent run that fits, and builds the result with a single reverse (no
+list.insert per message). Token counts come from token_estimator, which
+memoizes them per message.
+
+When older turns do not fit, they are not silently discarded: they collapse
+into one system "summary" block listing each dropped turn's opening sentence,
+newest first until the block's own budget is spent. Summary lines are memoized
+per message, so a long session pays for each line once and later turns just
+re-assemble the block.
+
+The latest turn always wins over the summary: older kept turns give way to
+the summary's reserve first, and if the latest turn only fits the budget
+without that reserve it is sent without a summary.
+"""
+
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from token_estimator import estimate_message_tokens, estimate_tokens
+
+SUMMARY_SHARE      = 0.15   # fraction of the budget reserved for the summary block
+SUMMARY_MIN_TOKENS = 120
+SUMMARY_LINE_CHARS = 160
+
+SUMMARY_HEADER = (
+    "Summary of earlier conversation (older turns condensed to fit the context window):"
+)
+TRUNCATION_NOTE = "Note: The conversation history is extensive. Focusing on the most recent messages."
+
+_SENTENCE_RE   = re.compile(r"(.+?[.!?])(?:\s|$)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def _summary_line(role: str, content: str) -> str:
+    text = _WHITESPACE_RE.sub(" ", content).strip()
+    match = _SENTENCE_RE.match(text)
+    if match:
+        text = match.group(1)
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {role.capitalize()}: {text}"
+
+
+def _summary_block(dropped: List[Dict], budget: int, model: str) -> Dict:
+    lines: List[str] = []
+    used = estimate_tokens(SUMMARY_HEADER, model)
+    omitted = len(dropped)
+    for msg in reversed(dropped):
+        line = _summary_line(msg.get("role", "user"), str(msg.get("content") or ""))
+        cost = estimate_tokens(line, model) + 1
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+        omitted -= 1
+    lines.reverse()
+    if omitted:
+        lines.insert(0, f"- ({omitted} earlier messages not shown)")
+    return {"role": "system", "content": "\n".join([SUMMARY_HEADER, *lines])}
+
+
+def pack_history(
+    messages: List[Dict],
+    system_message: Dict,
+    model: str,
+    token_budget: float,
+) -> Tuple[List[Dict], Dict]:
+    """
+    Returns:
+        (messages to send, {"kept", "summarized", "tokens"}): the system message,
+        an optional summary block, then the most recent user/assistant turns.
+    """
+    history = [m for m in messages if m.get("role") in ("user", "assistant")]
+    counts = [estimate_message_tokens(m, model) for m in history]
+    used = estimate_message_tokens(system_message, model)
+
+    if used + sum(counts) < token_budget:
+        return [system_message, *history], {"kept": len(history), "summarized": 0, "tokens": used + sum(counts)}
+
+    # Keep the longest recent run that fits the whole budget.
+    start = len(history)
+    while start > 0 and used + counts[start - 1] < token_budget:
+        start -= 1
+        used += counts[start]
+
+    if start == len(history):
+        # Not even the latest turn fits; same fallback as before.
+        note = {"role": "system", "content": TRUNCATION_NOTE}
+        return [system_message, note], {"kept": 0, "summarized": 0, "tokens": used}
+
+    # Older turns remain: make room for their summary by giving back the oldest
+    # kept turns, but never the latest one — the summary goes first.
+    summary_budget = max(SUMMARY_MIN_TOKENS, int(token_budget * SUMMARY_SHARE))
+    while start < len(history) - 1 and used + summary_budget >= token_budget:
+        used -= counts[start]
+        start += 1
+
+    kept = history[start:]
+    if used + summary_budget >= token_budget:
+        return [system_message, *kept], {"kept": len(kept), "summarized": 0, "tokens": used}
+
+    summary = _summary_block(history[:start], summary_budget, model)
+    used += estimate_message_tokens(summary, model)
+    return [system_message, summary, *kept], {"kept": len(kept), "summarized": start, "tokens": used}
@@ -0,0 +1,121 @@
+"""
+Shared HTTP transport for OpenRouter calls.
+
+One pooled, keep-alive requests.Session per process so retries and (in the
+resident worker) later requests reuse TCP/TLS connections instead of paying a
+new handshake each time. Used by generate_response, generate_suggestions,
+improve_readability and utils.api_call_with_retry.
+
+Environment Variables:
+    OPENROUTER_API_URL          — Optional. Chat completions endpoint (default: OpenRouter; dev/stub_openrouter.py for load tests).
+    OPENROUTER_POOL_SIZE        — Optional. Max pooled connections per host (default: 10).
+    OPENROUTER_KEEPALIVE        — Optional. "0" disables HTTP and TCP keep-alive (default: "1").
+    OPENROUTER_CONNECT_TIMEOUT  — Optional. Connect timeout in seconds (default: 5).
+    OPENROUTER_READ_TIMEOUT     — Optional. Default read timeout in seconds (default: 60).
+"""
+
+from __future__ import annotations
+
+import os
+import socket
+import threading
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+POOL_SIZE       = int(os.getenv("OPENROUTER_POOL_SIZE", 10))
+KEEPALIVE       = os.getenv("OPENROUTER_KEEPALIVE", "1") != "0"
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT    = float(os.getenv("OPENROUTER_READ_TIMEOUT", 60))
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "connections_opened": 0}
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _count("connections_opened")
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _count("connections_opened")
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count every new connection they open."""
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        if KEEPALIVE:
+            pool_kwargs.setdefault(
+                "socket_options",
+                HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)],
+            )
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session (created on first use)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _PooledAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                if not KEEPALIVE:
+                    session.headers["Connection"] = "close"
+                _session = session
+    return _session
+
+
+def post(
+    url: str,
+    *,
+    headers: dict,
+    json: Any,
+    read_timeout: float | None = None,
+    stream: bool = False,
+) -> requests.Response:
+    """POST through the pooled session with separate connect/read timeouts."""
+    _count("requests")
+    return get_session().post(
+        url,
+        headers=headers,
+        json=json,
+        timeout=(CONNECT_TIMEOUT, read_timeout if read_timeout is not None else READ_TIMEOUT),
+        stream=stream,
+    )
+
+
+def transport_stats() -> dict:
+    """Connection-reuse counters for this process."""
+    with _stats_lock:
+        requests_made = _stats["requests"]
+        opened = _stats["connections_opened"]
+    return {
+        "requests": requests_made,
+        "connections_opened": opened,
+        "connections_reused": max(0, requests_made - opened),
+    }
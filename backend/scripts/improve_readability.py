@@ -1,10 +1,78 @@
 #!/usr/bin/env python
+"""
+improve_readability.py
+Rewrite text for readability using the OpenRouter API.
+
+Usage:
+    python improve_readability.py '<json_input>'
+
+JSON Input Schema:
+    {
+        "content": str,                 # Required: the document
+        "selectedText": str,            # Optional: rewrite only this passage (content is context)
+        "targetAudience": str,          # Optional: e.g. "general", "technical" (default: "general")
+        "readingLevel": str,            # Optional: "simple" | "intermediate" | "advanced"
+        "additionalInstructions": str,  # Optional
+        "model": str,                   # Optional: OpenRouter model ID (default: DEFAULT_MODEL env var)
+        "segmented": bool,              # Optional: force document mode on/off (default: on above
+                                        #           READABILITY_SEGMENT_THRESHOLD tokens)
+        "diff": "word" | "sentence",    # Optional: return edits instead of improved_content (true = "word")
+        "stream": bool,                 # Optional: emit NDJSON events (segments as they finish)
+        "hedge": bool                   # Optional: hedge slow attempts (default: OPENROUTER_HEDGE env var)
+    }
+
+Document mode: a whole document is split on paragraph boundaries into segments
+of at most READABILITY_SEGMENT_TOKENS tokens, rewritten concurrently (each with
+the end of the previous segment and the start of the next as read-only
+context) and reassembled in order. The output adds "segments": per-segment
+word counts and status. A segment whose rewrite fails keeps its original text.
+
+It is used when the request sets "segmented": true, or automatically when the
+document is longer than READABILITY_SEGMENT_THRESHOLD tokens — by default
+MAX_TOKENS, the point where a one-call rewrite (about as long as its input)
+would be cut off by the completion limit. Anything shorter still gets one
+coherent rewrite, as before document mode existed; "segmented": false forces
+one call at any length.
+
+Every successful output carries "readability": readability.compare() of the
+original (or selected) text and the rewrite — Flesch Reading Ease,
+Flesch-Kincaid grade, Gunning Fog, SMOG and passive-voice ratio, before and
+after, with deltas and an "easier" flag — computed locally, no extra LLM call.
+
+Diff mode (``"diff": "word"`` or ``"sentence"``) replaces "improved_content"
+with "diff": text_diff.diff_summary() of the original (the selected passage for
+a selection, else the document) and the rewrite — insert/delete/replace edits
+with character offsets into the original, so the output grows with what
+changed rather than with the document. "diff_base" says which text the offsets
+refer to ("selection" or "content"); text_diff.apply_edits() rebuilds the rewrite.
+
+Stream mode (``"stream": true``) prints one JSON object per line:
+    {"type": "segment", "index": int, "count": int, "improved_content": str,
+     "original_word_count": int, "improved_word_count": int}    # as each segment finishes
+    {"type": "done", "improved_content": str, ...}               # same fields as normal mode
+    {"type": "error", "error": str, "details"?}                  # terminal; exit code 1
+
+Environment Variables:
+    OPENROUTER_API_KEY          — Required. Your OpenRouter API key.
+    DEFAULT_MODEL               — Optional. Override the default model.
+    TEMPERATURE                 — Optional. Sampling temperature (default: 0.7).
+    MAX_TOKENS                  — Optional. Max tokens per completion (default: 1000).
+    READABILITY_SEGMENT_TOKENS  — Optional. Segment size in document mode (default: 600).
+    READABILITY_SEGMENT_THRESHOLD — Optional. Document length that turns document mode on
+                                  automatically (default: MAX_TOKENS).
+    READABILITY_CONCURRENCY     — Optional. Segments rewritten at once (default: 4).
+"""
 import json
+import queue
+import re
 import sys
 import os
-import requests
+import threading
+from typing import Callable, Iterator, List, Optional
+
+import timing  # first, so import_ms covers the imports below
+
 from dotenv import load_dotenv
-import time
 
 # Search up to 3 directory levels for repo-root .env (same as generate_response.py)
 _here = os.path.abspath(__file__)
@@ -18,11 +86,47 @@ for _levels in range(1, 4):
 else:
     load_dotenv()
 
+import async_client
+import http_transport
+import model_health
+import prompts
+import readability
+import text_diff
 from utils import sanitize_api_key
+from writing_skills import readability_voice_note
 from openrouter_response import extract_assistant_text
 
 _API_DETAIL_MAX = 500
 
+MAX_TOKENS          = int(os.getenv("MAX_TOKENS", 1000))
+SEGMENT_TOKENS      = int(os.getenv("READABILITY_SEGMENT_TOKENS", 600))
+SEGMENT_THRESHOLD   = int(os.getenv("READABILITY_SEGMENT_THRESHOLD", MAX_TOKENS))
+SEGMENT_CONCURRENCY = int(os.getenv("READABILITY_CONCURRENCY", 4))
+_CONTEXT_CHARS      = 400   # neighbouring text shown around each segment
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT_RE  = re.compile(r"(?<=[.!?])\s+")
+
+_SYSTEM_TEMPLATE = """{voice}
+
+Rewrite the user's text so it's easier to read — still the same meaning, still the WRITING VOICE.
+
+Target audience: {target_audience}
+Reading level: {reading_level} ({grade_level})
+
+How to improve readability:
+- Shorter sentences where the original is tangled; keep some variety.
+- Plain words instead of jargon when you can.
+- Active voice when it sounds natural — don't flatten every sentence.
+- Paragraph breaks where they'd help scanning.
+- Do NOT turn it into formal essay tone or AI polish.
+
+Additional instructions: {additional_instructions}
+
+Output only the rewritten text — no intro, no "here's the improved version", no bullet lists unless the source used them."""
+
+SYSTEM_PROMPT = prompts.register("readability", _SYSTEM_TEMPLATE, inputs=[readability_voice_note()])
+
 
 def _clip_detail(text, limit=_API_DETAIL_MAX):
     """Truncate provider error bodies for JSON + logs (never log secrets)."""
@@ -36,9 +140,13 @@ def _debug(msg: str) -> None:
     print(f"[improve_readability] {msg}", file=sys.stderr)
 
 
-def improve_readability(data):
+@timing.traced("improve_readability")
+def improve_readability(data, on_segment: Optional[Callable[[dict], None]] = None):
     """
     Improve the readability of the provided content based on specified parameters
+
+    on_segment, if given, is called with each segment event as document mode
+    finishes it (from the async_client engine thread).
     """
     api_key = sanitize_api_key(os.getenv('OPENROUTER_API_KEY'))
     
@@ -61,6 +169,14 @@ def improve_readability(data):
         return json.dumps({
             "error": "No content provided for readability improvement"
         })
+
+    diff_granularity = data.get('diff')
+    if diff_granularity is True:
+        diff_granularity = "word"
+    if diff_granularity and diff_granularity not in text_diff.GRANULARITIES:
+        return json.dumps({
+            "error": f"Invalid diff granularity: {diff_granularity!r} (expected one of {', '.join(text_diff.GRANULARITIES)})"
+        })
     
     # Map reading levels to approximate grade levels
     reading_level_mapping = {
@@ -71,26 +187,16 @@ def improve_readability(data):
     
     grade_level = reading_level_mapping.get(reading_level, "middle school to high school (grades 6-12)")
     
-    from writing_skills import readability_voice_note, writing_voice_block
-
-    voice = writing_voice_block(extra=readability_voice_note())
-    system_message = f"""{voice}
-
-Rewrite the user's text so it's easier to read — still the same meaning, still the WRITING VOICE.
-
-Target audience: {target_audience}
-Reading level: {reading_level} ({grade_level})
-
-How to improve readability:
-- Shorter sentences where the original is tangled; keep some variety.
-- Plain words instead of jargon when you can.
-- Active voice when it sounds natural — don't flatten every sentence.
-- Paragraph breaks where they'd help scanning.
-- Do NOT turn it into formal essay tone or AI polish.
-
-Additional instructions: {additional_instructions}
-
-Output only the rewritten text — no intro, no "here's the improved version", no bullet lists unless the source used them."""
+    with timing.span("build_prompt"):
+        system_prompt = SYSTEM_PROMPT.render(
+            voice_extra=readability_voice_note(),
+            target_audience=target_audience,
+            reading_level=reading_level,
+            grade_level=grade_level,
+            additional_instructions=additional_instructions,
+        )
+    system_message = system_prompt.text
+    prompt_meta = SYSTEM_PROMPT.metadata(system_prompt)
 
     if is_selection:
         context_snippet = content[:2500] + ("…" if len(content) > 2500 else "")
@@ -105,6 +211,11 @@ Surrounding document (context only — do not rewrite all of this):
     else:
         user_message = f"Please improve the readability of this content:\n\n{content}"
     
+    # Route only once the request is known to be valid, so rejected input never
+    # spends a half-open breaker's trial slot
+    with timing.span("route"):
+        model, routing = model_health.route(model)
+
     # Prepare the request
     headers = {
         "Authorization": f"Bearer {api_key}",
@@ -113,6 +224,97 @@ Surrounding document (context only — do not rewrite all of this):
         "X-Title": "AI Writing Assistant"
     }
 
+    if not is_selection and _use_segments(data, content, model):
+        try:
+            with timing.span("segment"):
+                segments = split_segments(content, SEGMENT_TOKENS, model)
+            _debug(f"Document mode: {len(segments)} segments (concurrency {SEGMENT_CONCURRENCY})")
+            with timing.span("network"):
+                output = _improve_segments(
+                    headers, system_message, model, segments, data.get('hedge'), on_segment
+                )
+            if "error" not in output:
+                with timing.span("score"):
+                    output["readability"] = readability.compare(content, output["improved_content"])
+                output["prompt"] = prompt_meta
+                if diff_granularity:
+                    with timing.span("diff"):
+                        _replace_with_diff(output, content, diff_granularity, "content")
+                if routing:
+                    output["model_routing"] = routing
+            with timing.span("serialize"):
+                return json.dumps(output)
+        except Exception as e:
+            error_message = f"Exception occurred: {str(e)}"
+            print(f"Debug - Error: {error_message}", file=sys.stderr)
+            return json.dumps({"error": error_message})
+
+    payload = _build_payload(model, system_message, user_message)
+
+    # For nvidia models, use a different endpoint if needed
+    api_endpoint = http_transport.OPENROUTER_API_URL
+    
+    try:
+        with timing.span("network"):
+            result = async_client.run(async_client.complete(
+                headers,
+                payload,
+                url=api_endpoint,
+                read_timeout=30,
+                max_retries=3,
+                base_delay=2,
+                retry_unexpected=False,
+                hedge=data.get('hedge'),
+                log=_debug,
+            ))
+
+        if result.ok:
+            improved_content = result.content
+            if not improved_content:
+                _debug("Failed to extract assistant content from OpenRouter response")
+                return json.dumps({
+                    "error": "Failed to extract improved content from API response",
+                    "details": "The response format was unexpected. Please try again or try a different model."
+                })
+
+            output = {
+                "improved_content": improved_content,
+                "is_selection": is_selection,
+                "original_word_count": len((selected_text if is_selection else content).split()),
+                "improved_word_count": len(improved_content.split()),
+                "usage": result.data.get('usage', {}),
+                "prompt": prompt_meta,
+            }
+            with timing.span("score"):
+                output["readability"] = readability.compare(
+                    selected_text if is_selection else content, improved_content
+                )
+            if diff_granularity:
+                with timing.span("diff"):
+                    _replace_with_diff(
+                        output,
+                        selected_text if is_selection else content,
+                        diff_granularity,
+                        "selection" if is_selection else "content",
+                    )
+            if routing:
+                output["model_routing"] = routing
+            if result.hedge:
+                output["hedge"] = result.hedge
+            with timing.span("serialize"):
+                return json.dumps(output)
+
+        return json.dumps(_completion_error(result))
+    except Exception as e:
+        error_message = f"Exception occurred: {str(e)}"
+        print(f"Debug - Error: {error_message}", file=sys.stderr)
+        
+        return json.dumps({
+            "error": error_message
+        })
+
+
+def _build_payload(model, system_message, user_message):
     messages = [
         {"role": "system", "content": system_message},
         {"role": "user", "content": user_message},
@@ -125,7 +327,7 @@ Surrounding document (context only — do not rewrite all of this):
             "model": model,
             "prompt": f"<|system|>\n{system_message}\n<|user|>\n{user_message}\n<|assistant|>",
             "temperature": float(os.getenv('TEMPERATURE', 0.7)),
-            "max_tokens": int(os.getenv('MAX_TOKENS', 1000)),
+            "max_tokens": MAX_TOKENS,
             "top_p": 0.9,
             "stop": ["<|user|>", "<|system|>"]
         }
@@ -135,111 +337,234 @@ Surrounding document (context only — do not rewrite all of this):
             "model": model,
             "messages": messages,
             "temperature": float(os.getenv('TEMPERATURE', 0.7)),
-            "max_tokens": int(os.getenv('MAX_TOKENS', 1000))
+            "max_tokens": MAX_TOKENS
         }
     
-    # For nvidia models, use a different endpoint if needed
-    api_endpoint = "https://openrouter.ai/api/v1/chat/completions"
-    
-    try:
-        # Implement retry logic
-        max_retries = 3
-        retry_delay = 2
-        
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    api_endpoint,
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code == 404:
-                    _debug("OpenRouter returned 404")
-                    return json.dumps({
-                        "error": "API endpoint not found (404). Please check the OpenRouter API URL.",
-                        "details": _clip_detail(response.text),
-                    })
-                
-                if response.status_code == 401:
-                    _debug("OpenRouter returned 401")
-                    return json.dumps({
-                        "error": "Authentication failed (401). Please check your OpenRouter API key.",
-                        "details": "Your API key may be invalid or expired. Get a new key at https://openrouter.ai/keys",
-                    })
-                
-                if response.status_code == 200:
-                    response_data = response.json()
-                    
-                    # Extract the assistant's message with better error handling
-                    try:
-                        improved_content = extract_assistant_text(response_data)
-                        
-                        if not improved_content:
-                            _debug("Failed to extract assistant content from OpenRouter response")
-                            return json.dumps({
-                                "error": "Failed to extract improved content from API response",
-                                "details": "The response format was unexpected. Please try again or try a different model."
-                            })
-                        
-                        return json.dumps({
-                            "improved_content": improved_content,
-                            "is_selection": is_selection,
-                            "original_word_count": len((selected_text if is_selection else content).split()),
-                            "improved_word_count": len(improved_content.split()),
-                            "usage": response_data.get('usage', {})
-                        })
-                    except Exception as e:
-                        print(f"Exception when extracting content from response: {str(e)}", file=sys.stderr)
-                        return json.dumps({
-                            "error": f"Error processing API response: {str(e)}",
-                            "details": "Please try again with different content or a different model."
-                        })
-                # Handle rate limiting
-                elif response.status_code == 429:
-                    if attempt < max_retries - 1:
-                        print(f"Rate limited. Retrying in {retry_delay} seconds...", file=sys.stderr)
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                        continue
-                    else:
-                        error_detail = response.text
-                        print(f"API rate limit exceeded: {error_detail}", file=sys.stderr)
-                        return json.dumps({
-                            "error": "API rate limit exceeded. Please try again later.",
-                            "details": _clip_detail(error_detail),
-                        })
-                else:
-                    error_message = f"API request failed with status code {response.status_code}"
-                    _debug(error_message)
-                    return json.dumps({
-                        "error": error_message,
-                        "details": _clip_detail(response.text),
-                    })
-            except requests.RequestException as req_err:
-                if attempt < max_retries - 1:
-                    print(f"Request error: {str(req_err)}. Retrying...", file=sys.stderr)
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    print(f"Request failed after {max_retries} attempts: {str(req_err)}", file=sys.stderr)
-                    return json.dumps({"error": f"Request error after retries: {str(req_err)}"})
-    except Exception as e:
-        error_message = f"Exception occurred: {str(e)}"
-        print(f"Debug - Error: {error_message}", file=sys.stderr)
-        
-        return json.dumps({
-            "error": error_message
-        })
+    return payload
+
+
+def _completion_error(result):
+    """Error JSON (dict) for a Completion that did not succeed."""
+    if result.status == 404:
+        _debug("OpenRouter returned 404")
+        return {
+            "error": "API endpoint not found (404). Please check the OpenRouter API URL.",
+            "details": _clip_detail(result.text),
+        }
+
+    if result.status == 401:
+        _debug("OpenRouter returned 401")
+        return {
+            "error": "Authentication failed (401). Please check your OpenRouter API key.",
+            "details": "Your API key may be invalid or expired. Get a new key at https://openrouter.ai/keys",
+        }
+
+    if result.status == 429:
+        print(f"API rate limit exceeded: {result.text}", file=sys.stderr)
+        return {
+            "error": "API rate limit exceeded. Please try again later.",
+            "details": _clip_detail(result.text),
+        }
+
+    if result.status is not None:
+        error_message = f"API request failed with status code {result.status}"
+        _debug(error_message)
+        return {
+            "error": error_message,
+            "details": _clip_detail(result.text),
+        }
+
+    print(f"Request failed after retries: {result.error}", file=sys.stderr)
+    return {"error": f"Request error after retries: {result.error}"}
+
+
+# ---------------------------------------------------------------------------
+# Document mode
+# ---------------------------------------------------------------------------
+
+def _replace_with_diff(output, original, granularity, base):
+    """Swap output["improved_content"] for an edit list against original (diff mode)."""
+    improved_content = output.pop("improved_content")
+    output["diff"] = text_diff.diff_summary(original, improved_content, granularity)
+    output["diff_base"] = base
+
+
+def _tokens(text, model):
+    from utils import estimate_tokens
+
+    return estimate_tokens(text, model)
+
+
+def _use_segments(data, content, model):
+    requested = data.get('segmented')
+    if requested is not None:
+        return bool(requested)
+    return _tokens(content, model) > SEGMENT_THRESHOLD
+
+
+def split_segments(content: str, budget: int, model: Optional[str] = None) -> List[str]:
+    """
+    Split content on paragraph boundaries into segments of at most budget tokens.
+
+    Consecutive paragraphs are packed together; a paragraph longer than the
+    budget is split between sentences (a single over-long sentence stays whole).
+    """
+    paragraphs = [p.strip() for p in _PARAGRAPH_SPLIT_RE.split(content) if p.strip()]
+    pieces = []  # (text, tokens, joiner)
+    for paragraph in paragraphs:
+        tokens = _tokens(paragraph, model)
+        if tokens <= budget:
+            pieces.append((paragraph, tokens, "\n\n"))
+            continue
+        for i, sentence in enumerate(_SENTENCE_SPLIT_RE.split(paragraph)):
+            pieces.append((sentence, _tokens(sentence, model), "\n\n" if i == 0 else " "))
+
+    segments: List[str] = []
+    current, current_tokens = "", 0
+    for text, tokens, joiner in pieces:
+        if current and current_tokens + tokens > budget:
+            segments.append(current)
+            current, current_tokens = "", 0
+        current = f"{current}{joiner}{text}" if current else text
+        current_tokens += tokens
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _segment_message(segments: List[str], index: int) -> str:
+    before = segments[index - 1][-_CONTEXT_CHARS:] if index > 0 else ""
+    after = segments[index + 1][:_CONTEXT_CHARS] if index + 1 < len(segments) else ""
+    parts = [
+        f"This is part {index + 1} of {len(segments)} of a longer document. "
+        "Improve ONLY the passage below. Return ONLY the improved passage — same meaning, "
+        "better readability, same paragraph breaks where they still make sense. "
+        "Do not continue into or repeat the surrounding text."
+    ]
+    if before:
+        parts.append(f"---PRECEDING TEXT (context only)---\n…{before}")
+    parts.append(f"---PASSAGE TO IMPROVE---\n{segments[index]}\n---END PASSAGE---")
+    if after:
+        parts.append(f"---FOLLOWING TEXT (context only)---\n{after}…")
+    return "\n\n".join(parts)
+
+
+def _improve_segments(headers, system_message, model, segments, hedge, on_segment):
+    """Rewrite segments concurrently and reassemble them; returns the output dict."""
+
+    async def _one(index):
+        payload = _build_payload(model, system_message, _segment_message(segments, index))
+        result = await async_client.complete(
+            headers,
+            payload,
+            url=http_transport.OPENROUTER_API_URL,
+            read_timeout=30,
+            max_retries=3,
+            base_delay=2,
+            retry_unexpected=False,
+            hedge=hedge,
+            log=_debug,
+        )
+        improved = result.content if result.ok else None
+        event = {
+            "index": index,
+            "count": len(segments),
+            "improved_content": improved or segments[index],
+            "original_word_count": len(segments[index].split()),
+            "improved_word_count": len((improved or segments[index]).split()),
+        }
+        if on_segment is not None:
+            on_segment(event)
+        return result, event
+
+    results = async_client.run(async_client.gather_limited(
+        (_one(i) for i in range(len(segments))), SEGMENT_CONCURRENCY
+    ))
+
+    failed = [(i, r) for i, (r, _) in enumerate(results) if not (r.ok and r.content)]
+    if len(failed) == len(segments):
+        result = failed[0][1]
+        if result.ok:
+            _debug("Failed to extract assistant content from OpenRouter response")
+            return {
+                "error": "Failed to extract improved content from API response",
+                "details": "The response format was unexpected. Please try again or try a different model."
+            }
+        return _completion_error(result)
+    if failed:
+        _debug(f"{len(failed)}/{len(segments)} segments failed; keeping their original text.")
+
+    usage = {}
+    report = []
+    for (result, event), segment in zip(results, segments):
+        for key, value in ((result.data or {}).get('usage') or {}).items():
+            if isinstance(value, (int, float)):
+                usage[key] = usage.get(key, 0) + value
+        row = {
+            "index": event["index"],
+            "original_word_count": event["original_word_count"],
+            "improved_word_count": event["improved_word_count"],
+            "ok": bool(result.ok and result.content),
+        }
+        if not row["ok"]:
+            row["error"] = _clip_detail(result.error or f"status {result.status}", 200)
+        report.append(row)
+
+    improved_content = "\n\n".join(event["improved_content"] for _, event in results)
+    return {
+        "improved_content": improved_content,
+        "is_selection": False,
+        "original_word_count": sum(len(segment.split()) for segment in segments),
+        "improved_word_count": len(improved_content.split()),
+        "usage": usage,
+        "segments": report,
+        "failed_segments": len(failed),
+    }
+
+
+def improve_readability_stream(data) -> Iterator[dict]:
+    """
+    Streaming variant of improve_readability: yields a "segment" event as each
+    document-mode segment finishes (in completion order), then "done" or "error".
+    """
+    events: queue.Queue = queue.Queue()
+
+    def _run():
+        try:
+            events.put(("final", improve_readability(data, on_segment=lambda e: events.put(("segment", e)))))
+        except BaseException as exc:  # surface anything, including cancellation, as an error event
+            events.put(("final", json.dumps({"error": f"Exception occurred: {exc}"})))
+
+    threading.Thread(target=_run, name="improve-readability", daemon=True).start()
+    while True:
+        kind, value = events.get()
+        if kind == "segment":
+            yield {"type": "segment", **value}
+            continue
+        output = json.loads(value)
+        yield {"type": "error", **output} if "error" in output else {"type": "done", **output}
+        return
+
 
 if __name__ == "__main__":
+    timing.mark_imported("improve_readability")
+    if len(sys.argv) > 1 and sys.argv[1] == "--profile-startup":
+        from startup_profile import profile_startup
+        print(json.dumps(profile_startup(__file__), indent=2))
+        sys.exit(0)
+
     if len(sys.argv) < 2:
         print(json.dumps({"error": "No input data provided"}))
         sys.exit(1)
     try:
         input_data = json.loads(sys.argv[1])
+        if isinstance(input_data, dict) and input_data.get("stream"):
+            # NDJSON: one event per line, flushed as soon as it is produced
+            failed = False
+            for event in improve_readability_stream(input_data):
+                failed = failed or event["type"] == "error"
+                print(json.dumps(event), flush=True)
+            sys.exit(1 if failed else 0)
         result = improve_readability(input_data)
         print(result)
         try:
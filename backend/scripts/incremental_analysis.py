@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+"""
+incremental_analysis.py
+Incremental document analysis for the editor, keyed by paragraph hashes.
+
+The editor asks for analysis again after every small edit, and
+analyze_content_metrics, analyze_response_statistics and extract_key_topics
+each start over on the full document. IncrementalAnalyzer splits the document
+into paragraphs ('\\n\\n', as those functions do), hashes each one and keeps its
+partial results (word counts, sentence lengths, term frequencies) in a bounded
+LRU cache. Document-level totals are running sums: an edit subtracts the
+partials of paragraphs that disappeared and adds those of new ones, so the
+Python-level work follows the size of the edit. Only hashing the paragraphs
+and one pass over their small per-paragraph tuples touch the whole document.
+
+Results match the utils functions, with one deliberate difference: for the
+statistics, sentences are split within each paragraph, so a paragraph that
+ends without terminal punctuation (a heading, a list line) is its own sentence
+rather than being glued to the next paragraph.
+
+Usage:
+    python incremental_analysis.py '<json_input>'
+
+JSON Input Schema:
+    {
+        "content": str,       # Required: the full document text
+        "documentId": str,    # Optional: reuse partials from earlier calls for this document
+        "maxTopics": int      # Optional: number of key topics, >= 0 (default: 10)
+    }
+
+Output:
+    {"content_metrics": {...}, "statistics": {...}, "key_topics": [...],
+     "incremental": {"paragraphs": int, "computed": int, "reused": int}}
+
+Under worker.py, analyzers persist between calls (one per documentId, LRU
+bounded); a one-shot CLI call starts cold.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import math
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+from text_analysis import _keyword_counts
+from utils import safe_tokenize, topic_word_counts
+
+PARAGRAPH_CACHE_SIZE = 4096   # partials kept per analyzer, beyond the live document
+MAX_DOCUMENTS        = 32     # analyzers kept by analyze_document()
+
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_CONTENT_TYPES   = ("explanatory", "instructional", "analytical", "persuasive")
+
+
+class _Paragraph(NamedTuple):
+    """Partial results for one paragraph."""
+    words: int
+    word_chars: int
+    lower_words: Counter
+    # re.split(r'[.!?]+') fragments, for analyze_content_metrics' sentence count
+    fragments: int               # non-blank fragments
+    first_fragment: bool         # first fragment non-blank
+    last_fragment: bool          # last fragment non-blank
+    single_fragment: bool        # no sentence punctuation at all
+    sentence_lengths: Tuple[int, ...]
+    keywords: Dict[str, int]
+    topics: Dict[str, int]       # first-occurrence order
+
+
+def _paragraph_key(paragraph: str) -> bytes:
+    return hashlib.blake2b(paragraph.encode("utf-8"), digest_size=16).digest()
+
+
+def _analyze_paragraph(paragraph: str) -> _Paragraph:
+    words = paragraph.split()
+    fragments = _SENTENCE_END_RE.split(paragraph)
+
+    sentence_lengths: Tuple[int, ...] = ()
+    if paragraph.strip():
+        try:
+            sentences = safe_tokenize(paragraph)
+        except Exception:
+            sentences = [s.strip() for s in _SENTENCE_END_RE.split(paragraph) if s.strip()]
+        sentence_lengths = tuple(len(s.split()) for s in sentences)
+
+    return _Paragraph(
+        words=len(words),
+        word_chars=sum(len(w) for w in words),
+        lower_words=Counter(w.lower() for w in words),
+        fragments=sum(1 for f in fragments if f.strip()),
+        first_fragment=bool(fragments[0].strip()),
+        last_fragment=bool(fragments[-1].strip()),
+        single_fragment=len(fragments) == 1,
+        sentence_lengths=sentence_lengths,
+        keywords=_keyword_counts(paragraph),
+        topics=topic_word_counts(paragraph),
+    )
+
+
+class IncrementalAnalyzer:
+    """
+    Keeps one document's analysis up to date across edits.
+
+    analyze(content) returns the same keys as analyze_document(); call it with
+    the full text after each edit.
+    """
+
+    def __init__(self, cache_size: int = PARAGRAPH_CACHE_SIZE):
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[bytes, _Paragraph]" = OrderedDict()
+        self._live: Counter = Counter()          # paragraph key -> occurrences in the document
+        self._partials: Dict[bytes, _Paragraph] = {}
+
+        self._words = 0
+        self._word_chars = 0
+        self._lower_words: Counter = Counter()
+        self._sentence_lengths: Counter = Counter()
+        self._keywords: Counter = Counter()
+        self._topics: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    # Running totals
+    # ------------------------------------------------------------------
+
+    def _apply(self, part: _Paragraph, sign: int) -> None:
+        self._words += sign * part.words
+        self._word_chars += sign * part.word_chars
+        for total, counts in (
+            (self._lower_words, part.lower_words),
+            (self._sentence_lengths, Counter(part.sentence_lengths)),
+            (self._keywords, part.keywords),
+            (self._topics, part.topics),
+        ):
+            for key, n in counts.items():
+                value = total[key] + sign * n
+                if value:
+                    total[key] = value
+                else:
+                    del total[key]
+
+    def analyze(self, content: str, max_topics: int = 10) -> Dict[str, Any]:
+        paragraphs = content.split('\n\n')
+        keys = [_paragraph_key(p) for p in paragraphs]
+        new_live = Counter(keys)
+
+        computed = 0
+        for key in self._live.keys() - new_live.keys():
+            part = self._partials.pop(key)
+            for _ in range(self._live[key]):
+                self._apply(part, -1)
+            self._remember(key, part)
+        for key, paragraph in zip(keys, paragraphs):
+            if key not in self._partials:
+                part = self._cache.pop(key, None)
+                if part is None:
+                    part = _analyze_paragraph(paragraph)
+                    computed += 1
+                self._partials[key] = part
+            delta = new_live[key] - self._live.get(key, 0)
+            if delta:
+                part = self._partials[key]
+                for _ in range(abs(delta)):
+                    self._apply(part, 1 if delta > 0 else -1)
+                self._live[key] = new_live[key]
+        self._live = new_live
+
+        ordered = [self._partials[key] for key in keys]
+        return {
+            "content_metrics": self._content_metrics(ordered, len(content)),
+            "statistics":      self._statistics(),
+            "key_topics":      self._key_topics(ordered, max_topics),
+            "incremental":     {"paragraphs": len(keys), "computed": computed, "reused": len(keys) - computed},
+        }
+
+    def _remember(self, key: bytes, part: _Paragraph) -> None:
+        self._cache[key] = part
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Document-level results
+    # ------------------------------------------------------------------
+
+    def _content_metrics(self, ordered: List[_Paragraph], char_count: int) -> Dict[str, Any]:
+        """Same dict as utils.analyze_content_metrics."""
+        para_count = sum(1 for part in ordered if part.words)
+
+        # Joining paragraphs merges the last fragment of one with the first of
+        # the next; a paragraph without punctuation keeps the merge going.
+        fragments = 0
+        last_open = False      # trailing fragment of the text so far is non-blank
+        for part in ordered:
+            fragments += part.fragments
+            if last_open and part.first_fragment:
+                fragments -= 1
+            last_open = (last_open or part.last_fragment) if part.single_fragment else part.last_fragment
+
+        word_count = self._words
+        reading_time_minutes = round(word_count / 225, 1)
+        return {
+            "word_count": word_count,
+            "character_count": char_count,
+            "paragraph_count": para_count,
+            "sentence_count": fragments,
+            "avg_sentence_length": round(word_count / max(fragments, 1), 1),
+            "avg_paragraph_length": round(word_count / max(para_count, 1), 1),
+            "estimated_reading_time": f"{reading_time_minutes} min",
+        }
+
+    def _statistics(self) -> Dict[str, Any]:
+        """Same dict as utils.analyze_response_statistics (sentences split per paragraph)."""
+        hist = self._sentence_lengths
+        n = sum(hist.values())
+        total = sum(length * k for length, k in hist.items())
+        unique_words = len(self._lower_words)
+
+        stats = {
+            "sentence_count": n,
+            "word_count": self._words,
+            "avg_sentence_length": round(total / max(n, 1), 1),
+            "median_sentence_length": round(_median(hist, n), 1),
+            "avg_word_length": round(self._word_chars / max(self._words, 1), 1),
+            "unique_words": unique_words,
+            "lexical_diversity": round(unique_words / max(self._words, 1), 3),
+        }
+
+        if n > 1:
+            squares = sum(length * length * k for length, k in hist.items())
+            variance = (n * squares - total * total) / (n * (n - 1))
+            stats["sentence_length_variance"] = round(variance, 2)
+            stats["sentence_length_std_dev"] = round(math.sqrt(variance), 2)
+
+        content_types = {group: self._keywords.get(group, 0) for group in _CONTENT_TYPES}
+        dominant_type = max(content_types.items(), key=lambda x: x[1])
+        stats["content_type_indicators"] = content_types
+        stats["dominant_content_type"] = dominant_type[0] if dominant_type[1] > 0 else "informative"
+        return stats
+
+    def _key_topics(self, ordered: List[_Paragraph], max_topics: int) -> List[str]:
+        """Same list as utils.extract_key_topics, ties broken by first occurrence."""
+        k = min(max_topics, 20)
+        if k <= 0 or not self._topics:
+            return []
+        threshold = max(heapq.nlargest(k, self._topics.values())[-1], 2)
+        candidates = {w for w, c in self._topics.items() if c >= threshold}
+        if not candidates:
+            return []
+
+        first_seen: Dict[str, int] = {}
+        position = 0
+        for part in ordered:
+            for word in part.topics:
+                if word in candidates and word not in first_seen:
+                    first_seen[word] = position
+                position += 1
+            if len(first_seen) == len(candidates):
+                break
+        ranked = sorted(candidates, key=lambda w: (-self._topics[w], first_seen[w]))
+        return ranked[:k]
+
+
+def _median(hist: Counter, n: int) -> float:
+    if not n:
+        return 0
+    lengths = sorted(hist)
+    wanted = (n // 2,) if n % 2 else (n // 2 - 1, n // 2)
+    values = []
+    seen = 0
+    for length in lengths:
+        seen += hist[length]
+        while len(values) < len(wanted) and wanted[len(values)] < seen:
+            values.append(length)
+    return values[0] if n % 2 else (values[0] + values[1]) / 2
+
+
+_analyzers: "OrderedDict[str, IncrementalAnalyzer]" = OrderedDict()
+_analyzers_lock = threading.Lock()
+
+
+def _error(msg: str) -> str:
+    return json.dumps({"error": msg})
+
+
+def analyze_document(data: dict) -> str:
+    """Analyze data["content"], reusing the analyzer for data["documentId"] if any."""
+    if not isinstance(data, dict):
+        return _error("Input must be a JSON object.")
+    content = data.get("content")
+    if not isinstance(content, str):
+        return _error("No content provided.")
+    max_topics = data.get("maxTopics", 10)
+    try:
+        max_topics = int(max_topics)
+    except (TypeError, ValueError):
+        return _error(f"Invalid maxTopics: {max_topics!r} (expected a non-negative integer)")
+    if max_topics < 0:
+        return _error(f"Invalid maxTopics: {max_topics!r} (expected a non-negative integer)")
+
+    doc_id = data.get("documentId")
+    if doc_id is None:
+        result = IncrementalAnalyzer().analyze(content, max_topics)
+    else:
+        # The worker serves requests on several threads; analyzers are not thread-safe.
+        with _analyzers_lock:
+            doc_id = str(doc_id)
+            analyzer = _analyzers.pop(doc_id, None) or IncrementalAnalyzer()
+            _analyzers[doc_id] = analyzer
+            while len(_analyzers) > MAX_DOCUMENTS:
+                _analyzers.popitem(last=False)
+            result = analyzer.analyze(content, max_topics)
+
+    return json.dumps(result, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(_error("No input data provided"))
+        sys.exit(1)
+    try:
+        input_data = json.loads(sys.argv[1])
+    except json.JSONDecodeError as exc:
+        print(_error(f"Invalid JSON input: {exc}"))
+        sys.exit(1)
+    out = analyze_document(input_data)
+    print(out)
+    try:
+        parsed = json.loads(out)
+        if isinstance(parsed, dict) and parsed.get("error"):
+            sys.exit(1)
+    except (json.JSONDecodeError, TypeError):
+        sys.exit(1)
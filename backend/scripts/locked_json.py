@@ -0,0 +1,129 @@
+"""
+Small JSON state files shared by every Python process on the host.
+
+update() reads the object at a path, lets the caller mutate it and writes it
+back, all under an exclusive flock, so spawned scripts and resident workers see
+one consistent state (retry_policy's retry budget, model_health's breakers).
+It only rewrites the file when the mutation changed something. read() takes a
+shared flock and never writes, so concurrent readers do not serialize on the
+hot path.
+Where the file cannot be used — no fcntl on Windows, read-only or missing temp
+dir — the caller's per-process fallback dict is mutated instead, and read()
+inspects that same dict for as long as update() is falling back for the path.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: state is per process instead of per host
+    fcntl = None
+
+STATE_DIR = os.path.join(tempfile.gettempdir(), "ai-writing-assistant")
+
+_lock = threading.Lock()
+_warned: set = set()
+_unavailable: set = set()   # paths whose last update() fell back to per-process state
+
+
+def _debug(msg: str) -> None:
+    print(f"[locked_json] {msg}", file=sys.stderr)
+
+
+def _parse(raw: str) -> Dict:
+    try:
+        state = json.loads(raw or "{}")
+    except ValueError:
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _update_file(path: str, mutate: Callable[[Dict], Any]) -> Any:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # r+ on a possibly new file: "a+" would force every write to the end
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, "r+", encoding="utf-8") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            fh.seek(0)
+            raw = fh.read()
+            state = _parse(raw)
+            result = mutate(state)
+            encoded = json.dumps(state, separators=(",", ":"))
+            if encoded != raw:
+                # Overwrite in place, then cut any tail: truncating to zero first
+                # frees and reallocates the file's blocks on every write.
+                fh.seek(0)
+                fh.write(encoded)
+                fh.truncate()
+                fh.flush()
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+    return result
+
+
+def _read_file(path: str) -> Optional[Dict]:
+    """The shared state, or None when it lives in the per-process fallback instead."""
+    try:
+        fh = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        # No state written yet, unless update() could not create the directory either.
+        return {} if os.path.isdir(os.path.dirname(path) or ".") else None
+    with fh:
+        fcntl.flock(fh, fcntl.LOCK_SH)
+        try:
+            raw = fh.read()
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+    return _parse(raw)
+
+
+def update(path: str, mutate: Callable[[Dict], Any], fallback: Dict) -> Any:
+    """
+    Apply mutate(state) to the JSON object stored at path and persist it.
+
+    Returns:
+        Whatever mutate returned. mutate must be safe to run on `fallback`
+        (the per-process state) when the shared file is unavailable.
+    """
+    with _lock:
+        if fcntl is not None:
+            try:
+                result = _update_file(path, mutate)
+            except OSError as exc:
+                _unavailable.add(path)
+                if path not in _warned:
+                    _warned.add(path)
+                    _debug(f"{path} unavailable ({exc}); using per-process state.")
+            else:
+                _unavailable.discard(path)
+                return result
+        return mutate(fallback)
+
+
+def read(path: str, inspect: Callable[[Dict], Any], fallback: Dict) -> Any:
+    """
+    Return inspect(state) for the JSON object stored at path, without writing.
+
+    inspect gets a private copy of the shared state (changes to it are not
+    persisted), or `fallback` itself when the shared file is unavailable.
+    """
+    if fcntl is not None and path not in _unavailable:
+        try:
+            state = _read_file(path)
+        except OSError as exc:
+            if path not in _warned:
+                _warned.add(path)
+                _debug(f"{path} unavailable ({exc}); using per-process state.")
+        else:
+            if state is not None:
+                return inspect(state)
+    with _lock:
+        return inspect(fallback)
@@ -0,0 +1,306 @@
+"""
+Per-model circuit breakers and latency-aware failover.
+
+Every OpenRouter attempt is recorded against its model ID in a locked_json
+state file shared by all Python processes: a rolling window of outcomes and
+latencies. A model's breaker opens when
+
+  * it answers 404 (model removed or renamed), or
+  * at least MODEL_HEALTH_MIN_CALLS calls in the window failed at a rate of
+    MODEL_HEALTH_ERROR_RATE or more (429, 5xx, timeouts, connection errors).
+
+401/400-style errors are the caller's problem, not the model's, and are not
+recorded. After MODEL_HEALTH_COOLDOWN seconds an open breaker lets one trial
+request through (half-open); success closes it, failure re-opens it.
+
+route() is called before building a request: if the requested model's breaker
+is open, the request goes to the healthy model from backend/assigned_models.json
+with the lowest p95 latency, and the decision is returned for the response
+metadata ("model_routing").
+
+Usage:
+    python model_health.py            # print per-model breaker state as JSON
+    python model_health.py --reset    # close every breaker and forget history
+
+Environment Variables:
+    MODEL_HEALTH_PATH        — Optional. State file (default: <tmp>/ai-writing-assistant/model_health.json).
+    MODEL_HEALTH_WINDOW      — Optional. Outcomes kept per model (default: 20).
+    MODEL_HEALTH_WINDOW_SECONDS — Optional. Outcomes older than this are dropped (default: 300).
+    MODEL_HEALTH_MIN_CALLS   — Optional. Calls needed before the error rate can open a breaker (default: 5).
+    MODEL_HEALTH_ERROR_RATE  — Optional. Error rate that opens a breaker (default: 0.5).
+    MODEL_HEALTH_COOLDOWN    — Optional. Seconds a breaker stays open before a trial (default: 60).
+    MODEL_HEALTH_DISABLE     — Optional. "1" turns breakers and failover off.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import locked_json
+
+STATE_PATH     = os.getenv("MODEL_HEALTH_PATH", os.path.join(locked_json.STATE_DIR, "model_health.json"))
+WINDOW         = int(os.getenv("MODEL_HEALTH_WINDOW", 20))
+WINDOW_SECONDS = float(os.getenv("MODEL_HEALTH_WINDOW_SECONDS", 300))
+MIN_CALLS      = int(os.getenv("MODEL_HEALTH_MIN_CALLS", 5))
+ERROR_RATE     = float(os.getenv("MODEL_HEALTH_ERROR_RATE", 0.5))
+COOLDOWN       = float(os.getenv("MODEL_HEALTH_COOLDOWN", 60))
+DISABLED       = os.getenv("MODEL_HEALTH_DISABLE") == "1"
+
+ASSIGNED_MODELS_PATH = Path(__file__).resolve().parent.parent / "assigned_models.json"
+
+# Statuses that say nothing about the model's health.
+_NOT_RECORDED = {400, 401, 402, 403, 413}
+
+_local_state: Dict = {}
+
+
+def _debug(msg: str) -> None:
+    print(f"[model_health] {msg}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Breaker state (all helpers operate on one model's entry inside update() or read())
+# ---------------------------------------------------------------------------
+
+def _entry(state: Dict, model: str) -> Dict:
+    entry = state.setdefault(model, {})
+    entry.setdefault("calls", [])      # [timestamp, ok, latency_ms]
+    entry.setdefault("opened_at", None)
+    entry.setdefault("trial_at", None)
+    return entry
+
+
+def _prune(entry: Dict, now: float) -> None:
+    calls = [c for c in entry["calls"] if now - c[0] <= WINDOW_SECONDS]
+    entry["calls"] = calls[-WINDOW:]
+
+
+def _breaker(entry: Dict, now: float) -> str:
+    """"closed", "open", or "half_open" (cooldown over, trial slot free)."""
+    if entry["opened_at"] is None:
+        return "closed"
+    if now - entry["opened_at"] < COOLDOWN:
+        return "open"
+    trial = entry["trial_at"]
+    if trial is not None and now - trial < COOLDOWN:
+        return "open"  # a trial request is already in flight
+    return "half_open"
+
+
+def _error_rate(entry: Dict) -> float:
+    calls = entry["calls"]
+    if not calls:
+        return 0.0
+    return sum(1 for c in calls if not c[1]) / len(calls)
+
+
+def _quantile_ms(entry: Dict, q: float, min_samples: int = 1) -> Optional[float]:
+    latencies = sorted(c[2] for c in entry["calls"] if c[1])
+    if len(latencies) < max(1, min_samples):
+        return None
+    return latencies[max(0, math.ceil(q * len(latencies)) - 1)]
+
+
+def _p95_ms(entry: Dict) -> Optional[float]:
+    return _quantile_ms(entry, 0.95)
+
+
+def _best_alternative(state: Dict, requested: str, now: float) -> Optional[Tuple[str, bool]]:
+    """(model, half_open) for the fastest non-open assigned model other than requested."""
+    ranked = []
+    for model in _assigned_models():
+        if model == requested:
+            continue
+        other = _entry(state, model)
+        _prune(other, now)
+        breaker = _breaker(other, now)
+        if breaker == "open":
+            continue
+        p95 = _p95_ms(other)
+        # Closed before half-open; then fastest p95; unmeasured models last.
+        ranked.append((breaker != "closed", p95 is None, p95 or 0.0, model))
+    if not ranked:
+        return None
+    ranked.sort()
+    return ranked[0][3], ranked[0][0]
+
+
+def _summary(entry: Dict, now: float) -> Dict:
+    p95 = _p95_ms(entry)
+    return {
+        "state": _breaker(entry, now),
+        "calls": len(entry["calls"]),
+        "error_rate": round(_error_rate(entry), 3),
+        "p95_ms": None if p95 is None else round(p95),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def record(model: Optional[str], status: Optional[int], latency: float) -> None:
+    """
+    Record one attempt against model.
+
+    Args:
+        status:  HTTP status, or None for a timeout / connection error.
+        latency: seconds from sending the request to its response headers.
+    """
+    if DISABLED or not model or status in _NOT_RECORDED:
+        return
+    ok = status is not None and 200 <= status < 300
+    now = time.time()
+
+    def _apply(state: Dict) -> None:
+        entry = _entry(state, model)
+        entry["calls"].append([now, ok, latency * 1000])
+        _prune(entry, now)
+        if ok:
+            if entry["opened_at"] is not None:
+                _debug(f"{model}: trial succeeded, closing breaker")
+                entry["calls"] = entry["calls"][-1:]
+            entry["opened_at"] = entry["trial_at"] = None
+            return
+        reopen = entry["opened_at"] is not None and entry["trial_at"] is not None
+        too_many = len(entry["calls"]) >= MIN_CALLS and _error_rate(entry) >= ERROR_RATE
+        if status == 404 or reopen or (entry["opened_at"] is None and too_many):
+            _debug(f"{model}: opening breaker (status {status}, error rate {_error_rate(entry):.0%})")
+            entry["opened_at"] = now
+            entry["trial_at"] = None
+
+    locked_json.update(STATE_PATH, _apply, _local_state)
+
+
+def _assigned_models() -> List[str]:
+    try:
+        data = json.loads(ASSIGNED_MODELS_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return []
+    ids = [m.get("id") for m in data.get("models", []) if isinstance(m, dict)]
+    default = data.get("default_model")
+    if default:
+        ids.append(default)
+    return list(dict.fromkeys(i for i in ids if i))
+
+
+def route(requested: str, claim: bool = True) -> Tuple[str, Optional[Dict]]:
+    """
+    Pick the model to send a request to.
+
+    Args:
+        claim: take a half-open model's trial slot. Pass False when no call will
+               follow (e.g. prepare-only requests): the answer is the same, but
+               nothing is written, so the trial stays free for a real request.
+
+    Returns:
+        (model, routing): routing is None when the requested model's breaker is
+        closed (or half-open and this request is its trial); otherwise a dict
+        for the response metadata — {"requested", "model", "failover", "reason"}.
+    """
+    if DISABLED or not requested:
+        return requested, None
+    now = time.time()
+
+    def _state_of(state: Dict) -> str:
+        entry = _entry(state, requested)
+        _prune(entry, now)
+        return _breaker(entry, now)
+
+    # Fast path: a closed breaker needs no write, so check it under a shared lock.
+    if locked_json.read(STATE_PATH, _state_of, _local_state) == "closed":
+        return requested, None
+
+    def _choose(state: Dict) -> Tuple[str, Optional[Dict]]:
+        entry = _entry(state, requested)
+        _prune(entry, now)
+        breaker = _breaker(entry, now)
+        if breaker == "half_open" and claim:
+            entry["trial_at"] = now
+        if breaker != "open":
+            return requested, None
+
+        reason = (
+            f"circuit open for {requested} "
+            f"(error rate {_error_rate(entry):.0%} over {len(entry['calls'])} calls)"
+        )
+        best = _best_alternative(state, requested, now)
+        if best is None:
+            return requested, {
+                "requested": requested,
+                "model": requested,
+                "failover": False,
+                "reason": reason + "; no healthy alternative",
+            }
+        chosen, half_open = best
+        if half_open and claim:
+            state[chosen]["trial_at"] = now
+        return chosen, {"requested": requested, "model": chosen, "failover": True, "reason": reason}
+
+    if claim:
+        model, routing = locked_json.update(STATE_PATH, _choose, _local_state)
+    else:
+        model, routing = locked_json.read(STATE_PATH, _choose, _local_state)
+    if routing:
+        _debug(f"{routing['reason']} -> {routing['model']}")
+    return model, routing
+
+
+def latency_quantile(model: str, q: float, min_samples: int = 5) -> Optional[float]:
+    """q-quantile of model's recent successful latencies in seconds; None until min_samples."""
+    if DISABLED or not model:
+        return None
+    now = time.time()
+
+    def _read(state: Dict) -> Optional[float]:
+        entry = _entry(state, model)
+        _prune(entry, now)
+        value = _quantile_ms(entry, q, min_samples)
+        return None if value is None else value / 1000
+
+    return locked_json.read(STATE_PATH, _read, _local_state)
+
+
+def fallback_model(requested: str) -> Optional[str]:
+    """Fastest model with a closed breaker in assigned_models.json other than requested."""
+    if DISABLED:
+        return None
+    now = time.time()
+
+    def _pick(state: Dict) -> Optional[str]:
+        best = _best_alternative(state, requested, now)
+        return best[0] if best and not best[1] else None
+
+    return locked_json.read(STATE_PATH, _pick, _local_state)
+
+
+def health_report() -> Dict[str, Dict]:
+    """Breaker state, error rate and p95 latency for every model seen."""
+    now = time.time()
+
+    def _report(state: Dict) -> Dict[str, Dict]:
+        report = {}
+        for model in list(state):
+            entry = _entry(state, model)
+            _prune(entry, now)
+            report[model] = _summary(entry, now)
+        return report
+
+    return locked_json.read(STATE_PATH, _report, _local_state)
+
+
+def reset() -> None:
+    """Close every breaker and forget all recorded calls."""
+    locked_json.update(STATE_PATH, lambda state: state.clear(), _local_state)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--reset":
+        reset()
+    print(json.dumps(health_report(), indent=2))
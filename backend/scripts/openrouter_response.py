@@ -1,11 +1,13 @@
 """
 Shared helpers for parsing OpenRouter / OpenAI-compatible chat completion JSON.
-Used by generate_response, generate_suggestions, and improve_readability.
+Used by generate_response, generate_suggestions, and improve_readability,
+including the streamed (SSE) form used by generate_response's stream mode.
 """
 
 from __future__ import annotations
 
-from typing import Any
+import json
+from typing import Any, Iterable, Iterator
 
 
 def _normalize_str(value: Any) -> str | None:
@@ -93,3 +95,43 @@ def extract_assistant_text(response_data: dict) -> str | None:
                 return t
 
     return None
+
+
+def iter_stream_chunks(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    Parse an OpenRouter ``stream: true`` body (server-sent events) into chunk dicts.
+
+    Skips keep-alive comments (``: OPENROUTER PROCESSING``) and blank lines,
+    ignores undecodable payloads, and stops at ``data: [DONE]``.
+    """
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if isinstance(chunk, dict):
+            yield chunk
+
+
+def extract_stream_delta(chunk: dict) -> str | None:
+    """
+    Text carried by one streamed chunk (``choices[0].delta.content``).
+
+    Unlike extract_assistant_text this does not strip: whitespace at delta
+    boundaries is part of the reply.
+    """
+    choices = chunk.get("choices")
+    if not isinstance(choices, list) or not choices or not isinstance(choices[0], dict):
+        return None
+    delta = choices[0].get("delta")
+    if isinstance(delta, dict):
+        content = delta.get("content")
+        if isinstance(content, str) and content:
+            return content
+    text = choices[0].get("text")
+    return text if isinstance(text, str) and text else None
@@ -0,0 +1,74 @@
+"""
+Serialization of entry-script results: the default pretty JSON, or a compact
+wire format for machine callers (worker pool, Node).
+
+Compact output (request ``"compact": true``, or SCRIPT_COMPACT_OUTPUT=1):
+
+  * no indentation or spaces after separators;
+  * no duplicated payloads — ``enhanced_data.statistics`` is dropped when
+    ``statistics`` is at the top level, and ``structured_content.original_text``
+    (the reply text again) is always dropped;
+  * optional sections (OPTIONAL_SECTIONS) only when named in the request's
+    ``"include"`` list, e.g. ``{"compact": true, "include": ["enhanced_data"]}``.
+
+The pretty format is unchanged, so CLI users and existing callers see the same
+output as before.
+
+Environment Variables:
+    SCRIPT_COMPACT_OUTPUT — Optional. "1" makes compact output the default.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterable
+
+COMPACT_DEFAULT = os.getenv("SCRIPT_COMPACT_OUTPUT") == "1"
+
+# Large sections a compact caller must ask for by name.
+OPTIONAL_SECTIONS = ("enhanced_data", "raw_suggestions")
+
+_COMPACT_SEPARATORS = (",", ":")
+
+
+def wants_compact(data: dict | None) -> bool:
+    """Whether this request asked for (or defaults to) compact output."""
+    requested = data.get("compact") if isinstance(data, dict) else None
+    return COMPACT_DEFAULT if requested is None else bool(requested)
+
+
+def requested_sections(data: dict | None) -> set:
+    include = data.get("include") if isinstance(data, dict) else None
+    if isinstance(include, str):
+        include = [include]
+    return {name for name in include or () if isinstance(name, str)}
+
+
+def compact_result(result: dict, include: Iterable[str] = ()) -> dict:
+    """Copy of result without optional sections (unless included) or duplicates."""
+    include = set(include)
+    out = {k: v for k, v in result.items() if k not in OPTIONAL_SECTIONS or k in include}
+    enhanced = out.get("enhanced_data")
+    if isinstance(enhanced, dict):
+        enhanced = dict(enhanced)
+        if "statistics" in out:
+            enhanced.pop("statistics", None)
+        structured = enhanced.get("structured_content")
+        if isinstance(structured, dict) and "original_text" in structured:
+            enhanced["structured_content"] = {
+                k: v for k, v in structured.items() if k != "original_text"
+            }
+        out["enhanced_data"] = enhanced
+    return out
+
+
+def render(result: dict, data: dict | None) -> str:
+    """Serialize a result dict in the format the request asked for."""
+    if not wants_compact(data):
+        return json.dumps(result, ensure_ascii=False, indent=2)
+    return json.dumps(
+        compact_result(result, requested_sections(data)),
+        ensure_ascii=False,
+        separators=_COMPACT_SEPARATORS,
+    )
@@ -0,0 +1,149 @@
+"""
+Registry of system-prompt templates, rendered once per combination and hashed.
+
+Each script registers its system prompt as a str.format template plus the
+static inputs its fields are drawn from (document-type tables, tone guidance,
+voice notes). The WRITING VOICE block is prepended by the registry via a
+{voice} field, so scripts never rebuild it per request:
+
+    TEMPLATE = prompts.register("suggestions", _SYSTEM_TEMPLATE, inputs=[...])
+    prompt = TEMPLATE.render(voice_extra=..., document_type="email", ...)
+    prompt.text, prompt.hash
+
+render() is memoized per (voice_extra, fields), so every (task, document type,
+tone, depth) combination is formatted once per process. Two hashes come out:
+
+  * Prompt.hash — SHA-256 (16 hex chars) of the rendered text, the exact
+    prompt sent for a request;
+  * PromptTemplate.version — SHA-256 of the task, template, declared inputs and
+    the current WRITING VOICE block (so shared/writing_skills.txt as well). It
+    changes whenever any prompt the template could render changes, so it can
+    key response caches before the per-request fields are known.
+
+Both are stable across processes and runs. Renders and versions are keyed by
+the writing-skills generation, so when writing_skills reloads edited rules a
+resident worker's next request renders (and hashes) the new prompt; the
+reload also calls clear() to drop the stale entries. Response caches keyed by
+the version (suggestion_cache) miss from then on without being flushed.
+
+Usage:
+    python prompts.py    # print each registered template's version as JSON
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import writing_skills
+
+RENDER_CACHE_SIZE = 256   # rendered prompts kept per template
+
+
+class Prompt(NamedTuple):
+    text: str
+    hash: str
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PromptTemplate:
+    """A registered system prompt: a str.format template with a {voice} field."""
+
+    def __init__(self, task: str, template: str, inputs: Iterable = ()):
+        self.task = task
+        self.template = template
+        self.inputs = list(inputs)
+        self._version: Optional[Tuple[int, str]] = None   # (skills generation, version)
+        self._render = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_uncached)
+
+    def _render_uncached(self, generation: int, voice_extra: str, fields: tuple) -> Prompt:
+        # generation is only part of the memo key; the text comes from the current snapshot
+        voice = writing_skills.writing_voice_block(extra=voice_extra)
+        text = self.template.format(voice=voice, **dict(fields))
+        return Prompt(text, _digest(text))
+
+    def render(self, voice_extra: str = "", **fields) -> Prompt:
+        """The rendered prompt for these fields (memoized; field values must be hashable)."""
+        return self._render(writing_skills.generation(), voice_extra, tuple(sorted(fields.items())))
+
+    @property
+    def version(self) -> str:
+        """Hash of everything this template renders from (see the module docstring)."""
+        generation = writing_skills.generation()
+        cached = self._version
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        material = json.dumps(
+            [self.task, self.template, self.inputs, writing_skills.writing_voice_block()],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        version = _digest(material)
+        self._version = (generation, version)
+        return version
+
+    def metadata(self, *rendered: Prompt) -> dict:
+        """{"task", "version", "hash"} for output metadata; "hash" only when every call used one prompt."""
+        meta = {"task": self.task, "version": self.version}
+        hashes = {prompt.hash for prompt in rendered}
+        if len(hashes) == 1:
+            meta["hash"] = hashes.pop()
+        return meta
+
+    def clear(self) -> None:
+        self._render.cache_clear()
+        self._version = None
+
+
+_registry: Dict[str, PromptTemplate] = {}
+_lock = threading.Lock()
+
+
+def register(task: str, template: str, *, inputs: Iterable = ()) -> PromptTemplate:
+    """
+    Register (or replace) the template for task.
+
+    inputs: every table or string the render fields are drawn from, so editing
+    one changes the version (JSON-serializable; other values hash by str()).
+    """
+    prompt_template = PromptTemplate(task, template, inputs)
+    with _lock:
+        _registry[task] = prompt_template
+    return prompt_template
+
+
+def get(task: str) -> PromptTemplate:
+    return _registry[task]
+
+
+def versions() -> Dict[str, str]:
+    """{task: version} for every registered template."""
+    with _lock:
+        templates = list(_registry.values())
+    return {t.task: t.version for t in templates}
+
+
+def clear() -> None:
+    """Forget every memoized render and version (templates stay registered)."""
+    with _lock:
+        templates = list(_registry.values())
+    for prompt_template in templates:
+        prompt_template.clear()
+
+
+writing_skills.on_change(lambda _snapshot: clear())
+
+
+if __name__ == "__main__":
+    # The scripts register into the importable "prompts" module, not this __main__.
+    import generate_response, generate_suggestions, improve_readability  # noqa: E401,F401
+    import prompts as registry
+
+    print(json.dumps(registry.versions(), indent=2))
@@ -0,0 +1,195 @@
+"""
+Dependency-free readability scoring, fast enough to run on every rewrite.
+
+score() makes one pass over a text — sentences and words are split with
+precompiled patterns and syllables are estimated by a memoized heuristic — and
+returns the standard formulas:
+
+  * Flesch Reading Ease and Flesch-Kincaid Grade (words/sentence, syllables/word);
+  * Gunning Fog (words/sentence, share of 3+ syllable words, not counting
+    capitalised names or -es/-ed/-ing inflections);
+  * SMOG (3+ syllable words per 30 sentences);
+  * passive-voice ratio: sentences with a "to be"/"get" auxiliary followed by a
+    past participle (regular -ed or a common irregular), e.g. "was reviewed",
+    "is being built", "were not given".
+
+compare() scores an original and its rewrite together, so improve_readability
+can report whether the rewrite actually reads easier. Syllable counts are a
+heuristic (vowel groups with silent-e and -le/-es/-ed adjustments); like every
+formula-based score, treat the numbers as a trend, not an exact grade.
+
+Usage:
+    python readability.py "Some text to score."
+    echo "Some text" | python readability.py
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Dict
+
+# ---------------------------------------------------------------------------
+# Precompiled patterns
+# ---------------------------------------------------------------------------
+
+_SENTENCE_RE  = re.compile(r"[^.!?\n]+(?:[.!?]+|$)", re.MULTILINE)
+_WORD_RE      = re.compile(r"[A-Za-z]+(?:'[A-Za-z]+)?")
+_VOWEL_RUN_RE = re.compile(r"[aeiouy]+")
+
+# Passive voice: an auxiliary, up to two adverbs, then a past participle.
+_PASSIVE_AUXILIARIES = frozenset(
+    "am is are was were be been being get gets got gotten getting".split()
+)
+_PASSIVE_ADVERBS = frozenset("not never also often always already still just being".split())
+_IRREGULAR_PARTICIPLES = frozenset((
+    "been born bought brought built caught chosen done drawn driven eaten fallen felt forgotten "
+    "found frozen given gone grown held hidden hit hurt kept known laid led left lost made meant "
+    "met paid put read run said seen sent set shown shut sold spent spoken stolen struck taken "
+    "taught told thought thrown understood won worn written"
+).split())
+
+# Words the vowel-group heuristic gets wrong often enough to matter.
+_SYLLABLE_OVERRIDES = {
+    "the": 1, "every": 3, "business": 2, "different": 3, "evening": 2, "family": 3,
+    "interest": 3, "people": 2, "really": 3, "area": 3, "idea": 3, "create": 2,
+    "being": 2, "doing": 2, "going": 2, "science": 2, "quiet": 2, "poem": 2,
+}
+
+
+# ---------------------------------------------------------------------------
+# Syllables
+# ---------------------------------------------------------------------------
+
+@lru_cache(maxsize=65536)
+def count_syllables(word: str) -> int:
+    """Estimated syllables in one word (at least 1)."""
+    w = word.lower().replace("'", "")
+    if w in _SYLLABLE_OVERRIDES:
+        return _SYLLABLE_OVERRIDES[w]
+    if len(w) <= 3:
+        return 1
+    count = len(_VOWEL_RUN_RE.findall(w))
+    if w.endswith("e") and not w.endswith(("ee", "ye")) and not (w.endswith("le") and w[-3] not in "aeiouy"):
+        count -= 1                                  # silent e: "make", but not "table"
+    if w.endswith(("es", "ed")) and not w.endswith(("ted", "ded", "ses", "zes", "ces", "ges", "xes")):
+        if len(w) > 3 and w[-3] not in "aeiouy":
+            count -= 1                              # "jumped", "makes": no extra syllable
+    return max(1, count)
+
+
+def _is_complex(word: str, sentence_start: bool) -> bool:
+    """Gunning Fog "complex" word: 3+ syllables, not a name or an inflected shorter word."""
+    if count_syllables(word) < 3:
+        return False
+    if word[0].isupper() and not sentence_start:
+        return False
+    lower = word.lower()
+    for suffix in ("es", "ed", "ing"):
+        if lower.endswith(suffix) and count_syllables(lower[: -len(suffix)]) < 3:
+            return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Scores
+# ---------------------------------------------------------------------------
+
+def _round(value: float) -> float:
+    return round(value, 2)
+
+
+def score(text: str) -> Dict[str, Any]:
+    """
+    Readability scores for text.
+
+    Returns:
+        {"sentences", "words", "syllables", "complex_words", "polysyllables",
+         "flesch_reading_ease", "flesch_kincaid_grade", "gunning_fog", "smog",
+         "passive_sentences", "passive_voice_ratio"}; all scores are 0 for empty text.
+    """
+    sentences = words = syllables = complex_words = polysyllables = passive = 0
+    for match in _SENTENCE_RE.finditer(text or ""):
+        sentence = match.group()
+        tokens = _WORD_RE.findall(sentence)
+        if not tokens:
+            continue
+        sentences += 1
+        words += len(tokens)
+        is_passive = False
+        pending = -1  # adverbs still allowed after an auxiliary; -1 = no auxiliary seen
+        for i, token in enumerate(tokens):
+            n = count_syllables(token)
+            syllables += n
+            if n >= 3:
+                polysyllables += 1
+                if _is_complex(token, i == 0):
+                    complex_words += 1
+            if is_passive:
+                continue
+            lower = token.lower()
+            if pending >= 0:
+                if lower.endswith("ed") or lower in _IRREGULAR_PARTICIPLES:
+                    is_passive = True
+                    continue
+                if pending > 0 and (lower in _PASSIVE_ADVERBS or lower.endswith("ly")):
+                    pending -= 1
+                    continue
+                pending = -1
+            if lower in _PASSIVE_AUXILIARIES:
+                pending = 2
+        passive += is_passive
+
+    result: Dict[str, Any] = {
+        "sentences": sentences,
+        "words": words,
+        "syllables": syllables,
+        "complex_words": complex_words,
+        "polysyllables": polysyllables,
+        "passive_sentences": passive,
+    }
+    if not words:
+        result.update({
+            "flesch_reading_ease": 0.0, "flesch_kincaid_grade": 0.0,
+            "gunning_fog": 0.0, "smog": 0.0, "passive_voice_ratio": 0.0,
+        })
+        return result
+
+    words_per_sentence = words / sentences
+    syllables_per_word = syllables / words
+    result.update({
+        "flesch_reading_ease": _round(206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word),
+        "flesch_kincaid_grade": _round(0.39 * words_per_sentence + 11.8 * syllables_per_word - 15.59),
+        "gunning_fog": _round(0.4 * (words_per_sentence + 100 * complex_words / words)),
+        "smog": _round(1.0430 * math.sqrt(polysyllables * 30 / sentences) + 3.1291),
+        "passive_voice_ratio": _round(passive / sentences),
+    })
+    return result
+
+
+_DELTA_KEYS = ("flesch_reading_ease", "flesch_kincaid_grade", "gunning_fog", "smog", "passive_voice_ratio")
+
+
+def compare(original: str, rewritten: str) -> Dict[str, Any]:
+    """
+    Score an original and its rewrite.
+
+    Returns:
+        {"before": score(original), "after": score(rewritten),
+         "delta": {metric: after - before}, "easier": bool} — easier when the
+        Flesch-Kincaid grade went down (or reading ease up at the same grade).
+    """
+    before, after = score(original), score(rewritten)
+    delta = {key: _round(after[key] - before[key]) for key in _DELTA_KEYS}
+    easier = delta["flesch_kincaid_grade"] < 0 or (
+        delta["flesch_kincaid_grade"] == 0 and delta["flesch_reading_ease"] > 0
+    )
+    return {"before": before, "after": after, "delta": delta, "easier": easier}
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else sys.stdin.read()
+    print(json.dumps(score(source), indent=2))
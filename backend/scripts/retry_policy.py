@@ -0,0 +1,159 @@
+"""
+Shared retry policy for OpenRouter calls.
+
+Used by every retry loop (generate_response, async_client — and through it
+generate_suggestions and improve_readability — and utils.api_call_with_retry)
+so that under a 429 storm they back off together instead of as a herd:
+
+  * Retry-After (seconds or HTTP date) and OpenRouter's X-RateLimit-Reset are
+    honoured: a retry never comes earlier than the server asked. A wait longer
+    than RETRY_MAX_DELAY is not worth holding a request for, so the call fails
+    fast instead;
+  * otherwise delays use decorrelated jitter (sleep = uniform(base, 3 * previous),
+    capped), so clients that failed together do not retry together;
+  * every retry spends a token from a budget shared by all processes on the
+    host — a token bucket in a locked_json state file — so retries can add at most
+    RETRY_BUDGET_RATE requests/s (plus a burst) on top of first attempts.
+
+    backoff = Backoff(base_delay=2.0)
+    ...
+    delay = backoff.next_delay(retry_after_seconds(resp.headers))
+    if delay is None:
+        break            # budget spent or Retry-After too long: give up now
+    time.sleep(delay)
+
+Environment Variables:
+    RETRY_MAX_DELAY        — Optional. Longest single wait in seconds (default: 30).
+    RETRY_BUDGET_RATE      — Optional. Retry tokens refilled per second, host-wide (default: 1).
+    RETRY_BUDGET_BURST     — Optional. Bucket capacity (default: 10).
+    RETRY_BUDGET_PATH      — Optional. Bucket state file (default: <tmp>/ai-writing-assistant/retry_budget.json).
+    RETRY_BUDGET_DISABLE   — Optional. "1" removes the shared budget (jitter and Retry-After still apply).
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+import locked_json
+
+MAX_DELAY      = float(os.getenv("RETRY_MAX_DELAY", 30))
+BUDGET_RATE    = float(os.getenv("RETRY_BUDGET_RATE", 1))
+BUDGET_BURST   = float(os.getenv("RETRY_BUDGET_BURST", 10))
+BUDGET_PATH    = os.getenv(
+    "RETRY_BUDGET_PATH",
+    os.path.join(locked_json.STATE_DIR, "retry_budget.json"),
+)
+BUDGET_DISABLED = os.getenv("RETRY_BUDGET_DISABLE") == "1"
+
+_lock = threading.Lock()
+_local_bucket: dict = {}
+_stats = {"granted": 0, "denied": 0}
+
+
+def _debug(msg: str) -> None:
+    print(f"[retry_policy] {msg}", file=sys.stderr)
+
+
+# ---------------------------------------------------------------------------
+# Retry-After
+# ---------------------------------------------------------------------------
+
+def retry_after_seconds(headers: Optional[Mapping[str, str]], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds the server asked us to wait, from Retry-After or X-RateLimit-Reset
+    (epoch seconds or milliseconds); None if neither is present or parseable.
+    """
+    if not headers:
+        return None
+    now = time.time() if now is None else now
+
+    value = headers.get("Retry-After")
+    if value:
+        value = value.strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+        except (TypeError, ValueError, IndexError):
+            pass
+
+    reset = headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            at = float(reset)
+        except ValueError:
+            return None
+        if at > 1e12:  # milliseconds
+            at /= 1000
+        return max(0.0, at - now)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Shared retry budget
+# ---------------------------------------------------------------------------
+
+def _take(bucket: dict, now: float) -> bool:
+    try:
+        tokens, updated = float(bucket["tokens"]), float(bucket["updated"])
+    except (KeyError, TypeError, ValueError):
+        tokens, updated = BUDGET_BURST, now
+    tokens = min(BUDGET_BURST, tokens + max(0.0, now - updated) * BUDGET_RATE)
+    granted = tokens >= 1
+    bucket["tokens"] = tokens - 1 if granted else tokens
+    bucket["updated"] = now
+    return granted
+
+
+def acquire_retry() -> bool:
+    """Spend one retry token; False means the host-wide retry budget is exhausted."""
+    if BUDGET_DISABLED:
+        return True
+    now = time.time()
+    granted = locked_json.update(BUDGET_PATH, lambda bucket: _take(bucket, now), _local_bucket)
+    with _lock:
+        _stats["granted" if granted else "denied"] += 1
+    return granted
+
+
+def budget_stats() -> dict:
+    """Retries this process was granted / denied by the shared budget."""
+    with _lock:
+        return dict(_stats)
+
+
+# ---------------------------------------------------------------------------
+# Backoff
+# ---------------------------------------------------------------------------
+
+class Backoff:
+    """Retry delays for one call: decorrelated jitter, Retry-After, shared budget."""
+
+    def __init__(self, base_delay: float = 2.0, max_delay: float = MAX_DELAY) -> None:
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._previous = base_delay
+
+    def next_delay(self, retry_after: Optional[float] = None) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None to stop retrying now."""
+        if retry_after is not None and retry_after > self.max_delay:
+            _debug(f"Retry-After {retry_after:.0f}s exceeds {self.max_delay:.0f}s; not retrying.")
+            return None
+        if not acquire_retry():
+            _debug("Retry budget exhausted; not retrying.")
+            return None
+
+        jittered = min(self.max_delay, random.uniform(self.base_delay, self._previous * 3))
+        self._previous = jittered
+        if retry_after is None:
+            return jittered
+        # Never earlier than asked; spread callers that got the same Retry-After.
+        return min(self.max_delay, retry_after + random.uniform(0, self.base_delay))
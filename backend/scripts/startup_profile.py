@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+startup_profile.py
+Measure the cold-start import cost of the Python entry scripts.
+
+Each script is imported in a fresh interpreter under `python -X importtime`, and
+the per-module timings it reports on stderr are summarised as JSON, so cold start
+can be tracked as a number rather than eyeballed.
+
+Usage:
+    python startup_profile.py [--top N] [script.py ...]   # default: every entry script
+    python generate_response.py --profile-startup         # same report, one script
+
+Output (one object per script):
+    {"script": str, "wall_ms": float, "import_ms": float,
+     "modules": [{"module": str, "self_ms": float, "cumulative_ms": float}, ...]}
+
+    wall_ms is the whole subprocess (interpreter start-up included); import_ms is
+    the script's own cumulative import time; modules lists the top N by
+    cumulative time.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+ENTRY_SCRIPTS = (
+    "generate_response.py",
+    "generate_suggestions.py",
+    "improve_readability.py",
+    "incremental_analysis.py",
+    "worker.py",
+)
+DEFAULT_TOP = 15
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _parse_importtime(stderr: str) -> list[dict]:
+    """Parse `import time: self [us] | cumulative | imported package` lines."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # the header row
+        rows.append({
+            "module":        parts[2].strip(),
+            "self_ms":       round(self_us / 1000, 2),
+            "cumulative_ms": round(cumulative_us / 1000, 2),
+        })
+    return rows
+
+
+def profile_startup(script: str, top: int = DEFAULT_TOP) -> dict:
+    """Import script's module in a fresh interpreter and report where the time went."""
+    module = os.path.splitext(os.path.basename(script))[0]
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_SCRIPTS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        return {"script": os.path.basename(script), "error": proc.stderr.strip()[-500:]}
+
+    rows = _parse_importtime(proc.stderr)
+    own = next((r for r in reversed(rows) if r["module"] == module), None)
+    return {
+        "script":    os.path.basename(script),
+        "wall_ms":   round(wall_ms, 2),
+        "import_ms": own["cumulative_ms"] if own else None,
+        "modules":   sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    top = DEFAULT_TOP
+    if len(args) >= 2 and args[0] == "--top":
+        top = int(args[1])
+        args = args[2:]
+    reports = [profile_startup(script, top) for script in (args or ENTRY_SCRIPTS)]
+    print(json.dumps(reports, indent=2))
+    sys.exit(1 if any("error" in r for r in reports) else 0)
@@ -0,0 +1,203 @@
+"""
+Persistent, content-addressed cache for generate_suggestions results.
+
+Entries live in a small SQLite database on local disk, so a hit survives the
+per-request process (and is shared by every resident worker). Keys are SHA-256
+digests of the content and every parameter that shapes the prompt, so they are
+stable across processes and runs — unlike Python's randomized hash().
+
+Usage:
+    python suggestion_cache.py --stats    # print hit/miss/size counters as JSON
+    python suggestion_cache.py --clear    # drop all entries and counters
+
+Environment Variables:
+    SUGGESTION_CACHE_PATH       — Optional. SQLite file (default: <tmp>/ai-writing-assistant/suggestions.sqlite3).
+    SUGGESTION_CACHE_TTL        — Optional. Entry lifetime in seconds (default: 86400).
+    SUGGESTION_CACHE_MAX_BYTES  — Optional. Byte budget before LRU eviction (default: 50 MB).
+    SUGGESTION_CACHE_DISABLE    — Optional. "1" turns the cache off.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+CACHE_PATH = os.getenv(
+    "SUGGESTION_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "ai-writing-assistant", "suggestions.sqlite3"),
+)
+TTL_SECONDS = float(os.getenv("SUGGESTION_CACHE_TTL", 24 * 60 * 60))
+MAX_BYTES   = int(os.getenv("SUGGESTION_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+DISABLED    = os.getenv("SUGGESTION_CACHE_DISABLE") == "1"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT PRIMARY KEY,
+    value    TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+
+def _debug(msg: str) -> None:
+    print(f"[suggestion_cache] {msg}", file=sys.stderr)
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, timeout=5, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        _conn = conn
+    return _conn
+
+
+def make_key(
+    content: str,
+    document_type: str,
+    tone: str,
+    model: str,
+    prompt_version: str,
+    variant: str = "",
+) -> str:
+    """Stable digest of everything that determines the suggestions for a document."""
+    material = json.dumps(
+        [content, document_type, tone, model, prompt_version, variant],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _bump(conn: sqlite3.Connection, name: str) -> None:
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def get(key: str) -> dict | None:
+    """Return the cached value for key, or None on miss/expiry/any cache error."""
+    if DISABLED:
+        return None
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > TTL_SECONDS:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                _bump(conn, "misses")
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            _bump(conn, "hits")
+        return json.loads(row[0])
+    except (sqlite3.Error, OSError, ValueError) as exc:
+        _debug(f"get failed, treating as miss: {exc}")
+        return None
+
+
+def put(key: str, value: dict) -> None:
+    """Store value under key, then evict least-recently-used entries over the byte budget."""
+    if DISABLED:
+        return
+    encoded = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    size = len(encoded.encode("utf-8"))
+    if size > MAX_BYTES:
+        return
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, encoded, size, now, now),
+                )
+                conn.execute("DELETE FROM entries WHERE created < ?", (now - TTL_SECONDS,))
+                _evict(conn)
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+    except (sqlite3.Error, OSError) as exc:
+        _debug(f"put failed: {exc}")
+
+
+def _evict(conn: sqlite3.Connection) -> None:
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+    if total <= MAX_BYTES:
+        return
+    evicted = 0
+    for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall():
+        if total <= MAX_BYTES:
+            break
+        conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        total -= size
+        evicted += 1
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES ('evictions', ?) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+        (evicted,),
+    )
+
+
+def stats() -> dict:
+    """Hit/miss/eviction counters plus current entry count and size."""
+    if DISABLED:
+        return {"enabled": False}
+    try:
+        with _lock:
+            conn = _connect()
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+    except (sqlite3.Error, OSError) as exc:
+        return {"enabled": True, "error": str(exc)}
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    return {
+        "enabled":   True,
+        "hits":      hits,
+        "misses":    misses,
+        "hit_rate":  round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        "evictions": counters.get("evictions", 0),
+        "entries":   entries,
+        "bytes":     size,
+        "max_bytes": MAX_BYTES,
+    }
+
+
+def clear() -> None:
+    with _lock:
+        conn = _connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM counters")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--clear":
+        clear()
+    print(json.dumps(stats(), indent=2))
@@ -0,0 +1,321 @@
+"""
+Single-pass response analysis behind utils.enrich_ai_response.
+
+parse_structured_response, analyze_response_statistics and
+evaluate_response_quality each re-split the text, tokenize sentences
+separately and compile twenty-odd patterns inline. analyze_response() does the
+same work once: sentences, words and paragraphs are split a single time, the
+keyword counts come from one token pass plus one small precompiled scan, and the
+three result dicts come out identical to the utils functions (see
+dev/bench_enrichment.py for the equivalence check and timings).
+"""
+
+from __future__ import annotations
+
+import re
+import statistics
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import calculate_score, identify_quality_issues, safe_tokenize
+
+# ---------------------------------------------------------------------------
+# Precompiled patterns
+# ---------------------------------------------------------------------------
+
+_SECTION_RE    = re.compile(r'(?m)^(#{1,3}\s+.+?$|[A-Z][A-Z\s]+:)')
+_NUMBERED_RE   = re.compile(r'(?m)^(\d+\.\s+.+?$(?:\n\d+\.\s+.+?$)*)')
+_BULLETED_RE   = re.compile(r'(?m)^([*\-+]\s+.+?$(?:\n[*\-+]\s+.+?$)*)')
+_LIST_ITEM_RE  = re.compile(r'(?m)^(?:\d+\.|[*\-+])\s+(.+?)$')
+_CODE_BLOCK_RE = re.compile(r'```(?:\w+)?\n(.*?)\n```', re.DOTALL)
+# Same matches as utils' r'^(\w+(?:[A-Z]\w*)*|[A-Z][A-Z_]+):' (both alternatives
+# only ever match a maximal \w+ run) without its nested-quantifier backtracking.
+_KV_RE         = re.compile(r'(?m)^(\w+):\s+(.+?)$')
+_LIST_START_RE = re.compile(r'(?m)^(\d+\.\s+|\*\s+|\-\s+)')
+_KEY_TERM_RE   = re.compile(r'\b[a-zA-Z]{4,}\b')
+_PRONOUN_RE    = re.compile(
+    r'\b(?:(?P<first>I|me|my|mine|we|us|our|ours)'
+    r'|(?P<third>he|him|his|she|her|hers|it|its|they|them|their|theirs))\b',
+    re.IGNORECASE,
+)
+_FLOW_START_RE = re.compile(
+    r'^(however|therefore|additionally|furthermore|moreover|consequently|thus|hence|'
+    r'nevertheless|also|instead|still|yet|so)\b',
+    re.IGNORECASE,
+)
+
+# Keyword groups counted by analyze_response_statistics ("content_type_indicators")
+# and evaluate_response_quality ("connective_words"). Single-word terms are
+# counted from one \w+ token pass (a \bterm\b match is exactly a token equal to
+# term); the few multi-word terms get one small combined scan. No term overlaps
+# another term's span, so the per-group counts equal one re.findall per group.
+_KEYWORD_GROUPS: Dict[str, Tuple[str, ...]] = {
+    "explanatory":   ("explain", "because", "reason", "therefore", "thus", "hence", "due to"),
+    "instructional": ("step", "guide", "how to", "follow", "instruction", "process"),
+    "analytical":    ("analyze", "analysis", "evaluate", "assessment", "compare", "contrast"),
+    "persuasive":    ("should", "recommend", "suggest", "advise", "best", "better", "improve"),
+    "connective":    ("however", "therefore", "additionally", "furthermore", "moreover",
+                      "in addition", "consequently", "thus", "hence", "nevertheless"),
+}
+_TERM_GROUPS: Dict[str, Tuple[str, ...]] = {}
+for _group, _terms in _KEYWORD_GROUPS.items():
+    for _term in _terms:
+        _TERM_GROUPS[_term] = _TERM_GROUPS.get(_term, ()) + (_group,)
+_WORD_RE   = re.compile(r'\w+')
+_PHRASE_RE = re.compile(
+    r'\b(?:' + '|'.join(re.escape(t) for t in _TERM_GROUPS if ' ' in t) + r')\b',
+    re.IGNORECASE,
+)
+
+_KEY_TERM_STOP_WORDS = frozenset({
+    'about', 'above', 'after', 'again', 'against', 'all', 'and', 'any', 'are', 'because',
+    'been', 'before', 'being', 'below', 'between', 'both', 'but', 'can', 'did', 'does',
+    'doing', 'down', 'during', 'each', 'few', 'for', 'from', 'further', 'had', 'has',
+    'have', 'having', 'here', 'how', 'into', 'itself', 'just', 'more', 'most', 'not',
+    'now', 'only', 'other', 'our', 'over', 'same', 'should', 'some', 'such', 'than',
+    'that', 'the', 'their', 'them', 'then', 'there', 'these', 'they', 'this', 'those',
+    'through', 'under', 'until', 'very', 'was', 'were', 'what', 'when', 'where', 'which',
+    'while', 'who', 'with', 'your',
+})
+
+
+def _keyword_counts(text: str) -> Dict[str, int]:
+    counts = {group: 0 for group in _KEYWORD_GROUPS}
+    token_counts = Counter(_WORD_RE.findall(text.lower()))
+    for term, groups in _TERM_GROUPS.items():
+        n = token_counts.get(term, 0) if ' ' not in term else 0
+        for group in groups:
+            counts[group] += n
+    for match in _PHRASE_RE.finditer(text):
+        for group in _TERM_GROUPS.get(match.group(0).lower(), ()):
+            counts[group] += 1
+    return counts
+
+
+def _key_terms(text: str) -> set:
+    return {w for w in _KEY_TERM_RE.findall(text.lower()) if w not in _KEY_TERM_STOP_WORDS}
+
+# ---------------------------------------------------------------------------
+# Structure
+# ---------------------------------------------------------------------------
+
+def _structure(text: str, section_matches: List[re.Match]) -> Dict[str, Any]:
+    structured = {
+        "main_sections": [],
+        "lists": [],
+        "code_blocks": [],
+        "structured_content": {},
+        "original_text": text,
+    }
+
+    current_pos = 0
+    for match in section_matches:
+        start_pos = match.start()
+        if start_pos > current_pos:
+            para_end = text.find('\n\n', start_pos)
+            structured["main_sections"].append({
+                "title": match.group(0).strip().replace('#', '').strip(),
+                "start": start_pos,
+                "text": text[start_pos:] if para_end < 0 else text[start_pos:para_end],
+            })
+        current_pos = start_pos
+
+    for pattern, kind in ((_NUMBERED_RE, "numbered"), (_BULLETED_RE, "bulleted")):
+        for match in pattern.finditer(text):
+            list_text = match.group(0)
+            structured["lists"].append({
+                "type": kind,
+                "items": _LIST_ITEM_RE.findall(list_text),
+                "raw_text": list_text,
+            })
+
+    for match in _CODE_BLOCK_RE.finditer(text):
+        code = match.group(1)
+        first_line = code.split('\n', 1)[0]
+        structured["code_blocks"].append({
+            "language": first_line if first_line else "generic",
+            "code": code,
+            "start": match.start(),
+            "end": match.end(),
+        })
+
+    for match in _KV_RE.finditer(text):
+        structured["structured_content"][match.group(1).strip()] = match.group(2).strip()
+
+    return structured
+
+# ---------------------------------------------------------------------------
+# Statistics
+# ---------------------------------------------------------------------------
+
+def _statistics(sentences: List[str], words: List[str], keyword_counts: Dict[str, int]) -> Dict[str, Any]:
+    sentence_lengths = [len(s.split()) for s in sentences]
+    word_length_total = sum(len(w) for w in words)
+    unique_words = len({w.lower() for w in words})
+
+    stats = {
+        "sentence_count": len(sentences),
+        "word_count": len(words),
+        "avg_sentence_length": round(sum(sentence_lengths) / max(len(sentence_lengths), 1), 1),
+        "median_sentence_length": round(statistics.median(sentence_lengths) if sentence_lengths else 0, 1),
+        "avg_word_length": round(word_length_total / max(len(words), 1), 1),
+        "unique_words": unique_words,
+        "lexical_diversity": round(unique_words / max(len(words), 1), 3),
+    }
+
+    if len(sentence_lengths) > 1:
+        stats["sentence_length_variance"] = round(statistics.variance(sentence_lengths), 2)
+        stats["sentence_length_std_dev"] = round(statistics.stdev(sentence_lengths), 2)
+
+    content_types = {
+        "explanatory":   keyword_counts["explanatory"],
+        "instructional": keyword_counts["instructional"],
+        "analytical":    keyword_counts["analytical"],
+        "persuasive":    keyword_counts["persuasive"],
+    }
+    dominant_type = max(content_types.items(), key=lambda x: x[1])
+    stats["content_type_indicators"] = content_types
+    stats["dominant_content_type"] = dominant_type[0] if dominant_type[1] > 0 else "informative"
+    return stats
+
+# ---------------------------------------------------------------------------
+# Quality
+# ---------------------------------------------------------------------------
+
+def _pronoun_consistency(sentences: List[str]) -> float:
+    if len(sentences) < 3:
+        return 0.8
+
+    first_person = third_person = 0
+    for sentence in sentences:
+        seen_first = seen_third = False
+        for match in _PRONOUN_RE.finditer(sentence):
+            if match.group("first") is not None:
+                seen_first = True
+            else:
+                seen_third = True
+            if seen_first and seen_third:
+                break
+        first_person += seen_first
+        third_person += seen_third
+
+    if first_person + third_person < 3:
+        return 0.8
+    if first_person > third_person * 3 or third_person > first_person * 3:
+        return 0.9
+    elif first_person > 0 and third_person > 0:
+        return 0.7
+    return 0.8
+
+
+def _logical_flow(sentences: List[str]) -> float:
+    if len(sentences) < 3:
+        return 0.8
+
+    connections = sum(1 for s in sentences[1:] if _FLOW_START_RE.search(s))
+    connection_ratio = connections / (len(sentences) - 1)
+
+    if connection_ratio > 0.6:
+        return 0.7
+    elif connection_ratio > 0.2:
+        return 0.9
+    elif connection_ratio > 0.1:
+        return 0.7
+    else:
+        return 0.5
+
+
+def _quality(
+    text: str,
+    prompt_text: Optional[str],
+    expected_outputs: Optional[List[str]],
+    sentences: List[str],
+    paragraph_count: int,
+    has_sections: bool,
+    keyword_counts: Dict[str, int],
+) -> Dict[str, Any]:
+    quality = {
+        "relevance_score": 0.0,
+        "coherence_score": 0.0,
+        "completeness_score": 0.0,
+        "structure_score": 0.0,
+        "overall_quality_score": 0.0,
+        "potential_issues": [],
+    }
+
+    quality["structure_score"] = calculate_score([
+        has_sections * 0.4,
+        (paragraph_count > 1) * 0.3,
+        bool(_LIST_START_RE.search(text)) * 0.3,
+    ])
+
+    sentences = [s.strip() for s in sentences if s.strip()] if text else []
+    quality["coherence_score"] = calculate_score([
+        min(keyword_counts["connective"] / 5, 1) * 0.3,
+        _pronoun_consistency(sentences) * 0.3,
+        _logical_flow(sentences) * 0.4,
+    ])
+
+    completeness_score = 0.7
+    if expected_outputs:
+        matched = sum(
+            1 for expected in expected_outputs
+            if re.search(rf'\b{re.escape(expected)}\b', text, re.IGNORECASE)
+        )
+        completeness_score = matched / len(expected_outputs)
+    quality["completeness_score"] = completeness_score
+
+    if prompt_text:
+        prompt_terms = _key_terms(prompt_text)
+        if prompt_terms:
+            overlap = len(prompt_terms & _key_terms(text)) / len(prompt_terms)
+            quality["relevance_score"] = min(overlap * 1.5, 1.0)
+        else:
+            quality["relevance_score"] = 0.7
+    else:
+        quality["relevance_score"] = 0.7
+
+    quality["potential_issues"] = identify_quality_issues(text)
+
+    quality["overall_quality_score"] = calculate_score([
+        quality["relevance_score"] * 0.25,
+        quality["coherence_score"] * 0.25,
+        quality["completeness_score"] * 0.25,
+        quality["structure_score"] * 0.25,
+    ])
+    return quality
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def analyze_response(
+    response_text: str,
+    prompt_text: Optional[str] = None,
+    expected_outputs: Optional[List[str]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """
+    Analyze a response in one pass.
+
+    Returns:
+        (structured, statistics, quality) — equal to parse_structured_response(),
+        analyze_response_statistics() and evaluate_response_quality() on the same input.
+    """
+    sentences = safe_tokenize(response_text)
+    words = response_text.split()
+    paragraph_count = sum(1 for p in response_text.split('\n\n') if p.strip())
+    section_matches = list(_SECTION_RE.finditer(response_text))
+    keyword_counts = _keyword_counts(response_text)
+
+    structured = _structure(response_text, section_matches)
+    stats = _statistics(sentences, words, keyword_counts)
+    quality = _quality(
+        response_text,
+        prompt_text,
+        expected_outputs,
+        sentences,
+        paragraph_count,
+        bool(section_matches),
+        keyword_counts,
+    )
+    return structured, stats, quality
@@ -0,0 +1,171 @@
+"""
+Compact edit lists between a text and its rewrite.
+
+    edits = diff(original, rewritten, granularity="word")
+    assert apply_edits(original, edits) == rewritten
+
+An edit is {"op": "replace"|"delete"|"insert", "start": int, "end": int, "text"?: str}.
+start/end are character offsets into the original (end exclusive; start == end
+for an insert), and "text" is the replacement (absent for a delete). Edits are
+sorted and never overlap, so a client applies them back to front, or front to
+back while tracking the length change.
+
+The size of the result follows what changed, not the document:
+
+  1. the common prefix and suffix are trimmed, so a local edit is found in
+     linear time;
+  2. the middle is aligned sentence by sentence (difflib.SequenceMatcher over
+     whole sentences, a short sequence even for long documents);
+  3. at "word" granularity, each replaced run of sentences is refined word by
+     word (words, whitespace runs and punctuation are separate tokens) — pair
+     by pair when both sides have the same number of sentences, as a block
+     when it is at most REFINE_MAX_TOKENS tokens, otherwise left at sentence
+     level — so the quadratic-worst-case matcher only sees short sequences.
+     A block that keeps less than REFINE_MIN_KEPT of its characters is also
+     left as one replace: scattered one-word matches in a rewritten sentence
+     would cost more bytes than the sentence itself.
+
+Tokens tile the text exactly, so offsets are exact and apply_edits() reproduces
+the rewrite byte for byte.
+"""
+
+from __future__ import annotations
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Tuple
+
+GRANULARITIES = ("word", "sentence")
+REFINE_MAX_TOKENS = 2000   # word tokens per side refined as one block
+REFINE_MIN_KEPT = 0.5      # share of a block's characters word edits must keep
+
+# Sentence: text up to terminal punctuation or a line break, plus trailing whitespace.
+_SENTENCE_RE = re.compile(r"[^.!?\n]*(?:[.!?]+|\n)[^\S\n]*\n*|[^.!?\n]+")
+_WORD_RE     = re.compile(r"\w+|\s+|[^\w\s]")
+
+Span = Tuple[int, int]
+
+
+def _spans(pattern: re.Pattern, text: str, offset: int = 0) -> List[Span]:
+    return [(offset + m.start(), offset + m.end()) for m in pattern.finditer(text) if m.end() > m.start()]
+
+
+def _common_affixes(a: str, b: str) -> Tuple[int, int]:
+    """Lengths of the common prefix and (non-overlapping) common suffix."""
+    limit = min(len(a), len(b))
+    prefix = 0
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+
+def _align(a: str, a_spans: List[Span], b: str, b_spans: List[Span]):
+    """SequenceMatcher opcodes over the token texts."""
+    a_tokens = [a[s:e] for s, e in a_spans]
+    b_tokens = [b[s:e] for s, e in b_spans]
+    return SequenceMatcher(None, a_tokens, b_tokens, autojunk=False).get_opcodes()
+
+
+def _emit(edits: List[Dict], start: int, end: int, text: str) -> None:
+    """Append an edit, merging it into the previous one when they touch."""
+    if start == end and not text:
+        return
+    if edits and edits[-1]["end"] == start:
+        start, text = edits[-1]["start"], edits.pop().get("text", "") + text
+    edit: Dict = {"op": "insert" if start == end else ("replace" if text else "delete"), "start": start, "end": end}
+    if text:
+        edit["text"] = text
+    edits.append(edit)
+
+
+def _span_bounds(spans: List[Span], i: int, j: int, fallback: int) -> Span:
+    return (spans[i][0], spans[j - 1][1]) if i < j else (fallback, fallback)
+
+
+def diff(original: str, rewritten: str, granularity: str = "word") -> List[Dict]:
+    """Edits that turn original into rewritten (see the module docstring)."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}, got {granularity!r}")
+    if original == rewritten:
+        return []
+
+    prefix, suffix = _common_affixes(original, rewritten)
+    # Widen to token boundaries so the aligned middle starts and ends on whole words.
+    while prefix and (original[prefix - 1].isalnum() or original[prefix - 1] == "_"):
+        prefix -= 1
+    while suffix and (original[len(original) - suffix].isalnum() or original[len(original) - suffix] == "_"):
+        suffix -= 1
+    a_end, b_end = len(original) - suffix, len(rewritten) - suffix
+    a_mid, b_mid = original[prefix:a_end], rewritten[prefix:b_end]
+
+    a_sent = _spans(_SENTENCE_RE, a_mid, prefix)
+    b_sent = _spans(_SENTENCE_RE, b_mid, prefix)
+    edits: List[Dict] = []
+    for tag, i1, i2, j1, j2 in _align(original, a_sent, rewritten, b_sent):
+        if tag == "equal":
+            continue
+        a_start, a_stop = _span_bounds(a_sent, i1, i2, a_sent[i1 - 1][1] if i1 else prefix)
+        b_start, b_stop = _span_bounds(b_sent, j1, j2, b_sent[j1 - 1][1] if j1 else prefix)
+        if granularity == "sentence" or tag != "replace":
+            _emit(edits, a_start, a_stop, rewritten[b_start:b_stop])
+            continue
+        if i2 - i1 == j2 - j1:
+            for (p_start, p_stop), (q_start, q_stop) in zip(a_sent[i1:i2], b_sent[j1:j2]):
+                if not _refine(edits, original, p_start, p_stop, rewritten, q_start, q_stop):
+                    _emit(edits, p_start, p_stop, rewritten[q_start:q_stop])
+        elif not _refine(edits, original, a_start, a_stop, rewritten, b_start, b_stop, REFINE_MAX_TOKENS):
+            _emit(edits, a_start, a_stop, rewritten[b_start:b_stop])
+    return edits
+
+
+def _refine(
+    edits: List[Dict], a: str, a_start: int, a_stop: int, b: str, b_start: int, b_stop: int,
+    max_tokens: int = 0,
+) -> bool:
+    """
+    Word-level edits for a[a_start:a_stop] -> b[b_start:b_stop]. Returns False,
+    emitting nothing, if either side is over max_tokens or too little is kept.
+    """
+    a_words = _spans(_WORD_RE, a[a_start:a_stop], a_start)
+    b_words = _spans(_WORD_RE, b[b_start:b_stop], b_start)
+    if max_tokens and max(len(a_words), len(b_words)) > max_tokens:
+        return False
+    opcodes = _align(a, a_words, b, b_words)
+    kept = sum(a_words[k2 - 1][1] - a_words[k1][0] for tag, k1, k2, _, _ in opcodes if tag == "equal")
+    if kept < REFINE_MIN_KEPT * (a_stop - a_start):
+        return False
+    for tag, k1, k2, l1, l2 in opcodes:
+        if tag == "equal":
+            continue
+        w_start, w_stop = _span_bounds(a_words, k1, k2, a_words[k1 - 1][1] if k1 else a_start)
+        t_start, t_stop = _span_bounds(b_words, l1, l2, 0)
+        _emit(edits, w_start, w_stop, b[t_start:t_stop] if l1 < l2 else "")
+    return True
+
+
+def apply_edits(original: str, edits: List[Dict]) -> str:
+    """Rebuild the rewrite from the original and diff()'s edits."""
+    parts: List[str] = []
+    cursor = 0
+    for edit in edits:
+        parts.append(original[cursor:edit["start"]])
+        parts.append(edit.get("text", ""))
+        cursor = edit["end"]
+    parts.append(original[cursor:])
+    return "".join(parts)
+
+
+def diff_summary(original: str, rewritten: str, granularity: str = "word") -> Dict:
+    """diff() plus the lengths a client needs to check the reconstruction."""
+    edits = diff(original, rewritten, granularity)
+    return {
+        "granularity": granularity,
+        "original_length": len(original),
+        "improved_length": len(rewritten),
+        "changed_chars": sum(e["end"] - e["start"] for e in edits),
+        "inserted_chars": sum(len(e.get("text", "")) for e in edits),
+        "edits": edits,
+    }
@@ -0,0 +1,162 @@
+"""
+Per-stage timing spans for the entry scripts.
+
+    @timing.traced("generate_suggestions")
+    def generate_suggestions(input_data): ...      # returns a JSON string
+
+    with timing.span("parse"):
+        parsed = _parse_suggestions(text)
+
+A trace is collected when the request has ``"timings": true``, SCRIPT_TIMINGS=1,
+or SCRIPT_TRACE_FILE is set. The traced entry point then gets a ``timings``
+object spliced into its JSON output — {"total_ms", "import_ms"?, "spans": {name: ms}}
+— and/or one JSON line appended to the trace file. Nested spans are named
+"outer.inner"; a span entered several times (per chunk, per retry) is summed.
+
+When no trace is active, span() returns a shared no-op context manager after
+one ContextVar lookup, so instrumentation can stay in hot paths. Traces live in
+a ContextVar, so concurrent requests on worker threads do not mix.
+
+Environment Variables:
+    SCRIPT_TIMINGS     — Optional. "1" adds timings to every response.
+    SCRIPT_TRACE_FILE  — Optional. Append one JSON line per traced request to this file.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, Optional
+
+_PROCESS_T0 = time.perf_counter()   # entry scripts import this module first
+
+TIMINGS_DEFAULT = os.getenv("SCRIPT_TIMINGS") == "1"
+TRACE_FILE      = os.getenv("SCRIPT_TRACE_FILE") or None
+
+_NOOP = nullcontext()
+_current: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("timing_trace", default=None)
+_file_lock = threading.Lock()
+_import_ms: Optional[float] = None
+_import_script: Optional[str] = None
+
+
+class Trace:
+    """Span totals for one request."""
+
+    def __init__(self, script: str, include_in_output: bool) -> None:
+        self.script = script
+        self.include_in_output = include_in_output
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.token: Optional[contextvars.Token] = None
+        self._stack: list = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        self._stack.append(name)
+        key = ".".join(self._stack)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[key] = self.spans.get(key, 0.0) + (time.perf_counter() - t0) * 1000
+            self._stack.pop()
+
+    def timings(self) -> dict:
+        out: dict = {"total_ms": round((time.perf_counter() - self.started) * 1000, 2)}
+        if _import_ms is not None and self.script == _import_script:
+            out["import_ms"] = round(_import_ms, 2)
+        out["spans"] = {name: round(ms, 2) for name, ms in self.spans.items()}
+        return out
+
+
+def mark_imported(script: str) -> None:
+    """Record interpreter-to-entry-point import time (CLI runs only, not the worker)."""
+    global _import_ms, _import_script
+    _import_ms = (time.perf_counter() - _PROCESS_T0) * 1000
+    _import_script = script
+
+
+def span(name: str):
+    """Time a block as `name` in the active trace; a no-op when none is active."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return trace.span(name)
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of span()."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def begin(script: str, data: Optional[dict] = None) -> Optional[Trace]:
+    """Start a trace for this request if it is enabled; returns it (or None)."""
+    requested = data.get("timings") if isinstance(data, dict) else None
+    include = TIMINGS_DEFAULT if requested is None else bool(requested)
+    if not include and TRACE_FILE is None:
+        return None
+    trace = Trace(script, include)
+    trace.token = _current.set(trace)
+    return trace
+
+
+def end(trace: Optional[Trace]) -> Optional[dict]:
+    """Close trace: write the trace-file line; returns the timings object."""
+    if trace is None:
+        return None
+    try:
+        _current.reset(trace.token)
+    except ValueError:  # a generator finalised in another context
+        _current.set(None)
+    result = trace.timings()
+    if TRACE_FILE:
+        line = json.dumps({"ts": round(time.time(), 3), "script": trace.script, "pid": os.getpid(), **result})
+        try:
+            with _file_lock, open(TRACE_FILE, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+        except OSError:
+            pass
+    return result
+
+
+def splice_timings(output: str, timings: dict) -> str:
+    """Add "timings" to a JSON object string without re-serializing it."""
+    body = output.rstrip()
+    if not body.endswith("}"):
+        return output
+    head = body[:-1].rstrip()
+    sep = "" if head.endswith("{") else ","
+    if "\n" not in body:  # compact output stays on one line
+        return f'{head}{sep}"timings":{json.dumps(timings, separators=(",", ":"))}}}'
+    return f'{head}{sep}\n  "timings": {json.dumps(timings)}\n}}'
+
+
+def traced(script: str) -> Callable:
+    """Decorate an entry point (data dict -> JSON string) to trace it when enabled."""
+    def decorate(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(data, *args, **kwargs):
+            trace = begin(script, data)
+            if trace is None:
+                return fn(data, *args, **kwargs)
+            try:
+                output = fn(data, *args, **kwargs)
+            finally:
+                timings = end(trace)
+            if trace.include_in_output and isinstance(output, str):
+                return splice_timings(output, timings)
+            return output
+        return wrapper
+    return decorate
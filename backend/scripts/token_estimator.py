@@ -0,0 +1,146 @@
+"""
+Offline token estimator used for context-window budgeting.
+
+len(text) // 4 undercounts code, numbers and non-English text (context-length
+errors, wasted retries) and overcounts plain prose (useful history dropped).
+This module approximates a BPE tokenizer without shipping one:
+
+  * text is pre-split the way GPT-style tokenizers do it (optional leading
+    space + a letter run, digits in groups of three, punctuation runs,
+    whitespace runs);
+  * a letter run found in shared/token_vocab.txt (a word-level vocabulary,
+    inflections included) costs one token; other letter runs cost one token
+    per four letters, which is what BPE averages on words it has no single
+    token for (camelCase identifiers are costed part by part);
+  * punctuation runs cost one token per three characters, or per sixteen
+    for a repeated character ("-----");
+  * CJK ideographs/kana/hangul cost one token each and other non-ASCII runs
+    one per four UTF-8 bytes;
+  * the total is scaled by a per-model-family factor (tokenizers differ by
+    roughly ±15% on English).
+
+Piece costs and whole-message counts are memoized, so re-counting a
+conversation history on every turn costs a dictionary lookup per message
+(see dev/bench_token_estimator.py).
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+
+VOCAB_PATH = Path(__file__).resolve().parent.parent.parent / "shared" / "token_vocab.txt"
+
+# (model id prefix, tokens per base-estimate token); first match wins.
+# The base estimate is checked against cl100k_base counts (dev/bench_token_estimator.py):
+# about +2% on prose, +8% on code. Other families are scaled from that by their
+# tokenizers' usual difference on English. Unknown families get the 95th
+# percentile of cl100k/estimate over ~1.1k reference messages (prose, docs, code):
+# running out of context is worse than dropping one extra old turn.
+MODEL_CALIBRATION = (
+    ("openai/",             1.00),
+    ("meta-llama/llama-3",  1.00),
+    ("nvidia/",             1.00),
+    ("google/",             0.95),
+    ("deepseek/",           1.05),
+    ("qwen/",               1.05),
+    ("anthropic/",          1.10),
+    ("meta-llama/",         1.15),  # Llama 2 era SentencePiece vocabularies
+    ("mistralai/",          1.15),
+)
+DEFAULT_CALIBRATION = 1.05
+
+MESSAGE_OVERHEAD = 4   # role marker + separators added per chat message
+
+_PIECE_RE = re.compile(r"'(?:s|t|re|ve|m|ll|d)\b| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|_+|\s+")
+_CAMEL_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+_CJK_RE   = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+_vocab: Optional[frozenset] = None
+
+
+def _load_vocab() -> frozenset:
+    global _vocab
+    if _vocab is None:
+        try:
+            lines = VOCAB_PATH.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            lines = []
+        _vocab = frozenset(
+            line.strip().lower() for line in lines if line.strip() and not line.startswith("#")
+        )
+    return _vocab
+
+
+def _word_cost(word: str) -> int:
+    if word.lower() in _load_vocab():
+        return 1
+    if word.isupper():
+        return math.ceil(len(word) / 3)       # unknown acronyms / shouting split finely
+    parts = _CAMEL_RE.findall(word)
+    if len(parts) > 1:                         # camelCase / PascalCase identifiers
+        return sum(_word_cost(part) for part in parts)
+    return math.ceil(len(word) / 4)
+
+
+def _piece_cost(piece: str) -> int:
+    core = piece[1:] if piece[0] == " " and len(piece) > 1 else piece
+    first = core[0]
+    if first.isspace() or first.isdigit() or first == "'" or first == "_":
+        return 1
+    if not first.isalpha():
+        if core == first * len(core):
+            return math.ceil(len(core) / 16)  # rules and fences ("-----", "===")
+        return math.ceil(len(core) / 3)       # operator / bracket runs ('"""', "});")
+    if not core.isascii():
+        cjk = len(_CJK_RE.findall(core))
+        rest = len(core.encode("utf-8")) - 3 * cjk
+        return cjk + math.ceil(rest / 4)
+    return _word_cost(core)
+
+
+class _PieceCosts(Dict[str, int]):
+    """piece -> cost, filled on first lookup so the hot loop stays in C (sum/map)."""
+
+    MAX_ENTRIES = 200_000
+
+    def __missing__(self, piece: str) -> int:
+        if len(self) >= self.MAX_ENTRIES:
+            self.clear()
+        cost = self[piece] = _piece_cost(piece)
+        return cost
+
+
+_piece_costs = _PieceCosts()
+
+
+@lru_cache(maxsize=8192)
+def _base_tokens(text: str) -> int:
+    return sum(map(_piece_costs.__getitem__, _PIECE_RE.findall(text)))
+
+
+def calibration(model_id: Optional[str]) -> float:
+    """Tokens per base-estimate token for model_id's family."""
+    model = (model_id or "").lower()
+    for prefix, factor in MODEL_CALIBRATION:
+        if model.startswith(prefix):
+            return factor
+    return DEFAULT_CALIBRATION
+
+
+def estimate_tokens(text: str, model_id: Optional[str] = None) -> int:
+    """Estimated token count of text for model_id (unknown/None: conservative default)."""
+    if not text:
+        return 0
+    return math.ceil(_base_tokens(text) * calibration(model_id))
+
+
+def estimate_message_tokens(message: dict, model_id: Optional[str] = None) -> int:
+    """Estimated tokens one chat message adds to a request, including role overhead."""
+    content = message.get("content") or ""
+    if not isinstance(content, str):
+        content = str(content)
+    return estimate_tokens(content, model_id) + MESSAGE_OVERHEAD
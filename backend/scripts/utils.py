@@ -5,9 +5,10 @@ import time
 import requests
 import json
 import sys
-import statistics
 from typing import Dict, List, Any, Optional, Union, Tuple
-import nltk
+
+import http_transport
+from retry_policy import Backoff, retry_after_seconds
 
 def sanitize_api_key(raw: Optional[str]) -> str:
     """Remove invisible Unicode / whitespace from API keys (common when pasting)."""
@@ -20,34 +21,76 @@ def sanitize_api_key(raw: Optional[str]) -> str:
     ).strip()
 
 
-def _setup_nltk_paths() -> None:
-    nltk_data_env = os.environ.get("NLTK_DATA")
-    if nltk_data_env and os.path.isdir(nltk_data_env):
-        nltk.data.path.insert(0, nltk_data_env)
-    nltk_data_dir = os.path.join(
+def _repo_nltk_data_dir() -> str:
+    return os.path.join(
         os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
         "nltk_data",
     )
+
+
+def _setup_nltk_paths(nltk) -> None:
+    nltk_data_env = os.environ.get("NLTK_DATA")
+    if nltk_data_env and os.path.isdir(nltk_data_env):
+        nltk.data.path.insert(0, nltk_data_env)
+    nltk_data_dir = _repo_nltk_data_dir()
     if os.path.isdir(nltk_data_dir):
         nltk.data.path.insert(0, nltk_data_dir)
 
 
-_setup_nltk_paths()
+def _punkt_maybe_installed() -> bool:
+    """
+    Cheap filesystem probe of the directories nltk.data.path searches on POSIX,
+    so a machine without punkt never pays for importing nltk. Always True on
+    Windows, where nltk's search path is more involved.
+    """
+    if os.name == "nt":
+        return True
+    roots = [d for d in os.environ.get("NLTK_DATA", "").split(os.pathsep) if d]
+    roots += [
+        _repo_nltk_data_dir(),
+        os.path.expanduser("~/nltk_data"),
+        os.path.join(sys.prefix, "nltk_data"),
+        os.path.join(sys.prefix, "share", "nltk_data"),
+        os.path.join(sys.prefix, "lib", "nltk_data"),
+        "/usr/share/nltk_data",
+        "/usr/local/share/nltk_data",
+        "/usr/lib/nltk_data",
+        "/usr/local/lib/nltk_data",
+    ]
+    for root in roots:
+        for name in ("punkt_tab", "punkt"):
+            base = os.path.join(os.path.expanduser(root), "tokenizers", name)
+            if os.path.isdir(base) or os.path.isfile(base + ".zip"):
+                return True
+    return False
+
+
+# nltk takes ~50 ms to import, so it is loaded on the first safe_tokenize() call
+# (and only when punkt data is on disk) rather than by every script importing utils.
+_NLTK = None
 _NLTK_SENT_TOKENIZE = None
 
 
 def _nltk_sentences_available() -> bool:
-    global _NLTK_SENT_TOKENIZE
+    global _NLTK, _NLTK_SENT_TOKENIZE
     if _NLTK_SENT_TOKENIZE is not None:
         return _NLTK_SENT_TOKENIZE
+    _NLTK_SENT_TOKENIZE = False
+    if not _punkt_maybe_installed():
+        return False
+    try:
+        import nltk
+    except ImportError:
+        return False
+    _setup_nltk_paths(nltk)
     for resource in ("tokenizers/punkt_tab", "tokenizers/punkt"):
         try:
             nltk.data.find(resource)
+            _NLTK = nltk
             _NLTK_SENT_TOKENIZE = True
             return True
         except LookupError:
             continue
-    _NLTK_SENT_TOKENIZE = False
     return False
 
 
@@ -65,7 +108,7 @@ def safe_tokenize(text: str) -> List[str]:
         return []
     if _nltk_sentences_available():
         try:
-            return nltk.sent_tokenize(text)
+            return _NLTK.sent_tokenize(text)
         except Exception:
             pass
     return _regex_sent_tokenize(text)
@@ -74,20 +117,31 @@ def safe_tokenize(text: str) -> List[str]:
 Shared utility functions for AI script operations
 """
 
-def estimate_tokens(text: str) -> int:
+def estimate_tokens(text: str, model_id: Optional[str] = None) -> int:
     """
     Estimate the number of tokens in a text string.
-    This is a simple approximation - about 4 characters per token for English.
+    Uses the offline estimator in token_estimator.py (shipped vocabulary plus
+    per-model-family calibration) instead of a flat 4 characters per token.
     
     Args:
         text: The text to estimate tokens for
+        model_id: Optional model ID, selects the tokenizer-family calibration
         
     Returns:
         Estimated token count
     """
-    if not text:
-        return 0
-    return len(text) // 4
+    import token_estimator
+
+    return token_estimator.estimate_tokens(text, model_id)
+
+def estimate_message_tokens(message: Dict[str, Any], model_id: Optional[str] = None) -> int:
+    """
+    Estimate the tokens a chat message adds to a request (content + role overhead).
+    Counts are memoized per content string, so re-budgeting a history is cheap.
+    """
+    import token_estimator
+
+    return token_estimator.estimate_message_tokens(message, model_id)
 
 def estimate_context_window(model_id: str) -> int:
     """
@@ -115,6 +169,36 @@ def estimate_context_window(model_id: str) -> int:
     # Default to a conservative value if model not found
     return context_windows.get(model_id, 4096)
 
+_TOPIC_PUNCTUATION = ',."\'!?()[]{}:;'
+
+# Common stop words (simplified list)
+_TOPIC_STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'with',
+    'by', 'about', 'as', 'of', 'from', 'this', 'that', 'these', 'those', 'is',
+    'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do',
+    'does', 'did', 'will', 'would', 'shall', 'should', 'can', 'could', 'may',
+    'might', 'must', 'it', 'they', 'them', 'their', 'we', 'us', 'our', 'i', 'me',
+    'my', 'you', 'your', 'he', 'him', 'his', 'she', 'her', 'hers',
+})
+
+
+def topic_word_counts(content: str) -> Dict[str, int]:
+    """
+    Frequencies of candidate topic words (lowercased, punctuation stripped, no stop
+    words or words of 3 letters or fewer), in order of first occurrence.
+    """
+    # Convert to lowercase and remove common punctuation
+    text = content.lower()
+    for char in _TOPIC_PUNCTUATION:
+        text = text.replace(char, ' ')
+
+    word_counts = {}
+    for word in text.split():
+        if word not in _TOPIC_STOP_WORDS and len(word) > 3:
+            word_counts[word] = word_counts.get(word, 0) + 1
+    return word_counts
+
+
 def extract_key_topics(content: str, max_topics: int = 10) -> List[str]:
     """
     Extract key topics from the content using basic frequency analysis
@@ -126,27 +210,7 @@ def extract_key_topics(content: str, max_topics: int = 10) -> List[str]:
     Returns:
         List of potential key topics
     """
-    # Convert to lowercase and remove common punctuation
-    text = content.lower()
-    for char in ',."\'!?()[]{}:;':
-        text = text.replace(char, ' ')
-    
-    # Split into words and count frequencies
-    words = text.split()
-    
-    # Filter out common stop words (simplified list)
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'with', 
-                 'by', 'about', 'as', 'of', 'from', 'this', 'that', 'these', 'those', 'is', 
-                 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had', 'do', 
-                 'does', 'did', 'will', 'would', 'shall', 'should', 'can', 'could', 'may', 
-                 'might', 'must', 'it', 'they', 'them', 'their', 'we', 'us', 'our', 'i', 'me', 
-                 'my', 'you', 'your', 'he', 'him', 'his', 'she', 'her', 'hers'}
-    
-    # Count word frequencies (excluding stop words and short words)
-    word_counts = {}
-    for word in words:
-        if word not in stop_words and len(word) > 3:
-            word_counts[word] = word_counts.get(word, 0) + 1
+    word_counts = topic_word_counts(content)
     
     # Get top words by frequency
     top_words = sorted(word_counts.items(), key=lambda x: x[1], reverse=True)[:20]
@@ -192,7 +256,7 @@ def api_call_with_retry(
     timeout: int = 30
 ) -> Tuple[Dict[str, Any], int]:
     """
-    Make an API call with retry logic for handling rate limits and timeouts
+    Make an API call, retrying rate limits and request errors under retry_policy
     
     Args:
         endpoint: API endpoint URL
@@ -204,51 +268,47 @@ def api_call_with_retry(
     Returns:
         Tuple of (response_data, status_code)
     """
-    retry_delay = 2
-    
+    backoff = Backoff(base_delay=2)
+    last_error: Tuple[Dict[str, Any], int] = ({"error": "Maximum retries exceeded"}, 500)
+
     for attempt in range(max_retries):
+        retry_after = None
         try:
-            response = requests.post(
+            response = http_transport.post(
                 endpoint,
                 headers=headers,
                 json=payload,
-                timeout=timeout
+                read_timeout=timeout
             )
             
             if response.status_code == 200:
                 return response.json(), response.status_code
                 
             # Handle rate limiting
-            elif response.status_code == 429:
-                if attempt < max_retries - 1:
-                    print(f"Rate limited. Retrying in {retry_delay} seconds...", file=sys.stderr)
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-                    continue
-                else:
-                    return {
-                        "error": "API rate limit exceeded. Please try again later.",
-                        "details": response.text
-                    }, response.status_code
-            else:
+            if response.status_code != 429:
                 return {
                     "error": f"API request failed with status code {response.status_code}",
                     "details": response.text
                 }, response.status_code
-                
+            retry_after = retry_after_seconds(response.headers)
+            last_error = {
+                "error": "API rate limit exceeded. Please try again later.",
+                "details": response.text
+            }, response.status_code
+            print("Rate limited.", file=sys.stderr)
+
         except requests.RequestException as req_err:
-            if attempt < max_retries - 1:
-                print(f"Request error: {str(req_err)}. Retrying...", file=sys.stderr)
-                time.sleep(retry_delay)
-                retry_delay *= 2
-                continue
-            else:
-                return {
-                    "error": f"Request error after retries: {str(req_err)}"
-                }, 500
-                
-    # This should never be reached, but just in case
-    return {"error": "Maximum retries exceeded"}, 500
+            last_error = {"error": f"Request error after retries: {str(req_err)}"}, 500
+            print(f"Request error: {str(req_err)}.", file=sys.stderr)
+
+        if attempt < max_retries - 1:
+            delay = backoff.next_delay(retry_after)
+            if delay is None:
+                break
+            print(f"Retrying in {delay:.1f} seconds...", file=sys.stderr)
+            time.sleep(delay)
+
+    return last_error
 
 def get_optimal_parameters(model_id: str, task_type: str) -> Dict[str, Any]:
     """
@@ -414,7 +474,7 @@ def parse_structured_response(response_text: str) -> Dict[str, Any]:
             list_text = match.group(0)
             list_items = re.findall(r'(?m)^(?:\d+\.|[*\-+])\s+(.+?)$', list_text)
             structured_response["lists"].append({
-                "type": "numbered" if pattern.startswith(r'(?m)^\d') else "bulleted",
+                "type": "numbered" if pattern.startswith(r'(?m)^(\d') else "bulleted",
                 "items": list_items,
                 "raw_text": list_text
             })
@@ -464,6 +524,8 @@ def analyze_response_statistics(response_text: str) -> Dict[str, Any]:
     word_lengths = [len(w) for w in words]
     
     # Calculate basic statistics
+    import statistics
+
     stats = {
         "sentence_count": len(sentences),
         "word_count": len(words),
@@ -646,12 +708,62 @@ def check_logical_flow(sentences: List[str]) -> float:
     else:
         return 0.5  # Very few connectors
         
+_WORD_TOKEN_RE = re.compile(r'\w+')
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_FILLER_RE = re.compile(
+    r'\b(as you can see|as mentioned|it is important to note|keep in mind|needless to say)\b',
+    re.IGNORECASE,
+)
+_CONTRAST_RE = re.compile(r'\b(however|but|although|yet)\b', re.IGNORECASE)
+_REPEAT_WINDOW = 4  # a repeat may follow the previous occurrence by at most 4 words
+
+
+def _has_repeated_word(text: str) -> bool:
+    """
+    True when some word occurs three times with at most three other words between
+    consecutive occurrences, all separated only by whitespace — the same thing
+    r'(\b\w+\b)((?:\s+\w+){0,3}\s+\1\b){2,}' (IGNORECASE) finds, but as one
+    linear token-window scan instead of backreference backtracking.
+    """
+    window: List[Tuple[str, int]] = []  # (lowercased word, repeats chained into it)
+    prev_end = None
+    for match in _WORD_TOKEN_RE.finditer(text):
+        if prev_end is not None and not text[prev_end:match.start()].isspace():
+            window.clear()  # punctuation between words breaks the run
+        prev_end = match.end()
+
+        word = match.group(0).lower()
+        chain = 0
+        for prev_word, prev_chain in window:
+            if prev_word == word and prev_chain + 1 > chain:
+                chain = prev_chain + 1
+        if chain >= 2:
+            return True
+        window.append((word, chain))
+        if len(window) > _REPEAT_WINDOW:
+            window.pop(0)
+    return False
+
+
+def _has_contrast_pair(text: str) -> bool:
+    """
+    True when two of however/but/although/yet share a line — what
+    r'\b(...)\b.*\b(...)\b' finds (. stops at newlines), in one linear pass.
+    """
+    prev_end = None
+    for match in _CONTRAST_RE.finditer(text):
+        if prev_end is not None and text.find('\n', prev_end, match.start()) < 0:
+            return True
+        prev_end = match.end()
+    return False
+
+
 def identify_quality_issues(text: str) -> List[str]:
-    """Identify potential quality issues in the response"""
+    """Identify potential quality issues in the response (linear time in len(text))"""
     issues = []
     
     # Check for repetition
-    if re.search(r'(\b\w+\b)((?:\s+\w+){0,3}\s+\1\b){2,}', text, re.IGNORECASE):
+    if _has_repeated_word(text):
         issues.append("Excessive word repetition detected")
         
     # Check for very short paragraphs
@@ -660,16 +772,16 @@ def identify_quality_issues(text: str) -> List[str]:
         issues.append("Contains very short paragraphs that may lack substance")
     
     # Check for very long sentences
-    sentences = re.split(r'[.!?]+', text)
+    sentences = _SENTENCE_END_RE.split(text)
     if any(len(s.split()) > 50 for s in sentences):
         issues.append("Contains excessively long sentences that may be difficult to read")
     
     # Check for placeholder/filler phrases
-    if re.search(r'\b(as you can see|as mentioned|it is important to note|keep in mind|needless to say)\b', text, re.IGNORECASE):
+    if _FILLER_RE.search(text):
         issues.append("Contains filler phrases that add little value")
     
     # Check for potential inconsistencies
-    if re.search(r'\b(however|but|although|yet)\b.*\b(however|but|although|yet)\b', text, re.IGNORECASE):
+    if _has_contrast_pair(text):
         issues.append("May contain logical inconsistencies or contradictions")
         
     return issues
@@ -697,16 +809,14 @@ def enrich_ai_response(response_text: str, prompt: str = None) -> Dict[str, Any]
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
     }
     
-    # Add structured parsing
-    structured_data = parse_structured_response(response_text)
+    # Structured parsing, statistics and quality metrics in a single pass
+    # (same dicts as parse_structured_response / analyze_response_statistics /
+    # evaluate_response_quality)
+    from text_analysis import analyze_response
+
+    structured_data, stats, quality = analyze_response(response_text, prompt)
     enriched_response["structured_data"] = structured_data
-    
-    # Add statistical analysis
-    stats = analyze_response_statistics(response_text)
     enriched_response["statistics"] = stats
-    
-    # Add quality metrics
-    quality = evaluate_response_quality(response_text, prompt)
     enriched_response["quality_metrics"] = quality
     
     # Add metadata about the structure
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+worker.py
+Long-lived Python worker for the Node backend (see backend/pythonWorkerPool.js).
+
+Imports generate_response, generate_suggestions, improve_readability and
+incremental_analysis once and serves requests as newline-delimited JSON frames,
+so each call skips interpreter start-up, .env discovery and NLTK path setup.
+incremental_analysis also keeps its per-document paragraph caches between calls.
+Edits to Skills.txt / shared/writing_skills.txt still apply without a restart:
+writing_skills re-checks them every WRITING_SKILLS_CHECK_INTERVAL seconds and
+the prompt registry re-renders on reload.
+
+Usage:
+    python worker.py
+
+Protocol (one JSON object per line):
+    worker  -> node   {"ready": true, "pid": int, "concurrency": int}  # once, after imports
+    node    -> worker {"id": int|str, "script": "generate_response.py", "payload": {...}}
+    node    -> worker {"id": ..., "cancel": true}                      # caller went away
+    worker  -> node   {"id": ..., "stdout": str}                       # script JSON output
+    worker  -> node   {"id": ..., "error": str}                        # worker-level failure
+    (reply frames also carry "transport" and "hedging" counters for /api/health)
+
+Up to PYTHON_WORKER_CONCURRENCY requests are served at once, each on its own
+thread; their OpenRouter calls share the async_client engine, so responses can
+come back out of order. A cancel frame cancels the request's pending OpenRouter
+calls and answers it with {"error": "Cancelled"}.
+
+stdout is reserved for protocol frames; anything a script prints goes to stderr.
+
+Environment Variables:
+    PYTHON_WORKER_CONCURRENCY — Optional. Requests served concurrently (default: 8).
+"""
+
+import json
+import os
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import async_client
+import generate_response
+import generate_suggestions
+import http_transport
+import improve_readability
+import incremental_analysis
+
+# script file name (as passed to runPythonScript) -> entry point returning a JSON string
+_HANDLERS = {
+    "generate_response.py":    generate_response.generate_response,
+    "generate_suggestions.py": generate_suggestions.generate_suggestions,
+    "improve_readability.py":  improve_readability.improve_readability,
+    "incremental_analysis.py": incremental_analysis.analyze_document,
+}
+
+CONCURRENCY = max(1, int(os.getenv("PYTHON_WORKER_CONCURRENCY", 8)))
+
+_PROTOCOL_OUT = sys.stdout
+_send_lock = threading.Lock()
+
+# request id -> RequestScope of the request being served
+_scopes: dict = {}
+_scopes_lock = threading.Lock()
+
+
+def _debug(msg: str) -> None:
+    print(f"[worker] {msg}", file=sys.stderr)
+
+
+def _send(frame: dict) -> None:
+    line = json.dumps(frame, ensure_ascii=False) + "\n"
+    with _send_lock:
+        _PROTOCOL_OUT.write(line)
+        _PROTOCOL_OUT.flush()
+
+
+def _handle(frame: dict) -> dict:
+    req_id = frame.get("id")
+    handler = _HANDLERS.get(frame.get("script"))
+    if handler is None:
+        return {"id": req_id, "error": f"Unknown script: {frame.get('script')!r}"}
+
+    payload = frame.get("payload")
+    if not isinstance(payload, dict):
+        return {"id": req_id, "error": "payload must be a JSON object"}
+
+    try:
+        out = handler(payload)
+    except async_client.RequestCancelled:
+        return {"id": req_id, "error": "Cancelled"}
+    except Exception as exc:
+        traceback.print_exc(file=sys.stderr)
+        return {"id": req_id, "error": f"{type(exc).__name__}: {exc}"}
+    if out is None:
+        return {"id": req_id, "error": "Script returned no output"}
+    return {"id": req_id, "stdout": out}
+
+
+def _serve(frame: dict, scope: async_client.RequestScope) -> None:
+    try:
+        with scope:
+            if scope.cancelled:
+                response = {"id": frame.get("id"), "error": "Cancelled"}
+            else:
+                response = _handle(frame)
+    finally:
+        with _scopes_lock:
+            if _scopes.get(frame.get("id")) is scope:
+                del _scopes[frame.get("id")]
+    response["transport"] = http_transport.transport_stats()
+    response["hedging"] = async_client.hedge_stats()
+    _send(response)
+
+
+def _cancel(req_id) -> None:
+    with _scopes_lock:
+        scope = _scopes.get(req_id)
+    if scope is not None:
+        _debug(f"cancelling request {req_id}")
+        scope.cancel()
+
+
+def main() -> None:
+    # Keep stray print() calls from corrupting the protocol stream.
+    sys.stdout = sys.stderr
+
+    pool = ThreadPoolExecutor(max_workers=CONCURRENCY, thread_name_prefix="request")
+    _send({"ready": True, "pid": os.getpid(), "concurrency": CONCURRENCY})
+    _debug(f"ready (pid {os.getpid()})")
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            frame = json.loads(line)
+        except json.JSONDecodeError as exc:
+            _debug(f"Dropping malformed frame: {exc}")
+            continue
+        if not isinstance(frame, dict):
+            _debug("Dropping non-object frame")
+            continue
+        if frame.get("cancel"):
+            _cancel(frame.get("id"))
+            continue
+        scope = async_client.RequestScope()
+        with _scopes_lock:
+            _scopes[frame.get("id")] = scope
+        pool.submit(_serve, frame, scope)
+
+    # stdin closed: let in-flight requests finish and reply before exiting.
+    pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
 """
 Loads shared writing voice rules (Skills.txt) for all OpenRouter model calls.
+
+The rules are read from the first existing file in _SKILL_PATHS (Skills.txt at
+the repo root, then shared/writing_skills.txt), falling back to the embedded
+copy below. A resident worker picks up edits without a restart: at most once
+per WRITING_SKILLS_CHECK_INTERVAL seconds a call stats the candidate files, and
+if any mtime or size changed (or a file appeared or vanished) the text is
+re-read and swapped in as one snapshot. A read that races with a write (the
+files change again while being read) keeps the previous snapshot and retries
+on the next check. Callbacks registered with on_change() — the prompt
+registry's memoized renders — run after each reload.
+
+Environment Variables:
+    WRITING_SKILLS_CHECK_INTERVAL — Optional. Seconds between stat checks (default: 2; 0 = every call).
 """
 from __future__ import annotations
 
-from functools import lru_cache
+import os
+import sys
+import threading
+import time
 from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 _REPO_ROOT = Path(__file__).resolve().parent.parent.parent
 _SKILL_PATHS = (
@@ -12,6 +29,8 @@ _SKILL_PATHS = (
     _REPO_ROOT / "shared" / "writing_skills.txt",
 )
 
+CHECK_INTERVAL = float(os.getenv("WRITING_SKILLS_CHECK_INTERVAL", 2))
+
 _EMBEDDED_SKILLS = """You are a real person writing casually and naturally. You are a decent writer but not exceptional — you know enough to communicate clearly but you don't overthink it.
 
 CORE RULES — never break these:
@@ -58,14 +77,95 @@ CORE RULES — never break these:
    - Short answers can be good answers"""
 
 
-@lru_cache(maxsize=1)
-def load_writing_skills() -> str:
+# (mtime_ns, size) per candidate path; None where the file is missing
+Signature = Tuple[Optional[Tuple[int, int]], ...]
+
+
+class Snapshot(NamedTuple):
+    text: str
+    signature: Signature
+    generation: int   # 1 for the first load, +1 per reload
+
+
+_snapshot: Optional[Snapshot] = None
+_next_check = 0.0
+_lock = threading.Lock()
+_listeners: List[Callable[[Snapshot], None]] = []
+
+
+def _debug(msg: str) -> None:
+    print(f"[writing_skills] {msg}", file=sys.stderr)
+
+
+def _signature() -> Signature:
+    sig = []
     for path in _SKILL_PATHS:
-        if path.is_file():
+        try:
+            st = path.stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def _read() -> str:
+    for path in _SKILL_PATHS:
+        try:
             return path.read_text(encoding="utf-8").strip()
+        except (FileNotFoundError, IsADirectoryError):
+            continue
     return _EMBEDDED_SKILLS.strip()
 
 
+def snapshot() -> Snapshot:
+    """The current rules, re-checked on disk at most once per CHECK_INTERVAL."""
+    global _snapshot, _next_check
+    current = _snapshot
+    if current is not None and time.monotonic() < _next_check:
+        return current
+    reloaded = None
+    with _lock:
+        current = _snapshot
+        now = time.monotonic()
+        if current is not None and now < _next_check:
+            return current
+        signature = _signature()
+        if current is None or signature != current.signature:
+            text = _read()
+            if current is None or _signature() == signature:
+                generation = current.generation + 1 if current else 1
+                if current is None or text != current.text:
+                    reloaded = current is not None
+                    current = _snapshot = Snapshot(text, signature, generation)
+                else:
+                    # touched but identical: remember the new signature, keep the generation
+                    current = _snapshot = current._replace(signature=signature)
+            # else: the files changed while being read; keep the old snapshot, retry next check
+        _next_check = now + CHECK_INTERVAL
+    if reloaded:
+        _debug(f"Reloaded writing skills (generation {current.generation}, {len(current.text)} chars)")
+        for callback in list(_listeners):
+            try:
+                callback(current)
+            except Exception as exc:  # a broken listener must not break prompt building
+                _debug(f"on_change callback failed: {exc}")
+    return current
+
+
+def load_writing_skills() -> str:
+    return snapshot().text
+
+
+def generation() -> int:
+    """Increments each time the rules are reloaded with different text."""
+    return snapshot().generation
+
+
+def on_change(callback: Callable[[Snapshot], None]) -> None:
+    """Call callback(snapshot) after every reload (in the thread that noticed it)."""
+    _listeners.append(callback)
+
+
 def tone_guidance(tone: str) -> str:
     """Layer tone on top of the human voice (professional | casual | formal)."""
     t = (tone or "professional").lower()
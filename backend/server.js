@@ -4,8 +4,16 @@ const bodyParser = require('body-parser');
 const path = require('path');
 const dotenv = require('dotenv');
 const fetch = require('node-fetch');
-const { runPythonScript, parsePythonJson, parsePythonJsonOrThrow, PYTHON_BIN } = require('./pythonRunner');
+const {
+  runPythonScript,
+  parsePythonJson,
+  parsePythonJsonOrThrow,
+  workerPoolStats,
+  pythonCoalescingStats,
+  PYTHON_BIN,
+} = require('./pythonRunner');
 const { sanitizeApiKey, isValidOpenRouterKey } = require('./sanitizeKey');
+const { SingleFlight, stableDigest } = require('./singleflight');
 const {
   sendError,
   statusForPythonPayload,
@@ -106,6 +114,30 @@ const parseOpenRouterError = async (response) => {
   }
 };
 
+// Identical concurrent completions (same key, model, messages and params) share one upstream call.
+const chatFlights = new SingleFlight();
+
+/**
+ * Non-streaming chat completion, coalesced with identical requests in flight.
+ * Resolves { ok: true, status, data } or { ok: false, status, message }; the
+ * result is shared between callers, so treat it as read-only.
+ */
+function postChatCompletion(apiKey, body) {
+  const key = stableDigest(sanitizeApiKey(apiKey), body);
+  return chatFlights.do(key, async () => {
+    const openRouterRes = await fetch('https://openrouter.ai/api/v1/chat/completions', {
+      method: 'POST',
+      headers: getOpenRouterHeaders(apiKey),
+      body: JSON.stringify(body),
+    });
+    if (!openRouterRes.ok) {
+      const message = await parseOpenRouterError(openRouterRes);
+      return { ok: false, status: openRouterRes.status, message };
+    }
+    return { ok: true, status: openRouterRes.status, data: await openRouterRes.json() };
+  });
+}
+
 // Middleware
 const allowedOrigins = [
   'http://localhost:3000',
@@ -233,23 +265,18 @@ app.post('/api/generate', async (req, res) => {
 
   try {
     const prepared = await prepareChatMessages(req.body);
-    const openRouterRes = await fetch('https://openrouter.ai/api/v1/chat/completions', {
-      method: 'POST',
-      headers: getOpenRouterHeaders(apiKey),
-      body: JSON.stringify({
-        model: prepared.model,
-        messages: prepared.messages,
-        temperature: prepared.temperature,
-        max_tokens: prepared.max_tokens,
-      }),
+    const result = await postChatCompletion(apiKey, {
+      model: prepared.model,
+      messages: prepared.messages,
+      temperature: prepared.temperature,
+      max_tokens: prepared.max_tokens,
     });
 
-    if (!openRouterRes.ok) {
-      const message = await parseOpenRouterError(openRouterRes);
-      return sendError(res, openRouterRes.status, message);
+    if (!result.ok) {
+      return sendError(res, result.status, result.message);
     }
 
-    const data = await openRouterRes.json();
+    const { data } = result;
     const content = data.choices?.[0]?.message?.content;
     
     if (!content) {
@@ -348,27 +375,22 @@ app.post('/api/suggestions', async (req, res) => {
 
     const { systemMessage, userMessage } = buildSuggestionsPrompt({ content, documentType, tone });
     
-    const openRouterRes = await fetch('https://openrouter.ai/api/v1/chat/completions', {
-      method: 'POST',
-      headers: getOpenRouterHeaders(apiKey),
-      body: JSON.stringify({
-        model: modelId,
-        messages: [
-          { role: 'system', content: systemMessage },
-          { role: 'user', content: userMessage }
-        ],
-        temperature: 0.3,
-        max_tokens: 1000,
-        response_format: { type: "json_object" } 
-      }),
+    const result = await postChatCompletion(apiKey, {
+      model: modelId,
+      messages: [
+        { role: 'system', content: systemMessage },
+        { role: 'user', content: userMessage }
+      ],
+      temperature: 0.3,
+      max_tokens: 1000,
+      response_format: { type: "json_object" }
     });
 
-    if (!openRouterRes.ok) {
-      const message = await parseOpenRouterError(openRouterRes);
-      return sendError(res, openRouterRes.status, message);
+    if (!result.ok) {
+      return sendError(res, result.status, result.message);
     }
 
-    const data = await openRouterRes.json();
+    const { data } = result;
     let assistantText = data.choices?.[0]?.message?.content || "";
     
     let parsedSuggestions = [];
@@ -442,26 +464,21 @@ app.post('/api/improve', async (req, res) => {
       model: modelId,
     });
     
-    const openRouterRes = await fetch('https://openrouter.ai/api/v1/chat/completions', {
-      method: 'POST',
-      headers: getOpenRouterHeaders(apiKey),
-      body: JSON.stringify({
-        model: modelId,
-        messages: [
-          { role: 'system', content: systemMessage },
-          { role: 'user', content: userMessage }
-        ],
-        temperature: 0.3,
-        max_tokens: 1500,
-      }),
+    const result = await postChatCompletion(apiKey, {
+      model: modelId,
+      messages: [
+        { role: 'system', content: systemMessage },
+        { role: 'user', content: userMessage }
+      ],
+      temperature: 0.3,
+      max_tokens: 1500,
     });
 
-    if (!openRouterRes.ok) {
-      const message = await parseOpenRouterError(openRouterRes);
-      return sendError(res, openRouterRes.status, message);
+    if (!result.ok) {
+      return sendError(res, result.status, result.message);
     }
 
-    const data = await openRouterRes.json();
+    const { data } = result;
     let assistantText = data.choices?.[0]?.message?.content || "";
     
     // Failsafe: aggressively strip common conversational filler if the model ignored instructions
@@ -654,6 +671,11 @@ app.get('/api/health', (req, res) => {
     environment: process.env.NODE_ENV || 'development',
     version: '1.0.0',
     python: PYTHON_BIN,
+    pythonWorkers: workerPoolStats(),
+    coalescing: {
+      openrouter: chatFlights.stats(),
+      python: pythonCoalescingStats(),
+    },
     apiKeyConfigured: Boolean(process.env.OPENROUTER_API_KEY),
   });
 });
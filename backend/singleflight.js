@@ -0,0 +1,65 @@
+/**
+ * Request coalescing ("singleflight") for identical concurrent upstream calls.
+ * Callers that ask for the same key while a call is in flight share its promise
+ * instead of starting their own; the entry is dropped once the call settles, so
+ * nothing is cached beyond the in-flight window.
+ */
+const crypto = require('crypto');
+
+/** JSON with object keys sorted, so key order never changes the digest. */
+function stableStringify(value) {
+  if (Array.isArray(value)) {
+    return `[${value.map(stableStringify).join(',')}]`;
+  }
+  if (value && typeof value === 'object') {
+    const keys = Object.keys(value).filter((k) => value[k] !== undefined).sort();
+    return `{${keys.map((k) => `${JSON.stringify(k)}:${stableStringify(value[k])}`).join(',')}}`;
+  }
+  return JSON.stringify(value) ?? 'null';
+}
+
+/** SHA-256 hex digest of the stable JSON form of each part. */
+function stableDigest(...parts) {
+  const hash = crypto.createHash('sha256');
+  for (const part of parts) {
+    hash.update(stableStringify(part));
+    hash.update('\n');
+  }
+  return hash.digest('hex');
+}
+
+class SingleFlight {
+  constructor() {
+    this.inFlight = new Map();
+    this.counters = { calls: 0, executed: 0, coalesced: 0 };
+  }
+
+  /**
+   * Run fn() for key unless a call for key is already in flight; every caller
+   * gets that call's result (or its rejection).
+   * @param {string} key
+   * @param {() => Promise<any>} fn
+   */
+  do(key, fn) {
+    this.counters.calls += 1;
+    const pending = this.inFlight.get(key);
+    if (pending) {
+      this.counters.coalesced += 1;
+      return pending;
+    }
+    this.counters.executed += 1;
+    const promise = Promise.resolve()
+      .then(fn)
+      .finally(() => {
+        this.inFlight.delete(key);
+      });
+    this.inFlight.set(key, promise);
+    return promise;
+  }
+
+  stats() {
+    return { ...this.counters, inFlight: this.inFlight.size };
+  }
+}
+
+module.exports = { SingleFlight, stableDigest, stableStringify };